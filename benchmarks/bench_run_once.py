@@ -0,0 +1,237 @@
+"""
+Benchmark one monitoring cycle (`run_once` / `async_run_once`) against local stand-ins.
+
+Starts local HTTP stand-ins for Yahoo, Google News and ntfy (see
+`benchmarks.standins`), then runs one cycle per watchlist size with
+synthetic tickers, each in a fresh process and working directory (cold
+caches, own peak RSS).
+
+Reported per size:
+  - wall time of the cycle
+  - requests per upstream (counted by the stand-ins)
+  - peak RSS of the worker process
+  - per-stage latency percentiles (`src.app.metrics`)
+
+Usage (from the repository root):
+    python -m benchmarks.bench_run_once
+    python -m benchmarks.bench_run_once --sizes 10,100 --latency-ms 50 --error-rate 0.02
+    python -m benchmarks.bench_run_once --engine async --json baseline.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks import standins
+
+UPSTREAMS = ("yahoo", "google_news", "ntfy")
+STAGES = ("prices", "evaluate", "news", "enqueue", "notify", "commit", "finish")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark run_once against local stand-ins.")
+    p.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated watchlist sizes")
+    p.add_argument("--engine", choices=["thread", "async"], default="thread")
+    p.add_argument("--latency-ms", type=float, default=20.0, help="Latency of every stand-in")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    for name in UPSTREAMS:
+        flag = name.replace("_", "-")
+        p.add_argument(f"--{flag}-latency-ms", type=float, default=None, help=f"Override for {name}")
+        p.add_argument(f"--{flag}-error-rate", type=float, default=None, help=f"Override for {name}")
+    p.add_argument("--move-sd", type=float, default=2.0, help="Std. dev. of the synthetic Δ%% (alert share)")
+    p.add_argument("--threshold-pct", type=float, default=3.0)
+    p.add_argument("--max-workers", type=int, default=8)
+    p.add_argument("--yahoo", type=int, default=4, help="Max parallel Yahoo requests")
+    p.add_argument("--google-news", type=int, default=4, help="Max parallel Google News requests")
+    p.add_argument("--ntfy", type=int, default=2, help="Max parallel ntfy requests")
+    p.add_argument("--no-news", action="store_true", help="Alerts without news headlines")
+    p.add_argument("--no-outbox", action="store_true", help="Send alerts inline instead of via the outbox")
+    p.add_argument("--digest", action="store_true", help="Coalesce the alerts into digest messages")
+    p.add_argument("--json", help="Also write the results to this file")
+    p.add_argument("--log-level", default="WARNING", help="Log level of the notifier in the worker")
+    # Internal: one measured cycle in a child process
+    p.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    p.add_argument("--urls", default=None, help=argparse.SUPPRESS)
+    p.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    return p.parse_args(argv)
+
+
+def _point_at_stand_ins(urls: Dict[str, str]) -> None:
+    """Route yfinance, Google News and the redirect check to the stand-ins."""
+    import yfinance as yf
+    import yfinance.base
+    import yfinance.data
+    import yfinance.scrapers.history
+    from src.app import core, news
+
+    yfinance.base._BASE_URL_ = urls["yahoo"]
+    yfinance.scrapers.history._BASE_URL_ = urls["yahoo"]
+    # No cookie/crumb handshake with the real Yahoo
+    yfinance.data.YfData._get_cookie_and_crumb = lambda self, timeout=30: ("benchmark", "basic")
+    yf.set_tz_cache_location(os.path.join(os.getcwd(), "yf-cache"))
+
+    news.GOOGLE_NEWS_RSS_BASE = urls["google_news"] + "/rss/search"
+    core.GOOGLE_NEWS_HOSTS = (urls["google_news"].split("://", 1)[1],)
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    """Run one cycle for `args.worker` synthetic tickers and write the measurements."""
+    work = tempfile.mkdtemp(prefix="bench-run-once-")
+    os.chdir(work)
+    _point_at_stand_ins(json.loads(args.urls))
+
+    from src.app import company, feed_cache, http_client, metrics, news, outbox, redirect_cache
+    from src.app.core import run_once
+    from src.app.logging_setup import setup_logging
+    from src.app.state import open_state_store
+    from src.app.thresholds import compile_thresholds
+
+    setup_logging({"level": args.log_level, "to_file": False})
+    company.configure({"file": "company_cache.json", "fill_misses": False})  # cold cycle only, no lookups after it
+    http_client.configure({})
+    redirect_cache.configure({"file": "redirect_cache.json"})
+    feed_cache.configure({"file": "feed_cache.json"})
+    news.configure_dedup({"file": "seen_headlines.json"})
+    outbox.configure({"enabled": not args.no_outbox, "dir": "outbox"})
+
+    tickers = [f"SYN{i:05d}" for i in range(args.worker)]
+    state_file = Path("alert_state.json")
+    store = open_state_store({"backend": "sqlite", "db_file": "alert_state.db"}, state_file)
+    kwargs: Dict[str, Any] = dict(
+        tickers=tickers,
+        threshold_pct=args.threshold_pct,
+        ntfy_server=json.loads(args.urls)["ntfy"],
+        ntfy_topic="benchmark",
+        state_file=state_file,
+        market_hours_cfg={"enabled": False, "tz": "UTC"},
+        test_cfg={},
+        news_cfg={"enabled": not args.no_news, "limit": 2, "lookback_hours": 12},
+        concurrency_cfg={
+            "max_workers": args.max_workers,
+            "yahoo": args.yahoo,
+            "google_news": args.google_news,
+            "ntfy": args.ntfy,
+        },
+        bars_cfg={"enabled": True, "dir": "bars"},
+        state_store=store,
+        thresholds=compile_thresholds({}, args.threshold_pct, tickers),
+        digest_cfg={"enabled": args.digest},
+    )
+
+    metrics.reset()
+    t0 = time.perf_counter()
+    if args.engine == "async":
+        import asyncio
+        from src.app.async_core import async_run_once, close_client
+
+        async def _cycle() -> None:
+            try:
+                await async_run_once(**kwargs)
+            finally:
+                await close_client()
+
+        asyncio.run(_cycle())
+    else:
+        run_once(**kwargs)
+    wall = time.perf_counter() - t0
+
+    alerts = sum(1 for s in store.load().values() if s != "none")
+    store.close()
+    if outbox.get_outbox() is not None:
+        outbox.get_outbox().close()
+    result = {
+        "tickers": args.worker,
+        "wall_s": wall,
+        "alerts": alerts,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "stages": metrics.summary(),
+    }
+    Path(args.result).write_text(json.dumps(result), encoding="utf-8")
+
+
+def _behaviour(args: argparse.Namespace, name: str) -> standins.Behaviour:
+    flag = name.replace("-", "_")
+    latency = getattr(args, f"{flag}_latency_ms")
+    errors = getattr(args, f"{flag}_error_rate")
+    return standins.Behaviour(
+        latency_ms=args.latency_ms if latency is None else latency,
+        error_rate=args.error_rate if errors is None else errors,
+    )
+
+
+def _report(results: List[Dict[str, Any]]) -> str:
+    """Human-readable table of the results."""
+    lines = [
+        f"{'tickers':>8} {'wall s':>8} {'alerts':>7} {'yahoo':>7} {'news':>7} {'ntfy':>6} {'RSS MB':>8}",
+    ]
+    for r in results:
+        req = r["requests"]
+        lines.append(
+            f"{r['tickers']:>8} {r['wall_s']:>8.2f} {r['alerts']:>7} {req['yahoo']:>7} "
+            f"{req['google_news']:>7} {req['ntfy']:>6} {r['peak_rss_mb']:>8.1f}"
+        )
+    lines.append("")
+    lines.append(f"{'tickers':>8} {'stage':<9} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for r in results:
+        for stage in STAGES:
+            s = r["stages"].get(stage)
+            if s is None:
+                continue
+            lines.append(
+                f"{r['tickers']:>8} {stage:<9} {int(s['count']):>6} {s['p50_ms']:>9.1f} "
+                f"{s['p90_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.worker is not None:
+        run_worker(args)
+        return 0
+
+    servers = {
+        name: standins.start(name, _behaviour(args, name), move_sd=args.move_sd)
+        for name in UPSTREAMS
+    }
+    urls = json.dumps({name: s.url for name, s in servers.items()})
+    root = Path(__file__).resolve().parent.parent
+    results: List[Dict[str, Any]] = []
+    try:
+        for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            for s in servers.values():
+                s.reset()
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                result_path = tmp.name
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_run_once",
+                "--worker", str(size), "--urls", urls, "--result", result_path,
+                *(argv if argv is not None else sys.argv[1:]),
+            ]
+            print(f"Running {size} tickers ({args.engine}) ...", file=sys.stderr, flush=True)
+            subprocess.run(cmd, cwd=root, check=True)
+            result = json.loads(Path(result_path).read_text(encoding="utf-8"))
+            os.unlink(result_path)
+            result["requests"] = {name: s.total() for name, s in servers.items()}
+            result["request_kinds"] = {name: dict(s.counts) for name, s in servers.items()}
+            results.append(result)
+    finally:
+        for s in servers.values():
+            s.close()
+
+    print(_report(results))
+    if args.json:
+        meta = {"engine": args.engine, "argv": argv if argv is not None else sys.argv[1:]}
+        Path(args.json).write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
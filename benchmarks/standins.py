@@ -0,0 +1,250 @@
+"""
+Local HTTP stand-ins for the upstream services of the notifier.
+
+- Yahoo chart API (`/v8/finance/chart/<ticker>`): synthetic 1m/1d bars,
+  deterministic per ticker (seeded from the symbol).
+- Google News RSS (`/rss/search`): canned feeds whose links are redirect
+  links (`/rss/articles/<id>`) answered with a 302 to `/publisher/<id>`.
+- ntfy (`POST /<topic>`): accepts and counts messages.
+
+Every stand-in runs its own threaded server with a configurable latency
+and error rate (HTTP 500), and counts the requests it served.
+"""
+from __future__ import annotations
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+
+@dataclass
+class Behaviour:
+    """Latency / error injection of one stand-in."""
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+@dataclass
+class StandIn:
+    """A running stand-in server and its request counters."""
+    name: str
+    server: ThreadingHTTPServer
+    behaviour: Behaviour
+    counts: Dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def netloc(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def count(self, kind: str) -> None:
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counts.clear()
+
+    def total(self) -> int:
+        with self.lock:
+            return sum(self.counts.values())
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def synthetic_move(ticker: str, move_sd: float) -> tuple:
+    """Deterministic (open, Δ%) of a synthetic ticker."""
+    rng = random.Random(zlib.crc32(ticker.encode()))
+    open_px = round(rng.uniform(10, 500), 2)
+    return open_px, rng.gauss(0.0, move_sd)
+
+
+def _chart_payload(ticker: str, interval: str, period1: Optional[int], move_sd: float, bars: int) -> dict:
+    """Yahoo chart JSON with `bars` bars ending at the current minute."""
+    open_px, pct = synthetic_move(ticker, move_sd)
+    step = 86400 if interval == "1d" else 60
+    end = int(time.time()) // step * step
+    stamps = [end - (bars - 1 - i) * step for i in range(bars)]
+    if period1 is not None:
+        stamps = [t for t in stamps if t >= period1] or stamps[-1:]
+    closes = []
+    for t in stamps:
+        frac = (t - stamps[0]) / max(1, stamps[-1] - stamps[0]) if len(stamps) > 1 else 1.0
+        closes.append(round(open_px * (1 + pct / 100 * frac) + 0.01 * math.sin(t), 4))
+    opens = [open_px] + closes[:-1]
+    return {
+        "chart": {
+            "result": [{
+                "meta": {
+                    "currency": "USD",
+                    "symbol": ticker,
+                    "exchangeName": "NMS",
+                    "instrumentType": "EQUITY",
+                    "regularMarketPrice": closes[-1],
+                    "gmtoffset": 0,
+                    "timezone": "UTC",
+                    "exchangeTimezoneName": "UTC",
+                    "priceHint": 4,
+                    "dataGranularity": interval,
+                    "range": "1d",
+                    "validRanges": ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"],
+                },
+                "timestamp": stamps,
+                "indicators": {"quote": [{
+                    "open": opens,
+                    "high": [max(o, c) for o, c in zip(opens, closes)],
+                    "low": [min(o, c) for o, c in zip(opens, closes)],
+                    "close": closes,
+                    "volume": [1000] * len(stamps),
+                }]},
+            }],
+            "error": None,
+        }
+    }
+
+
+def _rss_payload(base: str, query: str, items: int) -> bytes:
+    """Google News style RSS feed with `items` entries about `query`."""
+    now = time.time()
+    entries = []
+    for i in range(items):
+        art = zlib.crc32(f"{query}|{i}".encode())
+        entries.append(
+            "<item>"
+            f"<title>{escape(query)} stock moves {i}</title>"
+            f"<link>{base}/rss/articles/{art}</link>"
+            f"<pubDate>{formatdate(now - 600 * (i + 1), usegmt=True)}</pubDate>"
+            "<source url=\"https://example.com\">Example Wire</source>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        "<title>Stand-in News</title>" + "".join(entries) + "</channel></rss>"
+    ).encode()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # bursts of thousands of requests at high concurrency
+
+
+def _handler(stand_in: "StandIn", route, move_sd: float, bars: int, items: int):
+    """Request handler class bound to one stand-in."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # keep benchmark output clean
+            pass
+
+        def _reply(self, status: int, body: bytes = b"", ctype: str = "text/plain", headers: Optional[dict] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            b = stand_in.behaviour
+            if b.latency_ms:
+                time.sleep(b.latency_ms / 1000.0)
+            kind = route(self)
+            stand_in.count(kind)
+            if b.error_rate and random.random() < b.error_rate:
+                self._reply(500, b"injected error")
+                return
+            status, body, ctype, headers = responder(self, kind)
+            self._reply(status, body, ctype, headers)
+
+        do_GET = do_HEAD = do_POST = _serve
+
+    def responder(req: BaseHTTPRequestHandler, kind: str):
+        url = urlparse(req.path)
+        qs = parse_qs(url.query)
+        if kind == "chart":
+            ticker = url.path.rsplit("/", 1)[-1]
+            period1 = int(qs["period1"][0]) if "period1" in qs else None
+            interval = qs.get("interval", ["1m"])[0]
+            payload = _chart_payload(ticker, interval, period1, move_sd, bars)
+            return 200, json.dumps(payload).encode(), "application/json", None
+        if kind == "rss":
+            query = qs.get("q", [""])[0].replace(" when:12h", "")
+            return 200, _rss_payload(stand_in.url, query, items), "application/rss+xml", None
+        if kind == "redirect":
+            art = url.path.rsplit("/", 1)[-1]
+            return 302, b"", "text/plain", {"Location": f"{stand_in.url}/publisher/{art}"}
+        if kind == "article":
+            return 200, b"<html>article</html>", "text/html", None
+        if kind == "publish":
+            return 200, json.dumps({"id": str(time.time_ns()), "event": "message"}).encode(), "application/json", None
+        return 404, b"not found", "text/plain", None
+
+    return Handler
+
+
+def _route_yahoo(req) -> str:
+    return "chart" if "/v8/finance/chart/" in req.path else "other"
+
+
+def _route_news(req) -> str:
+    path = urlparse(req.path).path
+    if path.startswith("/rss/search"):
+        return "rss"
+    if path.startswith("/rss/articles/"):
+        return "redirect"
+    if path.startswith("/publisher/"):
+        return "article"
+    return "other"
+
+
+def _route_ntfy(req) -> str:
+    return "publish" if req.command == "POST" else "other"
+
+
+_ROUTES = {"yahoo": _route_yahoo, "google_news": _route_news, "ntfy": _route_ntfy}
+
+
+def start(
+    name: str,
+    behaviour: Optional[Behaviour] = None,
+    move_sd: float = 2.0,
+    bars: int = 30,
+    items: int = 3,
+) -> StandIn:
+    """
+    Start one stand-in ("yahoo", "google_news" or "ntfy") on a free local port.
+
+    Args:
+        name: Which upstream to imitate.
+        behaviour: Latency / error injection.
+        move_sd: Std. dev. of the synthetic Δ% vs. open (Yahoo).
+        bars: Bars per chart response (Yahoo).
+        items: Entries per RSS feed (Google News).
+    """
+    server = _Server(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    stand_in = StandIn(name, server, behaviour or Behaviour())
+    server.RequestHandlerClass = _handler(stand_in, _ROUTES[name], move_sd, bars, items)
+    threading.Thread(target=server.serve_forever, name=f"standin-{name}", daemon=True).start()
+    return stand_in
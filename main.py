@@ -1,42 +1,131 @@
+import argparse
+import asyncio
 from pathlib import Path
 from src.app.config import load_config
 from src.app.logging_setup import setup_logging
 from src.app.core import run_once
+from src.app import breaker, company, feed_cache, http_client, news, outbox, ratelimit, redirect_cache
+from src.app.concurrency import configure as configure_concurrency
+from src.app.state import open_state_store
+from src.app.thresholds import compile_thresholds
 from src.app.utils import mask_secret
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Stock Notifier – push alerts for stock movements")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=("run", "prefetch-meta"),
+        default="run",
+        help="run = monitoring cycle(s) (default), prefetch-meta = fill the company metadata cache",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("sync", "async"),
+        default="sync",
+        help="sync = thread pool (default), async = asyncio with one shared HTTP client",
+    )
+    parser.add_argument("--config", default="config.json", help="Path to config.json")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and check every daemon.interval_seconds (instead of one cycle)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        help="Override daemon.interval_seconds (seconds between cycles)",
+    )
+    return parser.parse_args(argv)
+
+
+def prefetch_meta(cfg, logger) -> int:
+    """
+    Resolve company metadata for all configured tickers into the company cache.
+
+    Returns:
+        int: Exit code (0 = no failures, 1 = some tickers had no metadata).
+    """
+    configure_concurrency(cfg["concurrency"])
+    stats = company.prefetch_company_meta(cfg["tickers"], max_workers=int(cfg["company"]["prefetch_workers"]))
+    if breaker.get_board() is not None:
+        breaker.get_board().save()
+    logger.info(
+        "Company metadata prefetch: %d ticker(s) | %d cached | %d fetched | %d failed",
+        sum(stats.values()), stats["hits"], stats["misses"], stats["failures"],
+    )
+    return 1 if stats["failures"] else 0
+
+
+def main(argv=None):
     """
     Entry point of the Stock Notifier application.
 
     - Loads configuration from `config.json`.
     - Sets up logging (console/file depending on config).
-    - Runs one monitoring cycle (`run_once`), which:
+    - Runs one monitoring cycle (`run_once`, or `async_run_once` with
+      `--engine async`), or with `--daemon` keeps running and repeats the
+      cycle every `daemon.interval_seconds`. Each cycle:
         * Checks if the market is open (with test bypass if enabled).
         * Fetches stock/ETF prices using yfinance.
         * Compares current price to opening price.
         * Sends push notifications via ntfy if thresholds are exceeded.
         * Optionally fetches related news headlines.
+    - `prefetch-meta` only fills the company metadata cache for all
+      configured tickers (so alerts never wait for a metadata lookup).
     """
+    args = parse_args(argv)
+
     # Load configuration (tickers, thresholds, logging settings, etc.)
-    cfg = load_config("config.json")
+    cfg = load_config(args.config)
 
     # Initialize logging system (console/file based on config.json)
     logger = setup_logging(cfg["log"])
 
     # Log current configuration (with secrets masked)
     logger.info(
-        "Configuration loaded: ntfy.server=%s | ntfy.topic(masked)=%s | log.level=%s",
+        "Configuration loaded: ntfy.server=%s | ntfy.topic(masked)=%s | log.level=%s | engine=%s",
         cfg["ntfy"]["server"],
         mask_secret(cfg["ntfy"]["topic"]),
-        cfg["log"]["level"]
+        cfg["log"]["level"],
+        args.engine,
     )
 
+    # Adaptive request rates and circuit breakers per upstream (also used by prefetch-meta)
+    ratelimit.configure(cfg["ratelimit"])
+    breaker.configure(cfg["breakers"])
+    # Company names for news queries (cache loaded once, filled by prefetch-meta)
+    company.configure(cfg["company"])
+    if args.command == "prefetch-meta":
+        return prefetch_meta(cfg, logger)
+    if args.daemon:
+        missing = company.missing(cfg["tickers"])
+        if missing:
+            logger.warning(
+                "%d of %d ticker(s) have no cached company metadata; news queries use the bare ticker until "
+                "they are looked up. Run `python main.py prefetch-meta` once to fill the cache.",
+                len(missing), len(cfg["tickers"]),
+            )
+
+    # Pooled HTTP sessions (per host) shared by all outbound calls
+    http_client.configure(cfg["http"])
+    # Google News link → original URL, loaded once per process
+    redirect_cache.configure(cfg["redirect_cache"])
+    # Google News RSS: ETag/Last-Modified + parsed entries per feed URL
+    feed_cache.configure(cfg["feed_cache"])
+    # Headlines already sent per ticker (near-duplicates are not shown again)
+    news.configure_dedup(cfg["headline_dedup"])
+    # Durable alert queue with background delivery (state committed once delivered)
+    outbox.configure(cfg["outbox"])
+
     # Run one monitoring cycle:
     # - Price check
     # - Threshold detection
     # - Notification (ntfy + news)
-    run_once(
+    run_kwargs = dict(
         tickers=cfg["tickers"],
         threshold_pct=float(cfg["threshold_pct"]),
         ntfy_server=cfg["ntfy"]["server"],
@@ -44,9 +133,58 @@ def main():
         state_file=Path(cfg["state_file"]),
         market_hours_cfg=cfg["market_hours"],
         test_cfg=cfg["test"],
-        news_cfg=cfg["news"]
+        news_cfg=cfg["news"],
+        concurrency_cfg=cfg["concurrency"],
+        bars_cfg=cfg["bars"],
+        # SQLite (WAL) or JSON; a legacy alert_state.json is imported once
+        state_store=open_state_store(cfg["state_store"], Path(cfg["state_file"])),
+        # Per-ticker/per-group up/down thresholds, resolved once for the watchlist
+        thresholds=compile_thresholds(cfg["thresholds"], float(cfg["threshold_pct"]), cfg["tickers"]),
+        rearm_cfg=cfg["rearm"],
+        # Many alerts in one cycle → a few compact digest messages
+        digest_cfg=cfg["digest"],
     )
+    if cfg["threshold_mode"] == "zscore":
+        # k × daily volatility per ticker (history cached, refreshed once a day)
+        from src.app.volatility import zscore_thresholds
+        run_kwargs["thresholds"] = zscore_thresholds(run_kwargs["thresholds"], cfg["zscore"])
+    elif cfg["threshold_mode"] != "pct":
+        raise RuntimeError(f"threshold_mode must be 'pct' or 'zscore' (got {cfg['threshold_mode']!r}).")
+    if args.daemon:
+        # Keep state (and module-level caches/sessions) in memory between cycles
+        run_kwargs["state"] = run_kwargs["state_store"].load()
+
+    if args.engine == "async":
+        # Imported lazily: only the async engine needs httpx
+        from src.app.async_core import async_run_once, close_client
+        # One loop for all cycles: the shared HTTP client (and its connections) lives on it
+        loop = asyncio.new_event_loop()
+        cycle = lambda: loop.run_until_complete(async_run_once(**run_kwargs))
+    else:
+        loop = None
+        cycle = lambda: run_once(**run_kwargs)
+
+    try:
+        if args.daemon:
+            from src.app.scheduler import run_daemon
+            test_cfg = cfg["test"]
+            run_daemon(
+                cycle,
+                interval_s=args.interval or float(cfg["daemon"]["interval_seconds"]),
+                market_hours_cfg=cfg["market_hours"],
+                bypass_market_hours=bool(test_cfg.get("enabled") and test_cfg.get("bypass_market_hours")),
+            )
+        else:
+            cycle()
+    finally:
+        if loop is not None:
+            loop.run_until_complete(close_client())
+            loop.close()
+        run_kwargs["state_store"].close()
+        if outbox.get_outbox() is not None:
+            outbox.get_outbox().close()
+        http_client.close_all()
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
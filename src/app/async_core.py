@@ -0,0 +1,507 @@
+from __future__ import annotations
+import asyncio
+import functools
+import logging
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import feedparser
+import httpx
+
+from .breaker import CircuitOpen, get_breaker, is_open as circuit_open
+from .company import auto_keywords
+from .concurrency import configure as configure_concurrency, limit
+from .core import (
+    _DEDUP_CANDIDATES,
+    _apply_deliveries,
+    _digest_batch,
+    _outbox_alert,
+    _finish_run,
+    _job_start,
+    now_tz,
+    _fetch_prices,
+    _price_watchlist,
+    _log_signal,
+    _alert_message,
+    _first_hop_status,
+    _settle,
+    _rearm_settings,
+    _ensure_https,
+    _unwrap_google_news,
+    _format_headlines,
+)
+from .logging_setup import grouped_logs
+from .digest import build_digest, digest_settings
+from .metrics import timed
+from .feed_cache import get_cache as get_feed_cache
+from .http_client import host_timeout
+from .news import (
+    build_query,
+    dedupe_headlines,
+    entries_from_feed,
+    filter_titles,
+    headlines_from_entries,
+    remember_headlines,
+    _google_news_rss_url,
+)
+from .ntfy import build_ntfy_request
+from .outbox import Outbox, get_outbox
+from .ratelimit import Call, limited_async
+from .redirect_cache import get_cache as get_redirect_cache
+from .signals import TickerSignal, evaluate_watchlist
+from .thresholds import ThresholdTable
+from .state import ALERT_HISTORY_FILE_NAME, AlertHistory, JsonStateStore, StateStore
+from .utils import mask_secret
+
+logger = logging.getLogger("stock-alerts")
+
+# Shared HTTP client, kept across cycles (daemon) on the loop that created it
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_pool_size = 0
+
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide `httpx.AsyncClient` for the running loop.
+
+    Created on first use with a connection pool sized from the
+    `concurrency` limits ("google_news" + "ntfy"), then reused by every
+    cycle on the same loop, so keep-alive connections survive between
+    daemon cycles. A new loop or changed limits get a new client.
+    """
+    global _client, _client_loop, _client_pool_size
+    loop = asyncio.get_running_loop()
+    pool_size = limit("google_news") + limit("ntfy")
+    if _client is None or _client.is_closed or _client_loop is not loop or _client_pool_size != pool_size:
+        if _client is not None and not _client.is_closed and _client_loop is loop:
+            loop.create_task(_client.aclose())
+        http_limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        _client = httpx.AsyncClient(limits=http_limits, timeout=10.0)
+        _client_loop, _client_pool_size = loop, pool_size
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (call on its loop before closing the loop)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client, _client_loop = None, None
+
+
+class _AsyncUpstreams:
+    """
+    Shared resources of one async run:
+      - one `httpx.AsyncClient` (connection pool) for Google News and ntfy
+      - an asyncio.Semaphore per upstream (same limits as the thread engine),
+        combined with the upstream's adaptive rate limit in `slot`
+      - a small thread pool for the blocking yfinance calls
+    """
+
+    def __init__(self, client: httpx.AsyncClient, executor: ThreadPoolExecutor):
+        self.client = client
+        self.executor = executor
+        self.google_news = asyncio.Semaphore(limit("google_news"))
+        self.ntfy = asyncio.Semaphore(limit("ntfy"))
+        self.inflight: Dict[str, asyncio.Future] = {}  # redirect link -> pending resolution
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[Call]:
+        """
+        Request slot of an upstream: its semaphore plus its adaptive rate
+        limit and circuit breaker (see `concurrency.upstream`).
+
+        Raises:
+            CircuitOpen: If the upstream's circuit is open (nothing is sent).
+        """
+        breaker = get_breaker(name)
+        if breaker is not None:
+            breaker.allow()
+        try:
+            async with getattr(self, name), limited_async(name, limit(name)) as call:
+                yield call
+        except BaseException:
+            if breaker is not None:
+                breaker.record(False)
+            raise
+        if breaker is not None:
+            breaker.record(call.ok)
+
+    async def run_blocking(self, fn, *args):
+        """Run a blocking call (yfinance) on the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+
+async def _fetch_headlines(
+    up: _AsyncUpstreams,
+    query: str,
+    limit: int,
+    lookback_hours: int,
+    lang: str,
+    country: str,
+) -> List[Dict[str, str]]:
+    """Async counterpart of `news.fetch_headlines` (download via the shared client, same feed cache)."""
+    url = _google_news_rss_url(query, lang=lang, country=country)
+    cache = get_feed_cache()
+    entries = cache.fresh(url)
+    if entries is None:
+        try:
+            async with up.slot("google_news") as call:
+                r = await up.client.get(
+                    url, headers=cache.conditional_headers(url), follow_redirects=True, timeout=host_timeout(url),
+                )
+                call.report(r.status_code, r.headers)
+            if r.status_code == 304:
+                entries = cache.revalidated(url)
+            else:
+                r.raise_for_status()
+                # feedparser only parses here; the download happened above
+                entries = cache.store(url, r.headers, entries_from_feed(feedparser.parse(r.content)))
+        except (httpx.HTTPError, CircuitOpen) as e:
+            logger.debug("Google News fetch failed (%s): %s", query, e)
+            return []
+    return headlines_from_entries(entries, limit=limit, lookback_hours=lookback_hours)
+
+
+async def _extract_original_url(up: _AsyncUpstreams, link: str, timeout: float = 3.0) -> str:
+    """
+    Async counterpart of `core._extract_original_url` (HEAD, fallback GET).
+
+    Uses the same process-wide redirect cache; concurrent tasks asking for
+    the same link share one resolution.
+    """
+    try:
+        link, needs_redirect = _unwrap_google_news(link)
+        if not needs_redirect:
+            return link
+        cache = get_redirect_cache()
+        found, url = cache.get(link)
+        if found:
+            cache.count(hit=True)
+            return url or link
+        pending = up.inflight.get(link)
+        if pending is None:
+            cache.count(hit=False)
+            pending = up.inflight[link] = asyncio.ensure_future(_follow_redirects_async(up, link, timeout))
+        url = await pending
+        up.inflight.pop(link, None)
+        cache.put(link, url)
+        return url or link
+    except Exception:
+        return link
+
+
+async def _follow_redirects_async(up: _AsyncUpstreams, link: str, timeout: float) -> Optional[str]:
+    """Follow a redirect link with the shared client; None if it cannot be resolved."""
+    try:
+        # HEAD first (cheap), some hosts require GET
+        async with up.slot("google_news") as call:
+            r = await up.client.head(link, follow_redirects=True, timeout=timeout)
+            call.report(_first_hop_status(r), r.headers)
+        if str(r.url) != link:
+            return _ensure_https(str(r.url))
+        if r.status_code in (403, 405):
+            async with up.slot("google_news") as call:
+                async with up.client.stream("GET", link, follow_redirects=True, timeout=timeout) as g:
+                    call.report(_first_hop_status(g), g.headers)
+                    final = str(g.url)
+            if final != link:
+                return _ensure_https(final)
+    except (httpx.HTTPError, CircuitOpen):
+        pass
+    return None
+
+
+async def _format_headlines_async(up: _AsyncUpstreams, items: List[Dict[str, str]]) -> str:
+    """Resolve all headline links concurrently, then format them like the sync engine."""
+    links = [_ensure_https((it.get("link") or "").strip()) for it in items]
+    links = [u for u in links if u]
+    resolved = await asyncio.gather(*(_extract_original_url(up, u) for u in links))
+    mapping = dict(zip(links, resolved))
+    return _format_headlines(items, resolve=lambda u: mapping.get(u, u))
+
+
+async def _build_news_block(up: _AsyncUpstreams, tk: str, news_cfg: dict) -> Tuple[str, Optional[str]]:
+    """Async counterpart of `core._build_news_block`."""
+    first_url_for_click = None
+    if circuit_open("google_news"):
+        logger.info("%s | Google News circuit open: alert without news.", tk)
+        return "", None
+
+    # Company metadata may hit Yahoo → run on the executor
+    company_name, req_kw = await up.run_blocking(auto_keywords, tk)
+    q = build_query(company_name, tk)
+    limit = int(news_cfg.get("limit", 2))
+
+    items = await _fetch_headlines(
+        up,
+        q,
+        limit=_DEDUP_CANDIDATES * limit,
+        lookback_hours=int(news_cfg.get("lookback_hours", 12)),
+        lang=news_cfg.get("lang", "de"),
+        country=news_cfg.get("country", "DE"),
+    )
+    items = dedupe_headlines(filter_titles(items, required_keywords=req_kw), tk, limit)
+
+    if items:
+        first_url_for_click = await _extract_original_url(up, _ensure_https(items[0].get("link", "")))
+
+    news_text = await _format_headlines_async(up, items)
+    if not news_text:
+        # Fallback: try en/US if DE results are weak or empty
+        items = await _fetch_headlines(
+            up,
+            q,
+            limit=_DEDUP_CANDIDATES * limit,
+            lookback_hours=max(12, int(news_cfg.get("lookback_hours", 12))),
+            lang=news_cfg.get("fallback_lang", "en"),
+            country=news_cfg.get("fallback_country", "US"),
+        )
+        items = dedupe_headlines(filter_titles(items, required_keywords=req_kw), tk, limit)
+
+        if items and not first_url_for_click:
+            first_url_for_click = await _extract_original_url(up, _ensure_https(items[0].get("link", "")))
+
+        news_text = await _format_headlines_async(up, items)
+
+    if news_text:
+        remember_headlines(items, tk)
+    headlines_block = "\n\n📰 News:\n" + news_text if news_text else ""
+    return headlines_block, first_url_for_click
+
+
+async def _notify_ntfy(
+    up: _AsyncUpstreams,
+    server: str,
+    topic: str,
+    title: str,
+    message: str,
+    *,
+    dry_run: bool = False,
+    click_url: Optional[str] = None,
+) -> bool:
+    """Async counterpart of `ntfy.notify_ntfy` (always Markdown); True if delivered."""
+    if dry_run:
+        logger.info("[DRY-RUN] %s | %s", title, message.replace("\n", " | "))
+        return False
+
+    url, headers = build_ntfy_request(server, topic, title, markdown=True, click_url=click_url)
+    try:
+        logger.info("Sending ntfy: title='%s', topic(masked)='%s'", title, mask_secret(topic))
+        async with up.slot("ntfy") as call:
+            r = await up.client.post(url, content=message.encode("utf-8"), headers=headers, timeout=host_timeout(url))
+            call.report(r.status_code, r.headers)
+        r.raise_for_status()
+        logger.debug("ntfy Response: %s", r.status_code)
+        return True
+    except (httpx.HTTPError, CircuitOpen) as e:
+        logger.warning("ntfy send failed: %s", e)
+        return False
+
+
+async def _send_digest(
+    up: _AsyncUpstreams,
+    sigs: List[TickerSignal],
+    digest_cfg: Dict[str, Any],
+    *,
+    ntfy_server: str,
+    ntfy_topic: str,
+    test_cfg: dict,
+    history: AlertHistory,
+    outbox: Optional[Outbox] = None,
+) -> List[Tuple[str, str]]:
+    """Async counterpart of `core._send_digest` (inline sends via the shared client)."""
+    for sig in sigs:
+        _log_signal(sig, test_cfg)
+    messages = build_digest(sigs, int(digest_cfg["max_bytes"]), int(digest_cfg["max_messages"]))
+    logger.info("Digest: %d alert(s) in %d message(s).", len(sigs), len(messages))
+
+    applied: List[Tuple[str, str]] = []
+    for m in messages:
+        if outbox is not None:
+            with timed("enqueue"):
+                await up.run_blocking(functools.partial(
+                    outbox.enqueue,
+                    server=ntfy_server, topic=ntfy_topic, title=m.title, body=m.body,
+                    alerts=[_outbox_alert(sig) for sig in m.signals],
+                ))
+            continue
+        with timed("notify"):
+            delivered = await _notify_ntfy(
+                up, ntfy_server, ntfy_topic, m.title, m.body, dry_run=test_cfg.get("dry_run", False),
+            )
+        for sig in m.signals:
+            history.append(sig.ticker, sig.direction, sig.pct, sig.open, sig.last, delivered=delivered)
+            applied.append((sig.ticker, sig.state))
+    return applied
+
+
+async def async_run_once(
+    tickers: List[str],
+    threshold_pct: float,
+    ntfy_server: str,
+    ntfy_topic: str,
+    state_file: Path,
+    market_hours_cfg: dict,
+    test_cfg: dict,
+    news_cfg: dict,
+    concurrency_cfg: Optional[dict] = None,
+    state: Optional[Dict[str, str]] = None,
+    bars_cfg: Optional[dict] = None,
+    state_store: Optional[StateStore] = None,
+    thresholds: Optional[ThresholdTable] = None,
+    rearm_cfg: Optional[dict] = None,
+    digest_cfg: Optional[dict] = None,
+) -> None:
+    """
+    asyncio variant of `core.run_once` (same arguments, same behaviour).
+
+    Differences to the thread engine:
+      - Google News RSS, redirect resolution and ntfy go through one shared
+        `httpx.AsyncClient` whose connection pool is sized from the
+        `concurrency` limits ("google_news" + "ntfy"). The client lives as
+        long as the event loop (see `close_client`), so daemon cycles reuse
+        its connections.
+      - Blocking yfinance calls (prices, company metadata) run on a thread
+        pool bounded by the "yahoo" limit.
+      - Every ticker is an asyncio task instead of a thread, so thousands
+        of tickers do not need thousands of threads. Decisions come from
+        the same vectorized evaluation (`signals.evaluate_watchlist`).
+
+    State updates are applied on the event loop after all tasks finished
+    and committed to the state store in one write; log lines are grouped
+    per ticker (per task).
+
+    With the outbox, alerts are queued exactly as in `core.run_once` and
+    sent by the outbox's own (thread) deliverer instead of the async client.
+    Digests (`digest_cfg`) are built as in `core._send_digest` and sent
+    via the shared client (or queued).
+    """
+    concurrency_cfg = concurrency_cfg or {}
+    configure_concurrency(concurrency_cfg)
+    tickers = list(dict.fromkeys(tickers))
+    rearm_factor, min_realert_s = _rearm_settings(rearm_cfg)
+    digest_cfg = digest_settings(digest_cfg)
+
+    if not _job_start(tickers, threshold_pct, market_hours_cfg, test_cfg):
+        return
+
+    store = state_store or JsonStateStore(state_file)
+    history = AlertHistory(state_file.parent / ALERT_HISTORY_FILE_NAME)
+    if state is None:
+        state = store.load()
+    outbox = None if test_cfg.get("dry_run") else get_outbox()
+    if outbox is not None:
+        outbox.start()
+
+    changes: Dict[str, str] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=limit("yahoo"), thread_name_prefix="yahoo") as executor:
+            up = _AsyncUpstreams(_get_client(), executor)
+
+            # Batched price fetch (blocking yfinance) off the event loop; none while Yahoo's circuit is open
+            watch = _price_watchlist(tickers)
+            with timed("prices"):
+                prices = await up.run_blocking(_fetch_prices, watch, state_file, market_hours_cfg, bars_cfg) if watch else {}
+
+            # All Δ% / direction / alert decisions at once (pure, vectorized)
+            if thresholds is not None and watch:
+                await up.run_blocking(thresholds.prepare, watch, now_tz(market_hours_cfg["tz"]).date().isoformat())
+            # Alerts still waiting for delivery count as sent (no second queue entry)
+            effective = {**state, **outbox.pending_states()} if outbox is not None else state
+            with timed("evaluate"):
+                signals = evaluate_watchlist(
+                    watch, prices, effective, thresholds or threshold_pct, test_cfg,
+                    rearm_factor=rearm_factor, recent=history.recent_alerts(min_realert_s, tickers=watch),
+                )
+
+            async def _process(sig: TickerSignal) -> Optional[str]:
+                tk = sig.ticker
+                with grouped_logs():
+                    try:
+                        _log_signal(sig, test_cfg)
+                        direction, pct, open_px, last_px = sig.direction, sig.pct, sig.open, sig.last
+                        if sig.alert:
+                            title, body = _alert_message(tk, direction, pct, open_px, last_px, level=sig.level)
+                            headlines_block, click_url = "", None
+                            if news_cfg.get("enabled", False):
+                                with timed("news"):
+                                    headlines_block, click_url = await _build_news_block(up, tk, news_cfg)
+                            if outbox is not None:
+                                with timed("enqueue"):
+                                    await up.run_blocking(functools.partial(
+                                        outbox.enqueue,
+                                        server=ntfy_server, topic=ntfy_topic, title=title,
+                                        body=body + headlines_block, alerts=[_outbox_alert(sig)],
+                                        click_url=click_url,
+                                    ))
+                                logger.info("%s | Alert queued for delivery.", tk)
+                                return None
+                            with timed("notify"):
+                                delivered = await _notify_ntfy(
+                                    up,
+                                    ntfy_server,
+                                    ntfy_topic,
+                                    title,
+                                    body + headlines_block,
+                                    dry_run=test_cfg.get("dry_run", False),
+                                    click_url=click_url,
+                                )
+                            # Journal right away: a crash before the commit must not re-send
+                            await asyncio.to_thread(store.record, tk, sig.state)
+                            history.append(tk, direction, pct, open_px, last_px, delivered=delivered)
+                            return sig.state
+                        new_state = _settle(sig)
+                        if new_state is not None:
+                            await asyncio.to_thread(store.record, tk, new_state)
+                            if sig.reset:
+                                history.append(tk, new_state, pct, open_px, last_px)
+                        return new_state
+                    except Exception as e:
+                        # Catch-all to ensure a single bad ticker doesn't break the entire run
+                        logger.error("Error while processing %s: %s", tk, e)
+                        return None
+
+            rows = list(signals)
+            # Many alerts at once → a few digest messages instead of one per ticker
+            digest = _digest_batch(rows, digest_cfg)
+            if digest:
+                rows = [sig for sig in rows if not sig.alert]
+            results = await asyncio.gather(*(_process(sig) for sig in rows))
+            # Persist state so we don't spam until price returns to corridor
+            changes.update({sig.ticker: new_state for sig, new_state in zip(rows, results) if new_state is not None})
+            if digest:
+                try:
+                    sent = await _send_digest(
+                        up, digest, digest_cfg, ntfy_server=ntfy_server, ntfy_topic=ntfy_topic,
+                        test_cfg=test_cfg, history=history, outbox=outbox,
+                    )
+                except Exception as e:
+                    logger.error("Error while sending the alert digest: %s", e)
+                    sent = []
+                for tk, new_state in sent:
+                    await asyncio.to_thread(store.record, tk, new_state)
+                    changes[tk] = new_state
+
+        if outbox is not None:
+            def _apply(tk: str, new_state: str) -> None:
+                store.record(tk, new_state)
+                changes[tk] = new_state
+
+            # Decisions of this run's evaluation win over deliveries of older alerts
+            await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                _apply_deliveries, outbox, history, _apply, ChainMap(changes, state), evaluated=set(changes),
+            ))
+    finally:
+        # One write per run (also if the digest, news or delivery stage fails)
+        state.update(changes)
+        with timed("commit"):
+            store.commit(changes)
+        if state_store is None:
+            store.close()
+    _finish_run()
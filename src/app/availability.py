@@ -0,0 +1,169 @@
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Any
+
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
+# Stored next to the alert state file (e.g. alert_state.json)
+AVAILABILITY_FILE_NAME = "data_availability.json"
+
+INTRADAY_INTERVALS = ("1m", "5m", "15m")
+DAILY_INTERVAL = "1d"
+
+# Requests the plain cascade ("1m","5m","15m" twice each, then "1d") needs
+# before it reaches data at a given interval. Used to report savings.
+CASCADE_COST = {"1m": 1, "5m": 3, "15m": 5, "1d": 7}
+
+# An exchange is treated as "no intraday today" (holiday, outage) once this
+# many of its tickers came back daily-only and none delivered intraday bars.
+EXCHANGE_CLOSED_MIN_TICKERS = 3
+
+# A "no intraday bars" verdict is re-checked after this many seconds,
+# so a late-opening or resumed ticker is picked up again the same day.
+NO_INTRADAY_RECHECK_S = 2 * 3600
+
+# Common crypto quote currencies on Yahoo ("BTC-USD", "ETH-EUR", ...)
+_CRYPTO_QUOTES = {"USD", "EUR", "GBP", "USDT", "BTC", "ETH"}
+
+
+def exchange_of(ticker: str) -> str:
+    """
+    Derive a coarse exchange key from a Yahoo ticker symbol.
+
+    Examples:
+        "SAP.DE"  -> "DE"
+        "AAPL"    -> "US"
+        "^GDAXI"  -> "INDEX"
+        "BTC-USD" -> "CRYPTO"
+    """
+    if ticker.startswith("^"):
+        return "INDEX"
+    if "-" in ticker and ticker.rsplit("-", 1)[1].upper() in _CRYPTO_QUOTES:
+        return "CRYPTO"
+    if "." in ticker:
+        return ticker.rsplit(".", 1)[1].upper()
+    return "US"
+
+
+class DataAvailability:
+    """
+    Remembers which price interval works for which ticker.
+
+    Persisted per trading day:
+        - intervals:   {ticker: interval} that last delivered data
+                       (kept across days, it rarely changes)
+        - no_intraday: {ticker: unix_ts} tickers seen without intraday bars today
+        - intraday_exchanges: exchanges that delivered intraday bars today
+
+    Used by `market.get_open_and_last` to go straight to the right
+    interval instead of walking the full "1m" → "5m" → "15m" → "1d" cascade.
+    """
+
+    def __init__(self, path: Path, day: str):
+        self.path = Path(path)
+        self.day = day
+        self.intervals: Dict[str, str] = {}
+        self.no_intraday: Dict[str, float] = {}
+        self.intraday_exchanges: set[str] = set()
+        self.requests_made = 0
+        self.requests_saved = 0
+        self._lock = threading.Lock()  # record() is called from worker threads
+        self._load()
+
+    def _load(self) -> None:
+        """Load the model from disk; per-day facts are dropped on a new day."""
+        if not self.path.exists():
+            return
+        try:
+            data: Dict[str, Any] = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Could not load data availability (%s). Starting fresh.", e)
+            return
+        self.intervals = dict(data.get("intervals", {}))
+        if data.get("day") == self.day:
+            self.no_intraday = {k: float(v) for k, v in data.get("no_intraday", {}).items()}
+            self.intraday_exchanges = set(data.get("intraday_exchanges", []))
+
+    def save(self) -> None:
+        """Persist the model and log how many requests it saved since the last save."""
+        data = {
+            "day": self.day,
+            "intervals": self.intervals,
+            "no_intraday": self.no_intraday,
+            "intraday_exchanges": sorted(self.intraday_exchanges),
+        }
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
+        logger.info(
+            "Data availability: %d price request(s) made, %d saved vs. interval cascade "
+            "(%d ticker(s) without intraday bars today).",
+            self.requests_made, self.requests_saved, len(self.no_intraday),
+        )
+        self.requests_made = self.requests_saved = 0
+
+    def _known_daily_only(self, ticker: str) -> bool:
+        """True if the ticker recently came back without intraday bars."""
+        seen = self.no_intraday.get(ticker)
+        return seen is not None and time.time() - seen < NO_INTRADAY_RECHECK_S
+
+    def exchange_closed(self, exchange: str) -> bool:
+        """True if the exchange delivered no intraday bars at all today."""
+        if exchange in self.intraday_exchanges:
+            return False
+        misses = sum(1 for tk in self.no_intraday if exchange_of(tk) == exchange and self._known_daily_only(tk))
+        return misses >= EXCHANGE_CLOSED_MIN_TICKERS
+
+    def skip_intraday(self, ticker: str) -> bool:
+        """True if intraday requests for this ticker are known to come back empty today."""
+        return self._known_daily_only(ticker) or self.exchange_closed(exchange_of(ticker))
+
+    def plan(self, ticker: str) -> List[str]:
+        """
+        Return the intervals to try for a ticker, best candidate first.
+
+        Known daily-only tickers (or tickers on an exchange without intraday
+        data today) go straight to "1d". Otherwise the interval that worked
+        last time is tried first, followed by the remaining cascade.
+        """
+        if self.skip_intraday(ticker):
+            return [DAILY_INTERVAL]
+        preferred = self.intervals.get(ticker)
+        order = list(INTRADAY_INTERVALS)
+        if preferred in order:
+            order.remove(preferred)
+            order.insert(0, preferred)
+        return order + [DAILY_INTERVAL]
+
+    def record(self, ticker: str, interval: str, requests: int | None = None) -> None:
+        """
+        Record which interval delivered data for a ticker.
+
+        Args:
+            ticker: Ticker symbol.
+            interval: Interval that returned data ("1m", ..., "1d").
+            requests: Requests spent on this ticker; None for batch hits
+                      (shared request, not counted per ticker).
+        """
+        with self._lock:
+            self._record(ticker, interval, requests)
+
+    def _record(self, ticker: str, interval: str, requests: int | None) -> None:
+        """Unlocked part of `record`."""
+        if interval == DAILY_INTERVAL:
+            # Keep the first timestamp while the verdict is fresh, so the
+            # re-check after NO_INTRADAY_RECHECK_S actually happens.
+            if not self._known_daily_only(ticker):
+                self.no_intraday[ticker] = time.time()
+        else:
+            self.intervals[ticker] = interval
+            self.no_intraday.pop(ticker, None)
+            self.intraday_exchanges.add(exchange_of(ticker))
+
+        if requests is not None:
+            self.requests_made += requests
+            self.requests_saved += max(0, CASCADE_COST.get(interval, 0) - requests)
@@ -0,0 +1,244 @@
+from __future__ import annotations
+import logging
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+logger = logging.getLogger("stock-alerts")
+
+# Columns kept per bar (Yahoo OHLCV, timestamps in UTC)
+BAR_SCHEMA = pa.schema([
+    ("ts", pa.timestamp("ns", tz="UTC")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+])
+
+# Day directories are named after the trading day (ISO date)
+_DAY_DIR = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+_YF_COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+
+
+class BarStore:
+    """
+    Append-only local store of intraday (1m) bars per ticker and trading day.
+
+    Layout (Arrow IPC files, one per fetch that brought new bars):
+
+        <root>/<day>/<ticker>/000001.arrow
+        <root>/<day>/<ticker>/000002.arrow
+        ...
+
+    Segments are never rewritten. The day's opening price is the "open" of
+    the first stored bar and therefore pinned once the first segment exists.
+    Only completed bars of the store's `day` (exchange-local date of the
+    bar) are stored: before the open Yahoo returns the previous session,
+    which must neither land under today nor pin today's open. The newest
+    bar of a response is still forming, so it is used for the latest price
+    but fetched again next time.
+
+    Once a day is closed, `maintain` merges its segments into one file per
+    ticker (<root>/<day>/<ticker>.arrow) and drops days beyond the retention.
+    """
+
+    def __init__(self, root: Path, day: str):
+        self.root = Path(root)
+        self.day = day
+        # Per ticker: {"open": float, "last_ts": Timestamp, "last_close": float, "segments": int}
+        self._meta: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, ticker: str) -> Path:
+        return self.root / self.day / ticker.replace("/", "_")
+
+    def _load_meta(self, ticker: str) -> Dict:
+        """Read pinned open and last bar from the first/last segment (once per ticker)."""
+        with self._lock:
+            meta = self._meta.get(ticker)
+        if meta is not None:
+            return meta
+
+        meta = {"open": None, "last_ts": None, "last_close": None, "segments": 0}
+        d = self._dir(ticker)
+        segments = sorted(d.glob("*.arrow")) if d.exists() else []
+        if segments:
+            try:
+                first = _read_segment(segments[0])
+                last = first if len(segments) == 1 else _read_segment(segments[-1])
+                meta.update(
+                    open=float(first.column("open")[0].as_py()),
+                    last_ts=pd.Timestamp(last.column("ts")[-1].as_py()),
+                    last_close=float(last.column("close")[-1].as_py()),
+                )
+            except Exception as e:
+                logger.warning("Bar store for %s unreadable (%s); ignoring stored bars.", ticker, e)
+            # Continue numbering after the highest existing segment
+            meta["segments"] = max((int(p.stem) for p in segments if p.stem.isdigit()), default=0)
+
+        with self._lock:
+            self._meta.setdefault(ticker, meta)
+            return self._meta[ticker]
+
+    def last_timestamp(self, ticker: str) -> Optional[pd.Timestamp]:
+        """Timestamp (UTC) of the newest stored bar, or None if nothing is stored today."""
+        return self._load_meta(ticker)["last_ts"]
+
+    def fetch_start(self, ticker: str) -> Optional[pd.Timestamp]:
+        """First bar timestamp to request (just after the newest stored bar), or None for a full day."""
+        last_ts = self.last_timestamp(ticker)
+        return None if last_ts is None else last_ts + pd.Timedelta(minutes=1)
+
+    def update(self, ticker: str, df: Optional[pd.DataFrame]) -> Optional[Tuple[float, float]]:
+        """
+        Append new completed bars from a yfinance frame and return prices.
+
+        Args:
+            ticker: Ticker symbol.
+            df: yfinance OHLCV frame (index = bar timestamps), may be None/empty.
+
+        Returns:
+            (open_today, last_price): pinned open of the day and the latest
+            close (from `df` if it has bars of the day, else the newest
+            stored bar); None if neither `df` nor the store has any bars
+            of the day.
+        """
+        meta = self._load_meta(ticker)
+        bars = _normalize(df, day=self.day)
+
+        if bars.empty:
+            if meta["open"] is None:
+                return None
+            return meta["open"], meta["last_close"]
+
+        last_price = float(bars["close"].iloc[-1])
+
+        # Only bars newer than what we have, and never the still-forming last bar
+        new = bars.iloc[:-1]
+        if meta["last_ts"] is not None:
+            new = new[new["ts"] > meta["last_ts"]]
+
+        if not new.empty:
+            with self._lock:
+                seq = meta["segments"] + 1
+                d = self._dir(ticker)
+                d.mkdir(parents=True, exist_ok=True)
+                table = pa.Table.from_pandas(new, schema=BAR_SCHEMA, preserve_index=False)
+                with ipc.new_file(str(d / f"{seq:06d}.arrow"), BAR_SCHEMA) as writer:
+                    writer.write_table(table)
+                meta["segments"] = seq
+                if meta["open"] is None:
+                    meta["open"] = float(new["open"].iloc[0])
+                meta["last_ts"] = pd.Timestamp(new["ts"].iloc[-1])
+                meta["last_close"] = float(new["close"].iloc[-1])
+
+        # Open is pinned once stored; before that the response's first bar is the open
+        open_today = meta["open"] if meta["open"] is not None else float(bars["open"].iloc[0])
+        return open_today, last_price
+
+    def read_day(self, ticker: str) -> pd.DataFrame:
+        """Load all stored bars of the day for a ticker (for analysis)."""
+        d = self._dir(ticker)
+        compacted = d.parent / f"{d.name}.arrow"
+        if compacted.exists():
+            return _read_segment(compacted).to_pandas()
+        segments = sorted(d.glob("*.arrow")) if d.exists() else []
+        if not segments:
+            return pd.DataFrame(columns=BAR_SCHEMA.names)
+        return pa.concat_tables([_read_segment(p) for p in segments]).to_pandas()
+
+
+def maintain(root: Path, today: str, keep_days: int = 5) -> None:
+    """
+    Compact closed trading days and drop old ones.
+
+    - Only the newest `keep_days` day directories (today included) are
+      kept; a day directory exists only for days with stored bars, so this
+      counts trading days.
+    - In every kept day before `today`, each ticker's segments are merged
+      into one file <day>/<ticker>.arrow. It is written under a temporary
+      name and renamed, then the segment directory is removed. A segment
+      directory left next to its merged file (crash in between) is removed
+      on the next call.
+
+    Args:
+        root: Bar store root directory.
+        today: Current trading day (ISO date); its segments are left alone.
+        keep_days: Number of trading days to keep.
+    """
+    root = Path(root)
+    if not root.exists():
+        return
+    days = sorted(d for d in root.iterdir() if d.is_dir() and _DAY_DIR.match(d.name))
+    keep = max(1, int(keep_days))
+    old, days = days[:-keep], days[-keep:]
+    for d in old:
+        shutil.rmtree(d, ignore_errors=True)
+
+    compacted = 0
+    for d in days:
+        if d.name >= today:
+            continue
+        for ticker_dir in sorted(p for p in d.iterdir() if p.is_dir()):
+            compacted += _compact(ticker_dir)
+    if old or compacted:
+        logger.info(
+            "Bar store: %d closed ticker-day(s) compacted, %d day(s) beyond retention removed.",
+            compacted, len(old),
+        )
+
+
+def _compact(ticker_dir: Path) -> int:
+    """Merge one ticker's segments of a closed day into <day>/<ticker>.arrow; 1 if merged."""
+    target = ticker_dir.parent / f"{ticker_dir.name}.arrow"
+    if target.exists():
+        # Merged before; the segment directory is a leftover
+        shutil.rmtree(ticker_dir, ignore_errors=True)
+        return 0
+    segments = sorted(ticker_dir.glob("*.arrow"))
+    if segments:
+        table = pa.concat_tables([_read_segment(p) for p in segments])
+        tmp = target.with_name(target.name + ".tmp")
+        with ipc.new_file(str(tmp), BAR_SCHEMA) as writer:
+            writer.write_table(table)
+        os.replace(tmp, target)
+    shutil.rmtree(ticker_dir, ignore_errors=True)
+    return 1 if segments else 0
+
+
+def _read_segment(path: Path) -> pa.Table:
+    """Read one Arrow IPC segment into memory."""
+    with pa.OSFile(str(path), "rb") as source:
+        return ipc.open_file(source).read_all()
+
+
+def _normalize(df: Optional[pd.DataFrame], day: Optional[str] = None) -> pd.DataFrame:
+    """
+    Convert a yfinance OHLCV frame into BAR_SCHEMA columns, sorted, without NaN bars.
+
+    Args:
+        df: yfinance OHLCV frame; its index is in the exchange's timezone.
+        day: Keep only bars of this exchange-local date (ISO date).
+    """
+    if df is None or df.empty or "Open" not in df or "Close" not in df:
+        return pd.DataFrame(columns=BAR_SCHEMA.names)
+    if day is not None:
+        df = df[pd.DatetimeIndex(df.index).strftime("%Y-%m-%d") == day]
+    out = df.rename(columns=_YF_COLUMNS)
+    out = out[[c for c in BAR_SCHEMA.names if c in out.columns]].copy()
+    for col in ("high", "low", "volume"):
+        if col not in out:
+            out[col] = float("nan")
+    out = out.dropna(subset=["open", "close"])
+    out.insert(0, "ts", pd.to_datetime(out.index, utc=True).astype("datetime64[ns, UTC]"))
+    out = out.astype({c: "float64" for c in ("open", "high", "low", "close", "volume")})
+    return out.sort_values("ts").reset_index(drop=True)[BAR_SCHEMA.names]
@@ -0,0 +1,240 @@
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
+# Default settings; overridable via the "breakers" config section.
+BREAKER_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "file": "breakers.json",   # Persisted between runs (empty/None = memory only)
+    "failures": 5,             # Consecutive failures/timeouts that open a circuit
+    "open_minutes": 15,        # Fail fast for this long, then let one probe through
+    "max_open_minutes": 120,   # Each failed probe doubles the open time up to this
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(RuntimeError):
+    """The upstream's circuit is open; the request was not sent."""
+
+    def __init__(self, name: str, retry_at: float):
+        self.name = name
+        self.retry_at = retry_at
+        if retry_at > time.time():
+            super().__init__(f"{name} circuit open until {time.strftime('%H:%M:%S', time.localtime(retry_at))}")
+        else:
+            super().__init__(f"{name} circuit half-open, waiting for the probe request")
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit of one upstream.
+
+    - closed: requests pass; `failures` consecutive failures open it.
+    - open: requests fail fast (`CircuitOpen`) until `open_s` elapsed.
+    - half-open: exactly one probe request passes. Success closes the
+      circuit, failure opens it again for twice as long (≤ `max_open_s`).
+
+    Times are wall-clock, so the state can be persisted between cron runs.
+    """
+
+    def __init__(self, name: str, failures: int = 5, open_s: float = 900.0, max_open_s: float = 7200.0):
+        self.name = name
+        self.threshold = max(1, int(failures))
+        self.base_open_s = max(1.0, float(open_s))
+        self.max_open_s = max(self.base_open_s, float(max_open_s))
+        self.state = CLOSED
+        self.failures = 0
+        self.open_s = self.base_open_s
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def retry_at(self) -> float:
+        """Wall time at which an open circuit lets a probe through."""
+        return self.opened_at + self.open_s
+
+    def is_open(self, now: Optional[float] = None) -> bool:
+        """True while requests would fail fast (open and not yet due for a probe)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return (self.state == OPEN and now < self.retry_at) or (self.state == HALF_OPEN and self._probing)
+
+    def allow(self) -> None:
+        """
+        Let a request through or fail fast.
+
+        Raises:
+            CircuitOpen: If the circuit is open (or a half-open probe is
+                already in flight).
+        """
+        now = time.time()
+        with self._lock:
+            if self.state == OPEN and now >= self.retry_at:
+                self.state = HALF_OPEN
+                self._probing = False
+                logger.info("%s circuit half-open: sending one probe request.", self.name)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpen(self.name, self.retry_at)
+
+    def record(self, ok: bool) -> bool:
+        """
+        Record the outcome of an allowed request.
+
+        Returns:
+            True if the state changed (worth persisting).
+        """
+        with self._lock:
+            if ok:
+                if self.state == CLOSED and self.failures == 0:
+                    return False
+                if self.state != CLOSED:
+                    logger.info("%s circuit closed: upstream answered again.", self.name)
+                self.state, self.failures, self.open_s, self._probing = CLOSED, 0, self.base_open_s, False
+                return True
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # Probe failed: stay away twice as long
+                self.open_s = min(self.max_open_s, self.open_s * 2)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.threshold:
+                self._open()
+            return True
+
+    def _open(self) -> None:
+        """Open the circuit now (lock held)."""
+        self.state, self.opened_at, self._probing = OPEN, time.time(), False
+        logger.warning(
+            "%s circuit open after %d consecutive failure(s): failing fast for %.0f min.",
+            self.name, self.failures, self.open_s / 60,
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        with self._lock:
+            # A probe in flight is not persisted: the next run probes again
+            state = OPEN if self.state == HALF_OPEN else self.state
+            return {"state": state, "failures": self.failures, "opened_at": self.opened_at, "open_s": self.open_s}
+
+    def restore(self, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self.state = data.get("state", CLOSED) if data.get("state") in (CLOSED, OPEN) else CLOSED
+            self.failures = int(data.get("failures", 0))
+            self.opened_at = float(data.get("opened_at", 0.0))
+            self.open_s = min(self.max_open_s, max(self.base_open_s, float(data.get("open_s", self.base_open_s))))
+
+    def describe(self) -> str:
+        with self._lock:
+            if self.state == CLOSED:
+                return f"{self.name} closed ({self.failures} failure(s))"
+            return f"{self.name} {self.state} (probe at {time.strftime('%H:%M:%S', time.localtime(self.retry_at))})"
+
+
+class BreakerBoard:
+    """The circuit breakers of all upstreams, persisted as one JSON file."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        failures: int = 5,
+        open_s: float = 900.0,
+        max_open_s: float = 7200.0,
+    ):
+        self.path = Path(path) if path else None
+        self._settings = dict(failures=failures, open_s=open_s, max_open_s=max_open_s)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._saved: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Could not load circuit breakers (%s). Starting closed.", e)
+            return
+        for name, entry in data.items():
+            self.get(name).restore(entry)
+        self._saved = {name: b.to_json() for name, b in self._breakers.items()}
+        opened = [b.describe() for b in self._breakers.values() if b.state != CLOSED]
+        if opened:
+            logger.info("Circuit breakers from the last run: %s", " | ".join(opened))
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Breaker of an upstream (created closed on first use)."""
+        with self._lock:
+            b = self._breakers.get(name)
+            if b is None:
+                b = self._breakers[name] = CircuitBreaker(name, **self._settings)
+            return b
+
+    def save(self) -> None:
+        """Write all breakers to disk (atomic) if any changed."""
+        with self._lock:
+            data = {name: b.to_json() for name, b in self._breakers.items()}
+        if not self.path or data == self._saved:
+            return
+        atomic_write_text(self.path, json.dumps(data, indent=2))
+        self._saved = data
+
+    def describe(self) -> str:
+        """Summary of the circuits that are not closed ("" if all are)."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return " | ".join(b.describe() for b in breakers if b.state != CLOSED)
+
+
+_board: Optional[BreakerBoard] = BreakerBoard()
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> Optional[BreakerBoard]:
+    """
+    (Re)create the process-wide breakers from the "breakers" config section
+    (restoring their state from the last run).
+
+    Returns:
+        The breakers, or None if disabled (requests are never short-circuited).
+    """
+    global _board
+    cfg = {**BREAKER_DEFAULTS, **(cfg or {})}
+    _board = None
+    if cfg.get("enabled"):
+        _board = BreakerBoard(
+            path=cfg.get("file") or None,
+            failures=int(cfg["failures"]),
+            open_s=float(cfg["open_minutes"]) * 60,
+            max_open_s=float(cfg["max_open_minutes"]) * 60,
+        )
+    return _board
+
+
+def get_board() -> Optional[BreakerBoard]:
+    """Return the process-wide breakers (None if disabled)."""
+    return _board
+
+
+def get_breaker(name: str) -> Optional[CircuitBreaker]:
+    """Breaker of an upstream (None if disabled)."""
+    return _board.get(name) if _board is not None else None
+
+
+def is_open(name: str) -> bool:
+    """True if requests to the upstream currently fail fast."""
+    b = get_breaker(name)
+    return b is not None and b.is_open()
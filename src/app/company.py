@@ -1,13 +1,38 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 import json
+import logging
+import threading
 import time
 import yfinance as yf
 
+from .concurrency import upstream
+from .breaker import CircuitOpen
+from .ratelimit import is_rate_limit
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
 CACHE_FILE = Path("company_cache.json")
 
+# Default settings; overridable via the "company" config section.
+COMPANY_DEFAULTS: Dict[str, Any] = {
+    "file": str(CACHE_FILE),    # Metadata cache (filled by prefetch-meta)
+    "fetch_on_alert": False,    # Query Yahoo on a cache miss while alerting
+    "fill_misses": True,        # Look up names that missed the cache at the end of the run
+    "failure_ttl_hours": 24,    # Don't look up again a symbol Yahoo had no data for within this time
+    "prefetch_workers": 8,      # Worker threads for prefetch-meta
+}
+
+_settings: Dict[str, Any] = dict(COMPANY_DEFAULTS)
+
+# Symbols that fell back to the base ticker in this run (see `fill_misses`)
+_misses: set = set()
+_misses_lock = threading.Lock()
+
 # Common legal suffixes often found in company names,
 # which we remove to get a cleaner keyword (e.g., "Apple Inc." -> "Apple").
 LEGAL_SUFFIXES = {
@@ -35,19 +60,77 @@ class CompanyMeta:
     base_ticker: str
 
 
-def _load_cache() -> Dict[str, Any]:
-    """Load cached company metadata from JSON file."""
-    if CACHE_FILE.exists():
-        try:
-            return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+class CompanyRepository:
+    """
+    In-process store of company metadata backed by `company_cache.json`.
+
+    - The file is read once (on first lookup), lookups are served from memory.
+    - New entries are collected and written in one batch by `save()`
+      (atomic rename), normally at the end of a run.
+    - Symbols Yahoo had no data for are stored as {"failed_at": <unix time>}
+      (see `_failed_recently`), so they are not looked up again every run.
+    """
+
+    def __init__(self, path: Path = CACHE_FILE):
+        self.path = Path(path)
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the cache file on first use (lock held)."""
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                try:
+                    self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+                except Exception as e:
+                    logger.warning("Could not load company cache (%s). Starting empty.", e)
+        return self._entries
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Cached entry for `symbol`, or None."""
+        with self._lock:
+            return self._load().get(symbol)
+
+    def put(self, symbol: str, entry: Dict[str, Any]) -> None:
+        """Add/replace an entry in memory; written by the next `save()`."""
+        with self._lock:
+            self._load()[symbol] = entry
+            self._pending += 1
+
+    def save(self) -> None:
+        """Write all entries to disk (atomic) if new ones were added since the last save."""
+        with self._lock:
+            if not self._pending or self._entries is None:
+                return
+            data = json.dumps(self._entries, ensure_ascii=False, indent=2)
+            pending, self._pending = self._pending, 0
+        atomic_write_text(self.path, data)
+        logger.info("Company cache: saved %d new entr%s.", pending, "y" if pending == 1 else "ies")
+
+
+_repository = CompanyRepository()
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> CompanyRepository:
+    """Apply the "company" config section and (re)create the process-wide repository."""
+    global _repository, _settings
+    _settings = {**COMPANY_DEFAULTS, **(cfg or {})}
+    _repository = CompanyRepository(Path(_settings["file"]))
+    return _repository
 
 
-def _save_cache(cache: Dict[str, Any]) -> None:
-    """Save company metadata to local cache file."""
-    CACHE_FILE.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
+def get_repository() -> CompanyRepository:
+    """Return the process-wide company metadata repository."""
+    return _repository
+
+
+def _failed_recently(entry: Optional[Dict[str, Any]]) -> bool:
+    """True if `entry` records a failed lookup younger than `company.failure_ttl_hours`."""
+    if entry is None or "failed_at" not in entry:
+        return False
+    return time.time() - float(entry["failed_at"]) < float(_settings["failure_ttl_hours"]) * 3600
 
 
 def _strip_legal_suffixes(name: str) -> str:
@@ -80,7 +163,7 @@ def _base_ticker(symbol: str) -> str:
     return symbol
 
 
-def _fetch_yf_info(symbol: str, retries: int = 2, delay: float = 0.4) -> Dict[str, Any]:
+def _fetch_yf_info(symbol: str, retries: int = 2, delay: float = 0.4) -> Optional[Dict[str, Any]]:
     """
     Fetch company information from Yahoo Finance.
 
@@ -90,48 +173,36 @@ def _fetch_yf_info(symbol: str, retries: int = 2, delay: float = 0.4) -> Dict[st
         delay (float): Delay between retries in seconds.
 
     Returns:
-        dict: Yahoo Finance info dictionary (may be empty if lookup fails).
+        dict: Yahoo Finance info dictionary (empty if Yahoo has no data for
+        the symbol), or None if the lookup was cut short by a rate limit or
+        an open circuit (worth retrying later).
     """
     last_exc = None
     for _ in range(retries + 1):
         try:
             t = yf.Ticker(symbol)
             # Depending on yfinance version, prefer .get_info() over .info
-            info = t.get_info() if hasattr(t, "get_info") else getattr(t, "info", {})
+            with upstream("yahoo"):
+                info = t.get_info() if hasattr(t, "get_info") else getattr(t, "info", {})
             if info:
                 return info
         except Exception as e:
             last_exc = e
+            if isinstance(e, CircuitOpen):
+                logger.debug("Company info for %s skipped: %s", symbol, e)
+                return None
+            if is_rate_limit(e):
+                # Retrying right away only prolongs the throttling; the limiter slows down
+                logger.warning("Yahoo rate limit while fetching company info for %s.", symbol)
+                return None
             time.sleep(delay)
+    if last_exc is not None:
+        logger.debug("Company info lookup failed for %s: %s", symbol, last_exc)
     return {}
 
 
-def get_company_meta(symbol: str) -> CompanyMeta:
-    """
-    Retrieve company metadata (name, base ticker, etc.) with caching and fallbacks.
-
-    Process:
-    - Check local cache first (fast).
-    - If not cached, query Yahoo Finance for company info.
-    - Clean up the name (remove suffixes).
-    - Fallback to base ticker if no company name found.
-    - Save results to cache for later use.
-
-    Returns:
-        CompanyMeta: Structured metadata for the given symbol.
-    """
-    cache = _load_cache()
-    if symbol in cache:
-        c = cache[symbol]
-        return CompanyMeta(
-            ticker=symbol,
-            name=c.get("name"),
-            raw_name=c.get("raw_name"),
-            source=c.get("source", "cache"),
-            base_ticker=c.get("base_ticker", _base_ticker(symbol))
-        )
-
-    info = _fetch_yf_info(symbol)
+def _meta_from_info(symbol: str, info: Dict[str, Any]) -> CompanyMeta:
+    """Build CompanyMeta from a Yahoo Finance info dict (base ticker if no name is found)."""
     raw_name = None
     source = "fallback"
 
@@ -151,7 +222,7 @@ def get_company_meta(symbol: str) -> CompanyMeta:
         raw_name = clean
         source = "base_ticker"
 
-    meta = CompanyMeta(
+    return CompanyMeta(
         ticker=symbol,
         name=clean,
         raw_name=raw_name,
@@ -159,17 +230,155 @@ def get_company_meta(symbol: str) -> CompanyMeta:
         base_ticker=_base_ticker(symbol),
     )
 
-    # Cache for future use
-    cache[symbol] = {
+
+def _cache_entry(meta: CompanyMeta) -> Dict[str, Any]:
+    """Cache representation of CompanyMeta (without the ticker key)."""
+    return {
         "name": meta.name,
         "raw_name": meta.raw_name,
         "source": meta.source,
         "base_ticker": meta.base_ticker,
     }
-    _save_cache(cache)
+
+
+def get_company_meta(symbol: str, fetch: Optional[bool] = None) -> CompanyMeta:
+    """
+    Retrieve company metadata (name, base ticker, etc.) with caching and fallbacks.
+
+    Process:
+    - Check the in-memory cache first (`company_cache.json`, loaded once).
+    - If not cached and fetching is allowed, query Yahoo Finance for
+      company info, clean up the name (remove suffixes) and add the result
+      to the cache (saved at the end of the run).
+    - Otherwise fall back to the base ticker without any request. The
+      miss is remembered and looked up at the end of the run
+      (`fill_misses`) unless a lookup failed within
+      `company.failure_ttl_hours`; `python main.py prefetch-meta` fills
+      the cache for the whole watchlist ahead of time.
+
+    Args:
+        symbol (str): Ticker symbol.
+        fetch (Optional[bool]): Query Yahoo Finance on a cache miss;
+            defaults to the `company.fetch_on_alert` setting.
+
+    Returns:
+        CompanyMeta: Structured metadata for the given symbol.
+    """
+    repo = get_repository()
+    c = repo.get(symbol)
+    if _failed_recently(c):
+        return _meta_from_info(symbol, {})
+    if c is not None and "failed_at" not in c:
+        return CompanyMeta(
+            ticker=symbol,
+            name=c.get("name"),
+            raw_name=c.get("raw_name"),
+            source=c.get("source", "cache"),
+            base_ticker=c.get("base_ticker", _base_ticker(symbol))
+        )
+
+    if not (_settings["fetch_on_alert"] if fetch is None else fetch):
+        logger.debug("No cached company metadata for %s; using base ticker (run prefetch-meta).", symbol)
+        with _misses_lock:
+            _misses.add(symbol)
+        return _meta_from_info(symbol, {})
+
+    meta = _meta_from_info(symbol, _fetch_yf_info(symbol) or {})
+    # Cache for future use (written in one batch at the end of the run)
+    repo.put(symbol, _cache_entry(meta))
     return meta
 
 
+def prefetch_company_meta(symbols: Iterable[str], max_workers: int = 8) -> Dict[str, int]:
+    """
+    Resolve metadata for all `symbols` not yet cached and save the cache.
+
+    Lookups run on a thread pool of `max_workers`; Yahoo requests are
+    additionally bounded by the "yahoo" upstream limit. Symbols for which
+    Yahoo returned no data are counted as failures and cached as such
+    (see `_failed_recently`): runs skip them for `company.failure_ttl_hours`,
+    an explicit prefetch tries them again. Lookups cut short by a rate
+    limit or an open circuit are failures, but not cached.
+
+    Args:
+        symbols: Ticker symbols (duplicates are ignored).
+        max_workers: Worker threads.
+
+    Returns:
+        dict: {"hits": already cached, "misses": fetched and cached,
+               "failures": no data from Yahoo}
+    """
+    repo = get_repository()
+    stats = {"hits": 0, "misses": 0, "failures": 0}
+    todo = []
+    for symbol in dict.fromkeys(symbols):
+        entry = repo.get(symbol)
+        if entry is not None and "failed_at" not in entry:
+            stats["hits"] += 1
+        else:
+            todo.append(symbol)
+
+    def _resolve(symbol: str) -> bool:
+        info = _fetch_yf_info(symbol)
+        if info is None:
+            return False
+        if not info:
+            repo.put(symbol, {"failed_at": time.time()})
+            return False
+        repo.put(symbol, _cache_entry(_meta_from_info(symbol, info)))
+        return True
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(todo)))) as pool:
+            for symbol, ok in zip(todo, pool.map(_resolve, todo)):
+                if ok:
+                    stats["misses"] += 1
+                else:
+                    stats["failures"] += 1
+                    logger.warning("No company metadata from Yahoo for %s.", symbol)
+
+    repo.save()
+    return stats
+
+
+def missing(symbols: Iterable[str]) -> List[str]:
+    """Symbols without cached company metadata (order kept, duplicates dropped)."""
+    repo = get_repository()
+    entries = {s: repo.get(s) for s in dict.fromkeys(symbols)}
+    return [s for s, entry in entries.items() if entry is None or "failed_at" in entry]
+
+
+def fill_misses() -> int:
+    """
+    Handle the cache misses of this run (symbols that used the base ticker).
+
+    Logs one warning per run. With `company.fill_misses` the symbols are
+    looked up now (see `prefetch_company_meta`), so their next alert gets
+    the company name in its news query.
+
+    Returns:
+        int: Number of symbols resolved and cached.
+    """
+    with _misses_lock:
+        todo = sorted(_misses)
+        _misses.clear()
+    if not todo:
+        return 0
+    if not _settings["fill_misses"]:
+        logger.warning(
+            "%d ticker(s) without cached company metadata used the bare ticker in news queries (%s); "
+            "run `python main.py prefetch-meta` to fill the cache.",
+            len(todo), ",".join(todo),
+        )
+        return 0
+    logger.warning(
+        "%d ticker(s) without cached company metadata used the bare ticker in news queries (%s); "
+        "looking them up for the next alerts (`python main.py prefetch-meta` does this ahead of time).",
+        len(todo), ",".join(todo),
+    )
+    return prefetch_company_meta(todo, max_workers=int(_settings["prefetch_workers"]))["misses"]
+
+
 def auto_keywords(symbol: str) -> Tuple[str, list[str]]:
     """
     Generate a company search keyword set based on symbol.
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+from .breaker import get_breaker
+from .ratelimit import Call, limited
+
+# Upstream services the notifier talks to, with their default
+# maximum number of concurrent requests.
+UPSTREAM_DEFAULTS: Dict[str, int] = {
+    "yahoo": 4,        # yfinance (prices + company info)
+    "google_news": 4,  # Google News RSS + redirect resolution
+    "ntfy": 2,         # ntfy push server
+}
+
+_sizes: Dict[str, int] = dict(UPSTREAM_DEFAULTS)
+_limits: Dict[str, threading.BoundedSemaphore] = {
+    name: threading.BoundedSemaphore(n) for name, n in _sizes.items()
+}
+_limits_lock = threading.Lock()
+
+
+def configure(cfg_conc: Dict[str, Any]) -> None:
+    """
+    Set the per-upstream concurrency limits from the `concurrency` config section.
+
+    Args:
+        cfg_conc: Concurrency configuration, expected keys:
+            - "yahoo": int, max parallel Yahoo Finance requests
+            - "google_news": int, max parallel Google News requests
+            - "ntfy": int, max parallel ntfy requests
+    """
+    with _limits_lock:
+        for name, default in UPSTREAM_DEFAULTS.items():
+            n = max(1, int(cfg_conc.get(name, default)))
+            _sizes[name] = n
+            _limits[name] = threading.BoundedSemaphore(n)
+
+
+def limit(name: str) -> int:
+    """Return the configured concurrency limit for an upstream."""
+    return _sizes[name]
+
+
+@contextmanager
+def upstream(name: str) -> Iterator[Call]:
+    """
+    Hold one request slot for the given upstream while the block runs.
+
+    The slot also waits for the upstream's adaptive rate limit (see
+    `ratelimit`); report the response status on the yielded call so the
+    limiter can speed up or back off. Failures (exceptions, 429/5xx)
+    count towards the upstream's circuit breaker.
+
+    Raises:
+        breaker.CircuitOpen: If the upstream's circuit is open (nothing is sent).
+
+    Example:
+        >>> with upstream("ntfy") as call:
+        ...     r = requests.post(...)
+        ...     call.report(r.status_code, r.headers)
+    """
+    breaker = get_breaker(name)
+    if breaker is not None:
+        breaker.allow()
+    sem = _limits[name]
+    try:
+        with sem, limited(name, _sizes[name]) as call:
+            yield call
+    except BaseException:
+        if breaker is not None:
+            breaker.record(False)
+        raise
+    if breaker is not None:
+        breaker.record(call.ok)
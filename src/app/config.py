@@ -19,7 +19,27 @@ DEFAULTS: Dict[str, Any] = {
     },
     "tickers": ["AAPL"],               # Default ticker(s) to monitor
     "threshold_pct": 3.0,              # Default % threshold for alerts
-    "state_file": "alert_state.json",  # File to persist alert state (anti-spam)
+    "threshold_mode": "pct",           # "pct" (threshold_pct/thresholds) or "zscore" (volatility)
+    "zscore": {                        # threshold_mode "zscore": |Δ%| ≥ k × daily volatility
+        "k": 2.0,                      # Multiple of the std. dev. of daily returns
+        "window_days": 20,             # Rolling window (trading days)
+        "min_pct": 0.5,                # Lower bound of the resulting threshold (%)
+        "file": "daily_history.arrow"  # Cached daily closes (refreshed once per day)
+    },
+    "thresholds": {                    # Overrides of threshold_pct (ticker > group > default)
+        "groups": {},                  # {"indices": {"match": ["^*"], "pct": 1.5}, ...}
+        "tickers": {},                 # {"TSLA": {"up_pct": 6, "down_pct": 5}, "SAP.DE": 2.5}
+        "ladder": [1]                  # Alert levels as multiples of the threshold, e.g. [1, 2, 4]
+    },
+    "rearm": {                         # Anti-flapping after an alert
+        "factor": 1.0,                 # Re-arm below factor × threshold / ladder level (e.g. 0.7; 1 = at it)
+        "min_realert_minutes": 0       # No same-direction re-alert within this interval (0 = off)
+    },
+    "state_file": "alert_state.json",  # JSON alert state (anti-spam; json backend / migration source)
+    "state_store": {                   # Where the alert state is persisted
+        "backend": "sqlite",           # "sqlite" (WAL, row upserts) or "json" (state_file)
+        "db_file": "alert_state.db"    # SQLite database (sqlite backend)
+    },
     "market_hours": {                  # Market hours configuration
         "enabled": True,
         "tz": "Europe/Berlin",         # Default timezone
@@ -33,6 +53,84 @@ DEFAULTS: Dict[str, Any] = {
         "force_delta_pct": None,       # Simulate price changes
         "dry_run": False               # Dry-run: do not send actual notifications
     },
+    "bars": {                          # Local store of today's 1m bars (Arrow IPC)
+        "enabled": True,               # Only fetch bars newer than the last stored one
+        "dir": "bars",                 # Directory: <dir>/<day>/<ticker>/*.arrow
+        "keep_days": 5                 # Trading days kept (closed days compacted to <day>/<ticker>.arrow)
+    },
+    "daemon": {                        # Long-running mode (python main.py --daemon)
+        "interval_seconds": 60         # Seconds between monitoring cycles
+    },
+    "http": {                          # Pooled HTTP sessions (ntfy, Google News, redirects)
+        "pool_maxsize": 10,            # Keep-alive connections per host
+        "retries": 2,                  # Retries for GET/HEAD on connection errors
+        "backoff": 0.3,                # Backoff factor between retries
+        "timeouts": {                  # Per-host timeouts in seconds
+            "default": 10.0,
+            "news.google.com": 5.0,
+            "ntfy.sh": 20.0
+        }
+    },
+    "redirect_cache": {                # Google News link → original URL
+        "file": "redirect_cache.json", # Persisted between runs
+        "ttl_hours": 72,               # Lifetime of a resolved link
+        "negative_ttl_minutes": 30,    # Lifetime of a failed resolution
+        "max_entries": 5000            # LRU bound
+    },
+    "company": {                       # Company names for news queries
+        "file": "company_cache.json",  # Metadata cache (python main.py prefetch-meta)
+        "fetch_on_alert": False,       # Query Yahoo on a cache miss while alerting
+        "fill_misses": True,           # Look up names that missed the cache at the end of the run
+        "failure_ttl_hours": 24,       # Skip lookups Yahoo had no data for within this time
+        "prefetch_workers": 8          # Worker threads for prefetch-meta
+    },
+    "feed_cache": {                    # Google News RSS feeds (conditional GET)
+        "file": "feed_cache.json",     # Persisted between runs
+        "fresh_minutes": 10,           # Reuse cached headlines without any request
+        "max_age_hours": 24,           # Drop feeds not revalidated for this long
+        "max_entries": 500             # LRU bound (feed URLs)
+    },
+    "headline_dedup": {                # Drop near-duplicate headlines (MinHash/LSH on title shingles)
+        "enabled": True,
+        "file": "seen_headlines.json", # Headlines already sent per ticker, persisted between runs
+        "similarity": 0.6,             # Estimated Jaccard similarity from which titles count as the same story
+        "window_hours": 24,            # Suppress a story already sent for the same ticker for this long
+        "max_entries": 2000            # Bound of the seen-set (oldest go first)
+    },
+    "outbox": {                        # Durable queue of alert notifications
+        "enabled": True,               # Queue alerts, deliver in the background (False = send inline)
+        "dir": "outbox",               # One file per pending notification
+        "base_delay_s": 2.0,           # First retry delay (doubles per attempt, with jitter)
+        "max_delay_s": 300.0,          # Retry delay cap (alerts are never dropped)
+        "drain_seconds": 30.0          # Max wait for deliveries at the end of a run
+    },
+    "digest": {                        # Coalesce the alerts of a cycle into a few messages
+        "enabled": False,              # Off: one notification per ticker
+        "min_alerts": 4,               # Digest from this many alerts per cycle (fewer: single alerts)
+        "max_bytes": 3800,             # Body size cap per message (ntfy limit: 4096 bytes)
+        "max_messages": 3              # Per cycle; further tickers are listed by name
+    },
+    "breakers": {                      # Circuit breaker per upstream (Yahoo, Google News, ntfy)
+        "enabled": True,
+        "file": "breakers.json",       # State persisted between runs
+        "failures": 5,                 # Consecutive failures/timeouts that open a circuit
+        "open_minutes": 15,            # Fail fast for this long, then send one probe request
+        "max_open_minutes": 120        # Each failed probe doubles the open time up to this
+    },
+    "ratelimit": {                     # Adaptive per-upstream rate limits (token bucket + AIMD)
+        "enabled": True,
+        "increase": 0.5,               # +req/s per successful request
+        "decrease": 0.5,               # × rate and parallelism on 429/5xx (Retry-After honoured, ≤ 60 s)
+        "yahoo": {"rate": 10.0, "min_rate": 0.5, "max_rate": 50.0, "burst": 5},
+        "google_news": {"rate": 5.0, "min_rate": 0.2, "max_rate": 20.0, "burst": 5},
+        "ntfy": {"rate": 5.0, "min_rate": 0.2, "max_rate": 20.0, "burst": 5}
+    },
+    "concurrency": {                   # Parallel per-ticker processing
+        "max_workers": 8,              # Worker pool size (1 = serial)
+        "yahoo": 4,                    # Max parallel Yahoo Finance requests
+        "google_news": 4,              # Max parallel Google News requests
+        "ntfy": 2                      # Max parallel ntfy requests
+    },
 }
 
 
@@ -2,18 +2,42 @@ import datetime as dt
 from zoneinfo import ZoneInfo
 import logging
 from pathlib import Path
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Collection, Dict, List, Mapping, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 import requests
 
-from .market import get_open_and_last
+from . import http_client
+from .feed_cache import get_cache as get_feed_cache
+from .redirect_cache import get_cache as get_redirect_cache
+from .digest import build_digest, digest_settings
+from .market import get_open_and_last_many
 from .ntfy import notify_ntfy
-from .state import load_state, save_state
-from .company import auto_keywords
-from .news import fetch_headlines, build_query, filter_titles
+from .outbox import Outbox, get_outbox
+from .signals import TickerSignal, evaluate_watchlist, format_state, parse_state
+from .thresholds import ThresholdTable
+from .state import ALERT_HISTORY_FILE_NAME, AlertHistory, JsonStateStore, StateStore
+from .availability import DataAvailability, AVAILABILITY_FILE_NAME
+from .breaker import CircuitOpen, get_board as get_breakers, is_open as circuit_open
+from .barstore import BarStore, maintain as maintain_bars
+from .concurrency import upstream, configure as configure_concurrency
+from .logging_setup import grouped_logs
+from .metrics import timed
+from .ratelimit import describe as describe_rates
+from .company import auto_keywords, fill_misses as fill_company_misses, get_repository as get_company_repository
+from .news import fetch_headlines, build_query, filter_titles, dedupe_headlines, remember_headlines, get_seen_headlines
 
 logger = logging.getLogger("stock-alerts")
 
+# Hosts whose feed links are Google News redirects (overridable, e.g. for a local stand-in)
+GOOGLE_NEWS_HOSTS: Tuple[str, ...] = ("news.google.com",)
+# Headlines fetched per shown one, so near-duplicates can be dropped (`news.dedupe_headlines`)
+_DEDUP_CANDIDATES = 3
+
+# Data availability model and bar store of the current trading day (reused across cycles)
+_availability: Optional[DataAvailability] = None
+_bars: Optional[BarStore] = None
+
 
 def _ticker_to_query(ticker: str, override_name: str | None = None) -> str:
     """
@@ -42,6 +66,24 @@ def _ensure_https(u: str) -> str:
     return "https://" + u
 
 
+def _unwrap_google_news(link: str) -> Tuple[str, bool]:
+    """
+    Resolve what can be resolved from a feed link without any network I/O.
+
+    Returns:
+        (url, needs_redirect): the best URL known so far and whether it is
+        a Google News redirect link that still has to be followed.
+    """
+    link = _ensure_https(link)
+    p = urlparse(link)
+    if not any(host in p.netloc for host in GOOGLE_NEWS_HOSTS):
+        return link, False
+    qs = parse_qs(p.query)
+    if "url" in qs and qs["url"]:
+        return _ensure_https(qs["url"][0]), False
+    return link, True
+
+
 def _extract_original_url(link: str, *, resolve_redirects: bool = True, timeout: float = 3.0) -> str:
     """
     Try to extract the original article URL from Google News redirect links.
@@ -49,6 +91,7 @@ def _extract_original_url(link: str, *, resolve_redirects: bool = True, timeout:
     Strategy:
         1) If it's a news.google.com link and contains ?url=..., use that.
         2) Optionally resolve redirects via HEAD (fallback GET) to obtain the final URL.
+           Results (and failures) are cached, see `redirect_cache`.
         3) If all fails, return the input link.
 
     Args:
@@ -60,30 +103,47 @@ def _extract_original_url(link: str, *, resolve_redirects: bool = True, timeout:
         A best-effort "clean" URL pointing to the original source.
     """
     try:
-        link = _ensure_https(link)
-        p = urlparse(link)
-        if "news.google.com" in p.netloc:
-            qs = parse_qs(p.query)
-            if "url" in qs and qs["url"]:
-                return _ensure_https(qs["url"][0])
-
-            if resolve_redirects:
-                try:
-                    # HEAD first (cheap), some hosts require GET
-                    r = requests.head(link, allow_redirects=True, timeout=timeout)
-                    if r.url and r.url != link:
-                        return _ensure_https(r.url)
-                    if r.status_code in (403, 405):
-                        g = requests.get(link, allow_redirects=True, timeout=timeout, stream=True)
-                        if g.url and g.url != link:
-                            return _ensure_https(g.url)
-                except requests.RequestException:
-                    pass
+        link, needs_redirect = _unwrap_google_news(link)
+        if needs_redirect and resolve_redirects:
+            return get_redirect_cache().resolve(link, lambda: _follow_redirects(link, timeout))
         return link
     except Exception:
         return link
 
 
+def _follow_redirects(link: str, timeout: float) -> Optional[str]:
+    """
+    Follow a redirect link over the network (HEAD first, GET if refused).
+
+    Returns:
+        The final URL, or None if it could not be resolved.
+    """
+    try:
+        # HEAD first (cheap), some hosts require GET
+        with upstream("google_news") as call:
+            r = http_client.head(link, allow_redirects=True, timeout=timeout)
+            call.report(_first_hop_status(r), r.headers)
+        if r.url and r.url != link:
+            return _ensure_https(r.url)
+        if r.status_code in (403, 405):
+            # stream=True: only the final URL is needed, not the body
+            with upstream("google_news") as call, \
+                    http_client.get(link, allow_redirects=True, timeout=timeout, stream=True) as g:
+                call.report(_first_hop_status(g), g.headers)
+                final = g.url
+            if final and final != link:
+                return _ensure_https(final)
+    except (requests.RequestException, CircuitOpen):
+        pass
+    return None
+
+
+def _first_hop_status(r: Any) -> int:
+    """Status of the redirect link itself (Google), not of the publisher it led to."""
+    history = getattr(r, "history", None)
+    return history[0].status_code if history else r.status_code
+
+
 def _domain(url: str) -> str:
     """
     Extract a pretty domain (strip leading 'www.') from a URL for compact display.
@@ -95,7 +155,10 @@ def _domain(url: str) -> str:
         return url
 
 
-def _format_headlines(items: List[Dict[str, Any]]) -> str:
+def _format_headlines(
+    items: List[Dict[str, Any]],
+    resolve: Optional[Callable[[str], str]] = None,
+) -> str:
     """
     Build a compact Markdown block for headlines.
 
@@ -103,18 +166,24 @@ def _format_headlines(items: List[Dict[str, Any]]) -> str:
     - Mobile (ntfy apps): Markdown shows as plain text, so we also include
       a short, real URL line that remains clickable on phones.
 
+    Args:
+        items: News items as returned by `fetch_headlines`.
+        resolve: Maps a feed link to the original article URL
+                 (default: `_extract_original_url`).
+
     Returns:
         A multi-line string ready to embed into the notification body.
     """
     if not items:
         return ""
+    resolve = resolve or _extract_original_url
     lines: List[str] = []
     for it in items:
         title = (it.get("title") or "").strip()
         src   = f" — {it['source']}" if it.get("source") else ""
         link  = _ensure_https((it.get("link") or "").strip())
         if link:
-            orig = _extract_original_url(link)
+            orig = resolve(link)
             dom  = _domain(orig)
             # Markdown title link for web, plus a short real URL for mobile
             lines.append(f"• [{title}]({orig}){src}\n   🔗 {orig if len(orig) <= 60 else 'https://' + dom}")
@@ -155,29 +224,363 @@ def is_market_hours(cfg_mh: dict) -> bool:
     return int(cfg_mh["start_hour"]) <= n.hour < int(cfg_mh["end_hour"])
 
 
-def run_once(
-    tickers: List[str],
-    threshold_pct: float,
+def seconds_until_market_open(cfg_mh: dict) -> float:
+    """
+    Seconds until the configured market-hours window opens next.
+
+    Uses the same simple window as `is_market_hours` (no holidays).
+
+    Args:
+        cfg_mh: Market hours config (see `is_market_hours`).
+
+    Returns:
+        0.0 if the window is open right now (or the check is disabled),
+        otherwise the number of seconds until the next window start.
+    """
+    if is_market_hours(cfg_mh):
+        return 0.0
+    n = now_tz(cfg_mh["tz"])
+    start_hour = int(cfg_mh["start_hour"])
+    for days_ahead in range(8):
+        day = (n + dt.timedelta(days=days_ahead)).date()
+        if cfg_mh.get("days_mon_to_fri_only", True) and day.weekday() >= 5:
+            continue
+        opens = dt.datetime(day.year, day.month, day.day, start_hour, tzinfo=n.tzinfo)
+        if opens > n:
+            return (opens - n).total_seconds()
+    return 24 * 3600.0  # unreachable with a sane config; re-check in a day
+
+
+def _build_news_block(tk: str, news_cfg: dict) -> Tuple[str, Optional[str]]:
+    """
+    Fetch, filter and format news headlines for an alert.
+
+    Tries the primary language/country first and falls back to
+    `fallback_lang`/`fallback_country` if nothing usable was found.
+
+    Returns:
+        (headlines_block, click_url): Markdown block to append to the
+        notification body ("" if no news) and the original URL of the
+        first article (None if no news).
+    """
+    first_url_for_click = None
+    if circuit_open("google_news"):
+        # Fail fast: no feed requests, no redirect timeouts
+        logger.info("%s | Google News circuit open: alert without news.", tk)
+        return "", None
+
+    # Build a smarter query from company metadata and filter out false positives
+    company_name, req_kw = auto_keywords(tk)
+    q = build_query(company_name, tk)
+    limit = int(news_cfg.get("limit", 2))
+
+    items = fetch_headlines(
+        query=q,
+        limit=_DEDUP_CANDIDATES * limit,
+        lookback_hours=int(news_cfg.get("lookback_hours", 12)),
+        lang=news_cfg.get("lang", "de"),
+        country=news_cfg.get("country", "DE"),
+    )
+    items = dedupe_headlines(filter_titles(items, required_keywords=req_kw), tk, limit)
+
+    # Prepare a click target (open first article when tapping the notification)
+    if items:
+        cand = _ensure_https(items[0].get("link", ""))
+        first_url_for_click = _extract_original_url(cand)
+
+    news_text = _format_headlines(items)
+    if not news_text:
+        # Fallback: try en/US if DE results are weak or empty
+        items = fetch_headlines(
+            query=q,
+            limit=_DEDUP_CANDIDATES * limit,
+            lookback_hours=max(12, int(news_cfg.get("lookback_hours", 12))),
+            lang=news_cfg.get("fallback_lang", "en"),
+            country=news_cfg.get("fallback_country", "US"),
+        )
+        items = dedupe_headlines(filter_titles(items, required_keywords=req_kw), tk, limit)
+
+        if items and not first_url_for_click:
+            cand = _ensure_https(items[0].get("link", ""))
+            first_url_for_click = _extract_original_url(cand)
+
+        news_text = _format_headlines(items)
+
+    if news_text:
+        remember_headlines(items, tk)
+    headlines_block = "\n\n📰 News:\n" + news_text if news_text else ""
+    return headlines_block, first_url_for_click
+
+
+def _process_ticker(
+    sig: TickerSignal,
+    *,
     ntfy_server: str,
     ntfy_topic: str,
-    state_file: Path,
-    market_hours_cfg: dict,
     test_cfg: dict,
     news_cfg: dict,
+    history: Optional[AlertHistory] = None,
+    outbox: Optional[Outbox] = None,
+) -> Optional[str]:
+    """
+    Act on the evaluated signal of one ticker: send its alert or settle its state.
+
+    Runs on a worker thread when concurrency is enabled, so it must not
+    touch shared state: it only reads the signal and returns the new state
+    (the alert history is append-only and thread-safe).
+
+    Args:
+        sig: Row of the vectorized evaluation (see `signals.evaluate_watchlist`).
+        history: Optional alert event log; alerts and corridor resets are appended.
+        outbox: Optional durable outbox; alerts are queued there instead of
+            sent inline, and their state is applied once delivered
+            (see `_apply_deliveries`).
+
+    Returns:
+        The new state for the ticker, or None if it is unchanged (or the
+        alert was queued).
+
+    Raises:
+        RuntimeError: If no usable price is available for the ticker.
+    """
+    _log_signal(sig, test_cfg)
+    tk, direction, pct, open_px, last_px = sig.ticker, sig.direction, sig.pct, sig.open, sig.last
+
+    if sig.alert:
+        # Crossing the threshold (or a higher ladder level) for the first time since last reset → send alert
+        title, body = _alert_message(tk, direction, pct, open_px, last_px, level=sig.level)
+
+        headlines_block, first_url_for_click = "", None
+        if news_cfg.get("enabled", False):
+            with timed("news"):
+                headlines_block, first_url_for_click = _build_news_block(tk, news_cfg)
+
+        msg = body + headlines_block
+
+        if outbox is not None:
+            # Durable hand-off; the deliverer sends it (and retries) in the background
+            with timed("enqueue"):
+                outbox.enqueue(
+                    server=ntfy_server, topic=ntfy_topic, title=title, body=msg,
+                    alerts=[_outbox_alert(sig)], click_url=first_url_for_click,
+                )
+            logger.info("%s | Alert queued for delivery.", tk)
+            return None
+
+        # Send notification (Markdown on web; mobile gets real URLs + Click target)
+        with timed("notify"):
+            delivered = notify_ntfy(
+                ntfy_server,
+                ntfy_topic,
+                title,
+                msg,
+                dry_run=test_cfg.get("dry_run", False),
+                markdown=True,
+                click_url=first_url_for_click,
+            )
+
+        if history is not None:
+            history.append(tk, direction, pct, open_px, last_px, delivered=delivered)
+
+        # New state (direction + level) so we don't spam until price returns to corridor
+        return sig.state
+
+    new_state = _settle(sig)
+    if sig.reset and history is not None:
+        history.append(tk, new_state, pct, open_px, last_px)
+    return new_state
+
+
+def _send_digest(
+    sigs: List[TickerSignal],
+    digest_cfg: Dict[str, Any],
+    *,
+    ntfy_server: str,
+    ntfy_topic: str,
+    test_cfg: dict,
+    history: AlertHistory,
+    outbox: Optional[Outbox] = None,
+) -> List[Tuple[str, str]]:
+    """
+    Send the alerts of one cycle as digest messages (see `digest.build_digest`).
+
+    Digest lines carry no news, so a digest costs a few ntfy requests and
+    no Google News requests, however many tickers fire.
+
+    Returns:
+        (ticker, new_state) for every alert sent inline; empty with an
+        outbox (states are applied on delivery, see `_apply_deliveries`).
+    """
+    for sig in sigs:
+        _log_signal(sig, test_cfg)
+    messages = build_digest(sigs, int(digest_cfg["max_bytes"]), int(digest_cfg["max_messages"]))
+    logger.info("Digest: %d alert(s) in %d message(s).", len(sigs), len(messages))
+
+    applied: List[Tuple[str, str]] = []
+    for m in messages:
+        if outbox is not None:
+            with timed("enqueue"):
+                outbox.enqueue(
+                    server=ntfy_server, topic=ntfy_topic, title=m.title, body=m.body,
+                    alerts=[_outbox_alert(sig) for sig in m.signals],
+                )
+            continue
+        with timed("notify"):
+            delivered = notify_ntfy(
+                ntfy_server, ntfy_topic, m.title, m.body,
+                dry_run=test_cfg.get("dry_run", False), markdown=True,
+            )
+        for sig in m.signals:
+            history.append(sig.ticker, sig.direction, sig.pct, sig.open, sig.last, delivered=delivered)
+            applied.append((sig.ticker, sig.state))
+    return applied
+
+
+def _digest_batch(rows: List[TickerSignal], digest_cfg: Optional[Dict[str, Any]]) -> List[TickerSignal]:
+    """Alerting rows to coalesce into a digest (empty: send one alert per ticker)."""
+    alerting = [sig for sig in rows if sig.alert]
+    if digest_cfg is None or len(alerting) < int(digest_cfg["min_alerts"]):
+        return []
+    return alerting
+
+
+def _outbox_alert(sig: TickerSignal) -> Dict[str, Any]:
+    """Alert fields an outbox message carries (see `outbox.ALERT_FIELDS`)."""
+    return {
+        "ticker": sig.ticker, "state": sig.state, "direction": sig.direction,
+        "pct": sig.pct, "open": sig.open, "last": sig.last,
+    }
+
+
+def _apply_deliveries(
+    outbox: Outbox,
+    history: AlertHistory,
+    apply: Callable[[str, str], None],
+    current: Mapping[str, str],
+    evaluated: Collection[str] = (),
+    timeout: Optional[float] = None,
 ) -> None:
     """
-    Execute one monitoring cycle:
-      - Check market hours (with optional test bypass)
-      - For each ticker:
-          * Fetch open & last price (intraday preferred)
-          * Compute Δ% vs. open
-          * Trigger ntfy push if |Δ%| ≥ threshold (with de-bounce via state file)
-          * Optionally attach compact news headlines (with cleaned source URLs)
+    Wait for queued alerts to be delivered and apply their state.
 
-    Side effects:
-      - Sends an HTTP POST to ntfy (unless dry_run)
-      - Reads/writes the alert state JSON (anti-spam)
-      - Writes logs according to logging setup
+    Messages ntfy rejected for good (`OutboxMessage.rejected`) are applied
+    like an inline send that failed: the state is recorded, the history
+    marks the alert as not delivered.
+
+    `apply(ticker, state)` must record the state durably (journal) before
+    the message is acknowledged; undelivered alerts stay in the outbox.
+
+    A delivered state is stale, and only logged to the history, if
+    - this run's evaluation already recorded a newer state for the ticker
+      (`evaluated`; it saw the queued alert as sent, see
+      `Outbox.pending_states`, e.g. a corridor reset), or
+    - the ticker's `current` state is a higher level of the same direction
+      (an older message delivered after a newer one).
+
+    Args:
+        outbox: Outbox to drain.
+        history: Alert event log; every delivered alert is appended.
+        apply: Records a ticker's new state.
+        current: Live view of the tickers' states (including `apply`'s).
+        evaluated: Tickers whose state this run's evaluation changed.
+        timeout: Seconds to wait for deliveries (default: outbox setting).
+    """
+    for msg in sorted(outbox.drain(timeout), key=lambda m: m.id):
+        for a in msg.alerts:
+            tk = a["ticker"]
+            direction, level = parse_state(a["state"])
+            now_dir, now_level = parse_state(current.get(tk))
+            if tk in evaluated or (now_dir == direction and now_level > level):
+                logger.info("%s | Delivered alert (%s) is stale; keeping state %s.", tk, a["state"], current.get(tk, "none"))
+            else:
+                apply(tk, a["state"])
+            history.append(tk, a["direction"], a["pct"], a["open"], a["last"], delivered=msg.rejected is None)
+        outbox.ack(msg)
+
+
+def _log_signal(sig: TickerSignal, test_cfg: dict) -> None:
+    """
+    Log the evaluated prices of one ticker.
+
+    Raises:
+        RuntimeError: If no usable price is available for the ticker.
+    """
+    if sig.error:
+        raise RuntimeError(sig.error)
+    if test_cfg.get("enabled") and test_cfg.get("force_delta_pct") is not None:
+        logger.info("Test mode: forcing Δ%% (%.2f%%) for %s (was %.2f%%).", sig.pct, sig.ticker, sig.raw_pct)
+    logger.info("%s | Last=%.4f Open=%.4f Δ=%+.2f%%", sig.ticker, sig.last, sig.open, sig.pct)
+
+
+def _alert_message(
+    tk: str, direction: str, pct: float, open_px: float, last_px: float, level: int = 1
+) -> Tuple[str, str]:
+    """Build the (title, body) of an alert notification, without news (`level` > 1: ladder level)."""
+    arrow = "📈" if direction == "up" else "📉"
+    title = f"Stock Alert: {tk}" if level <= 1 else f"Stock Alert: {tk} (Level {level})"
+    body  = f"{arrow} {tk}: {pct:+.2f}% vs. Open\nAktuell: {last_px:.2f} | Open: {open_px:.2f}"
+    return title, body
+
+
+def _settle(sig: TickerSignal) -> Optional[str]:
+    """
+    Handle a ticker that does not trigger a new alert.
+
+    Returns:
+        "none" if the ticker re-entered the re-arm band (state reset), the
+        lowered state if it fell back below a higher ladder rung's re-arm
+        band (e.g. "up:2" → "up"), otherwise None (state unchanged).
+    """
+    tk, prev, up_pct, down_pct = sig.ticker, sig.prev, sig.up_pct, sig.down_pct
+    if sig.reset:
+        # Back in corridor: reset state so we can alert again on next breakout
+        logger.info("Back in corridor (%s): reset state %s → none", tk, prev)
+        return "none"
+    if sig.relevel:
+        # Back below a higher rung: re-arm it (and the ones above) for the next rise
+        new_state = format_state(prev.partition(":")[0], sig.held_level)
+        logger.info("%s | Below a higher ladder level again: re-arm %s → %s", tk, prev, new_state)
+        return new_state
+    if sig.suppressed:
+        logger.info("%s | Breakout (%s) within the minimum re-alert interval. Alert suppressed.", tk, sig.direction)
+        return None
+    if sig.direction == "none" and prev == "none":
+        if down_pct == up_pct:
+            logger.info("%s | No alert (< ±%.1f%%).", tk, up_pct)
+        else:
+            logger.info("%s | No alert (< +%.1f%% / -%.1f%%).", tk, up_pct, down_pct)
+        return None
+    if sig.direction == "none":
+        logger.info("%s | Already alerted (%s). Inside the threshold, waiting for the re-arm band.", tk, prev)
+        return None
+
+    logger.info("%s | Already alerted (%s). Waiting to re-enter corridor.", tk, prev)
+    return None
+
+
+def _rearm_settings(rearm_cfg: Optional[dict]) -> Tuple[float, float]:
+    """
+    Read (rearm_factor, min_realert_s) from the "rearm" config section.
+
+    Raises:
+        ValueError: If the factor is not in (0, 1] or the interval is negative.
+    """
+    rearm_cfg = rearm_cfg or {}
+    factor = float(rearm_cfg.get("factor", 1.0))
+    minutes = float(rearm_cfg.get("min_realert_minutes", 0))
+    if not 0 < factor <= 1:
+        raise ValueError(f"rearm.factor must be in (0, 1] (got {factor})")
+    if minutes < 0:
+        raise ValueError(f"rearm.min_realert_minutes must be ≥ 0 (got {minutes})")
+    return factor, minutes * 60
+
+
+def _job_start(tickers: List[str], threshold_pct: float, market_hours_cfg: dict, test_cfg: dict) -> bool:
+    """
+    Log the job start and check market hours (with optional test bypass).
+
+    Returns:
+        True if the cycle should run, False if outside market hours.
     """
     start_ts = now_tz(market_hours_cfg["tz"]).strftime("%Y-%m-%d %H:%M:%S")
     logger.info("Job start (%s), Ticker=%s, Schwelle=±%.1f%%", start_ts, ",".join(tickers), threshold_pct)
@@ -189,108 +592,277 @@ def run_once(
     logger.info("Market hours? %s (effective=%s)", is_market_hours(market_hours_cfg), within)
     if not within:
         logger.info("Outside market hours — no push sent.")
-        return
+    return within
+
 
-    state: Dict[str, str] = load_state(state_file)
+def _fetch_prices(
+    tickers: List[str],
+    state_file: Path,
+    market_hours_cfg: dict,
+    bars_cfg: Optional[dict] = None,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Fetch open/last prices for all tickers (batched) with the data availability model.
 
-    for tk in tickers:
+    The model is stored next to the state file and saved after the fetch.
+    If `bars_cfg["enabled"]`, today's 1m bars are kept in a local bar store
+    under `bars_cfg["dir"]` and only new bars are downloaded. When the day
+    changes, closed days are compacted and only `bars_cfg["keep_days"]`
+    trading days are kept (see `barstore.maintain`).
+    """
+    # Remember which interval works per ticker (kept next to the state file).
+    # The model stays in memory between cycles of the same day (daemon mode).
+    global _availability, _bars
+    path = state_file.parent / AVAILABILITY_FILE_NAME
+    day = now_tz(market_hours_cfg["tz"]).date().isoformat()
+    availability = _availability
+    if availability is None or availability.path != path or availability.day != day:
+        availability = _availability = DataAvailability(path, day=day)
+
+    bars = None
+    if bars_cfg and bars_cfg.get("enabled", False):
+        root = Path(bars_cfg.get("dir", "bars"))
+        bars = _bars
+        if bars is None or bars.root != root or bars.day != day:
+            bars = _bars = BarStore(root, day=day)
+            try:
+                maintain_bars(root, day, keep_days=int(bars_cfg.get("keep_days", 5)))
+            except Exception as e:
+                logger.warning("Could not compact/prune the bar store: %s", e)
+
+    prices = get_open_and_last_many(tickers, availability=availability, bars=bars)
+    try:
+        availability.save()
+    except Exception as e:
+        logger.warning("Could not save data availability: %s", e)
+    return prices
+
+
+def _price_watchlist(tickers: List[str]) -> List[str]:
+    """Tickers to fetch prices for: none while the Yahoo circuit is open (logged)."""
+    if not circuit_open("yahoo"):
+        return tickers
+    logger.warning(
+        "Yahoo circuit open: skipping the price fetch for %d ticker(s) this cycle (%s).",
+        len(tickers), get_breakers().get("yahoo").describe(),
+    )
+    return []
+
+
+def _finish_run() -> None:
+    """Persist process-wide caches at the end of a cycle (errors are logged, not raised)."""
+    with timed("finish"):
         try:
-            open_px, last_px = get_open_and_last(tk)
-            if open_px == 0:
-                raise RuntimeError(f"Open is 0 for {tk}; cannot compute Δ%.")
-
-            pct = (last_px - open_px) / open_px * 100.0
-
-            # Test override: force a specific delta to simulate alerts
-            if test_cfg.get("enabled") and test_cfg.get("force_delta_pct") is not None:
-                forced = float(test_cfg["force_delta_pct"])
-                logger.info("Test mode: forcing Δ%% (%.2f%%) for %s (was %.2f%%).", forced, tk, pct)
-                pct = forced
-                last_px = open_px * (1.0 + pct / 100.0)
-
-            logger.info("%s | Last=%.4f Open=%.4f Δ=%+.2f%%", tk, last_px, open_px, pct)
-
-            prev = state.get(tk, "none")
-            direction = "up" if pct >= threshold_pct else "down" if pct <= -threshold_pct else "none"
-
-            if direction != "none" and direction != prev:
-                # Crossing the threshold for the first time (since last reset) → send alert
-                arrow = "📈" if direction == "up" else "📉"
-                title = f"Stock Alert: {tk}"
-                body  = f"{arrow} {tk}: {pct:+.2f}% vs. Open\nAktuell: {last_px:.2f} | Open: {open_px:.2f}"
-
-                headlines_block = ""
-                first_url_for_click = None
-
-                if news_cfg.get("enabled", False):
-                    # Build a smarter query from company metadata and filter out false positives
-                    company_name, req_kw = auto_keywords(tk)
-                    q = build_query(company_name, tk)
-
-                    items = fetch_headlines(
-                        query=q,
-                        limit=int(news_cfg.get("limit", 2)),
-                        lookback_hours=int(news_cfg.get("lookback_hours", 12)),
-                        lang=news_cfg.get("lang", "de"),
-                        country=news_cfg.get("country", "DE"),
-                    )
-                    items = filter_titles(items, required_keywords=req_kw)
-
-                    # Prepare a click target (open first article when tapping the notification)
-                    if items:
-                        cand = _ensure_https(items[0].get("link", ""))
-                        first_url_for_click = _extract_original_url(cand)
-
-                    news_text = _format_headlines(items)
-                    if not news_text:
-                        # Fallback: try en/US if DE results are weak or empty
-                        items = fetch_headlines(
-                            query=q,
-                            limit=int(news_cfg.get("limit", 2)),
-                            lookback_hours=max(12, int(news_cfg.get("lookback_hours", 12))),
-                            lang=news_cfg.get("fallback_lang", "en"),
-                            country=news_cfg.get("fallback_country", "US"),
-                        )
-                        items = filter_titles(items, required_keywords=req_kw)
-
-                        if items and not first_url_for_click:
-                            cand = _ensure_https(items[0].get("link", ""))
-                            first_url_for_click = _extract_original_url(cand)
-
-                        news_text = _format_headlines(items)
-
-                    if news_text:
-                        headlines_block = "\n\n📰 News:\n" + news_text
-
-                msg = body + headlines_block
-
-                # Send notification (Markdown on web; mobile gets real URLs + Click target)
-                notify_ntfy(
-                    ntfy_server,
-                    ntfy_topic,
-                    title,
-                    msg,
-                    dry_run=test_cfg.get("dry_run", False),
-                    markdown=True,
-                    click_url=first_url_for_click,
-                )
+            get_redirect_cache().save()
+        except Exception as e:
+            logger.warning("Could not save redirect cache: %s", e)
+        try:
+            get_feed_cache().save()
+        except Exception as e:
+            logger.warning("Could not save feed cache: %s", e)
+        try:
+            fill_company_misses()
+            get_company_repository().save()
+        except Exception as e:
+            logger.warning("Could not save company cache: %s", e)
+        if get_seen_headlines() is not None:
+            try:
+                get_seen_headlines().save()
+            except Exception as e:
+                logger.warning("Could not save seen headlines: %s", e)
+        breakers = get_breakers()
+        if breakers is not None:
+            try:
+                breakers.save()
+            except Exception as e:
+                logger.warning("Could not save circuit breakers: %s", e)
+            if breakers.describe():
+                logger.info("Circuit breakers: %s", breakers.describe())
+    rates = describe_rates()
+    if rates:
+        logger.info("Upstream rates: %s", rates)
 
-                # Persist state so we don't spam until price returns to corridor
-                state[tk] = direction
-                save_state(state_file, state)
 
-            elif direction == "none":
-                # Back in corridor: reset state so we can alert again on next breakout
-                if prev != "none":
-                    logger.info("Back in corridor (%s): reset state %s → none", tk, prev)
-                    state[tk] = "none"
-                    save_state(state_file, state)
-                else:
-                    logger.info("%s | No alert (< ±%.1f%%).", tk, threshold_pct)
+def run_once(
+    tickers: List[str],
+    threshold_pct: float,
+    ntfy_server: str,
+    ntfy_topic: str,
+    state_file: Path,
+    market_hours_cfg: dict,
+    test_cfg: dict,
+    news_cfg: dict,
+    concurrency_cfg: Optional[dict] = None,
+    state: Optional[Dict[str, str]] = None,
+    bars_cfg: Optional[dict] = None,
+    state_store: Optional[StateStore] = None,
+    thresholds: Optional[ThresholdTable] = None,
+    rearm_cfg: Optional[dict] = None,
+    digest_cfg: Optional[dict] = None,
+) -> None:
+    """
+    Execute one monitoring cycle:
+      - Check market hours (with optional test bypass)
+      - Fetch open & last prices for all tickers (batched, intraday preferred)
+      - Compute Δ% vs. open and the alert/reset decisions for all tickers
+        in one vectorized pass (`signals.evaluate_watchlist`)
+      - For each ticker to alert (on a bounded worker pool if `concurrency_cfg` allows):
+          * Trigger ntfy push if |Δ%| ≥ threshold (with de-bounce via state file)
+          * Optionally attach compact news headlines (with cleaned source URLs)
 
-            else:
-                logger.info("%s | Already alerted (%s). Waiting to re-enter corridor.", tk, prev)
+    Concurrency:
+      - `concurrency_cfg["max_workers"]` bounds the worker pool for the
+        alerting tickers (1 = serial, the previous behaviour); tickers
+        without an alert need no network and are handled inline.
+      - Per-upstream limits ("yahoo", "google_news", "ntfy") cap parallel
+        requests to each service, see `concurrency.configure`.
+      - Workers only return the new state; the state dict is updated on
+        the calling thread, each change is appended to the store's journal
+        and all changes are committed to the state store in one write at
+        the end of the run. Log lines are buffered per ticker and emitted
+        as one block.
+
+    Delivery (with the process-wide outbox, see `outbox.configure`):
+      - Alerts are written to the durable outbox and sent by its background
+        deliverer (retries with backoff), so the loop never waits for ntfy.
+      - A ticker's alert state is committed only once ntfy accepted the
+        alert; until then its queued state counts as the previous state,
+        so it is not queued twice. At the end of the run deliveries are
+        awaited for up to `outbox.drain_seconds`; the rest stays queued.
+      - Without an outbox (or in dry-run mode) alerts are sent inline.
 
-        except Exception as e:
-            # Catch-all to ensure a single bad ticker doesn't break the entire run
-            logger.error("Error while processing %s: %s", tk, e)
+    Args:
+        state: Optional in-memory alert state (daemon mode). If given it is
+               used and updated in place instead of re-loading the store;
+               changes are still committed to the store.
+        bars_cfg: Optional bar store config ({"enabled": bool, "dir": str});
+               keeps today's 1m bars locally so only new bars are fetched.
+        state_store: Where the alert state is persisted (see
+               `state.open_state_store`); defaults to the JSON `state_file`.
+        thresholds: Optional per-ticker/per-group up/down thresholds
+               (see `thresholds.compile_thresholds`, or
+               `volatility.ZScoreThresholds` for `threshold_mode: "zscore"`);
+               `threshold_pct` applies to all tickers if not given.
+        rearm_cfg: Optional anti-flapping config ({"factor": float,
+               "min_realert_minutes": float}): re-arm only below factor ×
+               threshold, and suppress a same-direction re-alert within
+               the interval (looked up in the alert history).
+        digest_cfg: Optional digest config (see `digest.DIGEST_DEFAULTS`):
+               from `min_alerts` alerts per cycle on, all alerts go out as a
+               few compact messages (largest moves first, without news)
+               instead of one notification per ticker.
+
+    Side effects:
+      - Sends an HTTP POST to ntfy (unless dry_run)
+      - Reads/writes the alert state store (anti-spam)
+      - Appends alert events to the alert history next to the state file
+      - Reads/writes the data availability model next to the state file
+      - Writes logs according to logging setup
+    """
+    concurrency_cfg = concurrency_cfg or {}
+    configure_concurrency(concurrency_cfg)
+    max_workers = max(1, int(concurrency_cfg.get("max_workers", 1)))
+    tickers = list(dict.fromkeys(tickers))  # one worker per symbol
+    rearm_factor, min_realert_s = _rearm_settings(rearm_cfg)
+    digest_cfg = digest_settings(digest_cfg)
+
+    if not _job_start(tickers, threshold_pct, market_hours_cfg, test_cfg):
+        return
+
+    store = state_store or JsonStateStore(state_file)
+    if state is None:
+        state = store.load()
+    changes: Dict[str, str] = {}
+    # Alert events for later analysis (kept next to the state file)
+    history = AlertHistory(state_file.parent / ALERT_HISTORY_FILE_NAME)
+    outbox = None if test_cfg.get("dry_run") else get_outbox()
+    if outbox is not None:
+        outbox.start()  # also delivers alerts left queued by earlier runs
+
+    # Fail fast while Yahoo's circuit is open: no price requests, nothing to evaluate
+    watch = _price_watchlist(tickers)
+    # Chunks of symbols on the Yahoo pool: one "1m" request per ticker, the interval cascade only for misses
+    with timed("prices"):
+        prices = _fetch_prices(watch, state_file, market_hours_cfg, bars_cfg) if watch else {}
+
+    def _apply(tk: str, new_state: Optional[str]) -> None:
+        # Remember state so we don't spam until price returns to corridor
+        # (journaled now, committed once at the end of the run)
+        if new_state is not None:
+            state[tk] = new_state
+            changes[tk] = new_state
+            store.record(tk, new_state)
+
+    # All Δ% / direction / alert decisions at once (pure, vectorized)
+    if thresholds is not None and watch:
+        # e.g. z-score mode: refresh the daily volatility once per trading day
+        thresholds.prepare(watch, now_tz(market_hours_cfg["tz"]).date().isoformat())
+    # Alerts still waiting for delivery count as sent (no second queue entry)
+    effective = {**state, **outbox.pending_states()} if outbox is not None else state
+    with timed("evaluate"):
+        signals = evaluate_watchlist(
+            watch, prices, effective, thresholds or threshold_pct, test_cfg,
+            rearm_factor=rearm_factor, recent=history.recent_alerts(min_realert_s, tickers=watch),
+        )
+
+    def _work(sig: TickerSignal) -> Optional[str]:
+        return _process_ticker(
+            sig,
+            ntfy_server=ntfy_server,
+            ntfy_topic=ntfy_topic,
+            test_cfg=test_cfg,
+            news_cfg=news_cfg,
+            history=history,
+            outbox=outbox,
+        )
+
+    def _grouped_work(sig: TickerSignal) -> Optional[str]:
+        with grouped_logs():
+            try:
+                return _work(sig)
+            except Exception as e:
+                # Logged inside the group so it stays next to the ticker's other lines
+                logger.error("Error while processing %s: %s", sig.ticker, e)
+                return None
+
+    rows = list(signals)
+    # Many alerts at once → a few digest messages instead of one per ticker
+    digest = _digest_batch(rows, digest_cfg)
+    # Only alerts need the network (news + ntfy); everything else is handled inline
+    pooled = [sig for sig in rows if sig.alert] if max_workers > 1 and not digest else []
+    try:
+        for sig in rows:
+            if sig.alert and (pooled or digest):
+                continue
+            try:
+                _apply(sig.ticker, _work(sig))
+            except Exception as e:
+                # Catch-all to ensure a single bad ticker doesn't break the entire run
+                logger.error("Error while processing %s: %s", sig.ticker, e)
+        if pooled:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pooled)), thread_name_prefix="ticker") as pool:
+                futures = {pool.submit(_grouped_work, sig): sig.ticker for sig in pooled}
+                for fut in as_completed(futures):
+                    _apply(futures[fut], fut.result())
+        if digest:
+            try:
+                sent = _send_digest(
+                    digest, digest_cfg, ntfy_server=ntfy_server, ntfy_topic=ntfy_topic,
+                    test_cfg=test_cfg, history=history, outbox=outbox,
+                )
+            except Exception as e:
+                logger.error("Error while sending the alert digest: %s", e)
+                sent = []
+            for tk, new_state in sent:
+                _apply(tk, new_state)
+        if outbox is not None:
+            # Decisions of this run's evaluation win over deliveries of older alerts
+            _apply_deliveries(outbox, history, _apply, state, evaluated=set(changes))
+    finally:
+        # One write per run (also if the run is interrupted after alerts went out)
+        with timed("commit"):
+            store.commit(changes)
+        if state_store is None:
+            store.close()
+
+    _finish_run()
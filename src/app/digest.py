@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from .signals import TickerSignal
+
+# Default settings; overridable via the "digest" config section.
+DIGEST_DEFAULTS: Dict[str, Any] = {
+    "enabled": False,        # Coalesce the alerts of a cycle into digest messages
+    "min_alerts": 4,         # Fewer alerts in a cycle → one notification per ticker (with news)
+    "max_bytes": 3800,       # Body size cap per message (ntfy turns > 4096 bytes into an attachment)
+    "max_messages": 3,       # Messages per cycle; further tickers are listed by name in the last one
+}
+
+# Space kept free in the last message for the "… and N more" line
+_OVERFLOW_RESERVE = 200
+
+
+class DigestMessage(NamedTuple):
+    """One digest notification and the alerts it carries."""
+    title: str
+    body: str
+    signals: List[TickerSignal]
+
+
+def digest_settings(digest_cfg: Optional[dict]) -> Optional[Dict[str, Any]]:
+    """
+    Read the "digest" config section.
+
+    Returns:
+        The merged settings, or None if digest mode is disabled.
+
+    Raises:
+        ValueError: If a size limit is not positive.
+    """
+    cfg = {**DIGEST_DEFAULTS, **(digest_cfg or {})}
+    if not cfg.get("enabled"):
+        return None
+    for key in ("min_alerts", "max_bytes", "max_messages"):
+        if int(cfg[key]) < 1:
+            raise ValueError(f"digest.{key} must be ≥ 1 (got {cfg[key]})")
+    if int(cfg["max_bytes"]) <= _OVERFLOW_RESERVE:
+        raise ValueError(f"digest.max_bytes must be > {_OVERFLOW_RESERVE} (got {cfg['max_bytes']})")
+    return cfg
+
+
+def _line(sig: TickerSignal) -> str:
+    """One Markdown line per alert: arrow, ticker, Δ%, ladder level, prices."""
+    arrow = "📈" if sig.direction == "up" else "📉"
+    level = f" (Level {sig.level})" if sig.level > 1 else ""
+    return f"{arrow} **{sig.ticker}** {sig.pct:+.2f}%{level} | Aktuell: {sig.last:.2f} | Open: {sig.open:.2f}"
+
+
+def _overflow_line(rest: Sequence[TickerSignal], max_bytes: int) -> str:
+    """'… and N more: A, B, C' with as many names as fit into `max_bytes`."""
+    head = f"… and {len(rest)} more"
+    line = head
+    for i in range(len(rest)):
+        cand = f"{head}: {', '.join(s.ticker for s in rest[:i + 1])}" + (", …" if i + 1 < len(rest) else "")
+        if len(cand.encode("utf-8")) > max_bytes:
+            break
+        line = cand
+    return line
+
+
+def build_digest(
+    signals: Sequence[TickerSignal],
+    max_bytes: int = DIGEST_DEFAULTS["max_bytes"],
+    max_messages: int = DIGEST_DEFAULTS["max_messages"],
+) -> List[DigestMessage]:
+    """
+    Pack the alerts of one cycle into at most `max_messages` compact messages.
+
+    Largest moves (|Δ%|) come first; each message body stays within
+    `max_bytes` (UTF-8). Alerts that do not fit are named in an overflow
+    line of the last message, so every alert belongs to exactly one message
+    (and its state is committed with it).
+
+    Args:
+        signals: Alerting rows of the evaluation (`sig.alert` is True).
+
+    Returns:
+        List of DigestMessage (empty if there are no signals).
+    """
+    order = sorted(signals, key=lambda s: abs(s.pct), reverse=True)
+    lines = [_line(s) for s in order]
+    sizes = [len(line.encode("utf-8")) + 1 for line in lines]
+
+    groups: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    i = 0
+    while i < len(order):
+        if current and size + sizes[i] > max_bytes:
+            if len(groups) + 1 >= max_messages:
+                break
+            groups.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += sizes[i]
+        i += 1
+
+    overflow = ""
+    if i < len(order):
+        # Make room for the overflow line in the last message
+        while len(current) > 1 and size > max_bytes - _OVERFLOW_RESERVE:
+            size -= sizes[current.pop()]
+            i -= 1
+        overflow = _overflow_line(order[i:], max_bytes - size)
+    if current:
+        groups.append(current)
+
+    messages: List[DigestMessage] = []
+    ups = sum(1 for s in order if s.direction == "up")
+    # ASCII only: the title travels as an HTTP header
+    title = f"Stock Alert Digest: {len(order)} alerts ({ups} up / {len(order) - ups} down)"
+    for n, group in enumerate(groups, start=1):
+        body = "\n".join(lines[j] for j in group)
+        carried = [order[j] for j in group]
+        if n == len(groups) and overflow:
+            body += "\n" + overflow
+            carried += order[i:]
+        part = f" ({n}/{len(groups)})" if len(groups) > 1 else ""
+        messages.append(DigestMessage(title + part, body, carried))
+    return messages
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
+# Default settings; overridable via the "feed_cache" config section.
+FEED_CACHE_DEFAULTS: Dict[str, Any] = {
+    "file": "feed_cache.json",  # On-disk cache (empty/None = memory only)
+    "fresh_minutes": 10,        # Serve cached entries without any request
+    "max_age_hours": 24,        # Drop feeds not revalidated for this long
+    "max_entries": 500,         # LRU bound (feed URLs)
+}
+
+
+class FeedCache:
+    """
+    Per-URL cache of Google News RSS feeds.
+
+    Each feed URL keeps its validators (ETag / Last-Modified) and the
+    parsed entries (see `news.entries_from_feed`):
+
+    - Within `fresh_minutes` of the last check the entries are served
+      without touching the network.
+    - After that the feed is re-requested conditionally; a 304 answer
+      reuses the cached entries (no download, no parsing).
+    - Feeds not revalidated for `max_age_hours` are dropped; at most
+      `max_entries` feeds are kept (least recently used go first).
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        fresh_s: float = 10 * 60,
+        max_age_s: float = 24 * 3600,
+        max_entries: int = 500,
+    ):
+        self.path = Path(path) if path else None
+        self.fresh_s = fresh_s
+        self.max_age_s = max_age_s
+        self.max_entries = max(1, int(max_entries))
+        # url -> {"etag", "last_modified", "checked", "entries"}
+        self._feeds: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.fresh_hits = 0
+        self.not_modified = 0
+        self.downloads = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Load feeds checked within `max_age_hours` from disk (LRU order is kept)."""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Could not load feed cache (%s). Starting empty.", e)
+            return
+        cutoff = time.time() - self.max_age_s
+        for url, feed in data.items():
+            if float(feed.get("checked", 0)) > cutoff:
+                self._feeds[url] = feed
+        self._evict()
+
+    def save(self) -> None:
+        """Write the cache to disk (atomic) if it changed; log request statistics."""
+        with self._lock:
+            if self.fresh_hits or self.not_modified or self.downloads:
+                logger.info(
+                    "Feed cache: %d fresh hit(s), %d not modified, %d download(s).",
+                    self.fresh_hits, self.not_modified, self.downloads,
+                )
+            self.fresh_hits = self.not_modified = self.downloads = 0
+            if not self.path or not self._dirty:
+                return
+            data = dict(self._feeds)
+            self._dirty = False
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
+
+    def _evict(self) -> None:
+        """Drop least recently used feeds beyond `max_entries` (lock held)."""
+        while len(self._feeds) > self.max_entries:
+            self._feeds.popitem(last=False)
+
+    def fresh(self, url: str) -> Optional[List[Dict[str, str]]]:
+        """Cached entries if the feed was checked within the freshness window, else None."""
+        with self._lock:
+            feed = self._feeds.get(url)
+            if feed is None or time.time() - feed["checked"] > self.fresh_s:
+                return None
+            self._feeds.move_to_end(url)
+            self.fresh_hits += 1
+            return feed["entries"]
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a cached feed (empty if unknown)."""
+        with self._lock:
+            feed = self._feeds.get(url)
+            if feed is None:
+                return {}
+            headers = {}
+            if feed.get("etag"):
+                headers["If-None-Match"] = feed["etag"]
+            if feed.get("last_modified"):
+                headers["If-Modified-Since"] = feed["last_modified"]
+            return headers
+
+    def revalidated(self, url: str) -> List[Dict[str, str]]:
+        """
+        Handle a 304 answer: mark the feed as checked and return its entries.
+
+        Returns an empty list if the feed was evicted in the meantime.
+        """
+        with self._lock:
+            feed = self._feeds.get(url)
+            if feed is None:
+                return []
+            feed["checked"] = time.time()
+            self._feeds.move_to_end(url)
+            self._dirty = True
+            self.not_modified += 1
+            return feed["entries"]
+
+    def store(self, url: str, headers: Mapping[str, str], entries: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Store a freshly downloaded feed.
+
+        Args:
+            url: Feed URL (cache key).
+            headers: Response headers (ETag / Last-Modified are kept).
+            entries: Parsed entries (see `news.entries_from_feed`).
+
+        Returns:
+            `entries` (for call chaining).
+        """
+        with self._lock:
+            self._feeds[url] = {
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "checked": time.time(),
+                "entries": entries,
+            }
+            self._feeds.move_to_end(url)
+            self._evict()
+            self._dirty = True
+            self.downloads += 1
+        return entries
+
+
+_cache = FeedCache()
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> FeedCache:
+    """(Re)create the process-wide feed cache from the "feed_cache" config section."""
+    global _cache
+    cfg = {**FEED_CACHE_DEFAULTS, **(cfg or {})}
+    _cache = FeedCache(
+        path=cfg.get("file") or None,
+        fresh_s=float(cfg["fresh_minutes"]) * 60,
+        max_age_s=float(cfg["max_age_hours"]) * 3600,
+        max_entries=int(cfg["max_entries"]),
+    )
+    return _cache
+
+
+def get_cache() -> FeedCache:
+    """Return the process-wide feed cache."""
+    return _cache
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("stock-alerts")
+
+# Default HTTP settings; overridable via the "http" config section.
+HTTP_DEFAULTS: Dict[str, Any] = {
+    "pool_maxsize": 10,        # Keep-alive connections per host
+    "retries": 2,              # Retries for idempotent requests (GET/HEAD) on connection errors
+    "backoff": 0.3,            # Exponential backoff factor between retries
+    "timeouts": {              # Per-host timeouts in seconds
+        "default": 10.0,
+        "news.google.com": 5.0,
+        "ntfy.sh": 20.0,
+    },
+}
+
+_settings: Dict[str, Any] = dict(HTTP_DEFAULTS)
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def configure(cfg_http: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Apply the "http" config section. Existing sessions are closed and
+    re-created lazily with the new settings.
+
+    Args:
+        cfg_http: HTTP configuration, expected keys:
+            - "pool_maxsize": int, keep-alive connections per host
+            - "retries": int, retries for GET/HEAD on connection errors
+            - "backoff": float, backoff factor between retries
+            - "timeouts": dict, {host: seconds} plus a "default" entry
+    """
+    global _settings
+    cfg_http = cfg_http or {}
+    merged = {**HTTP_DEFAULTS, **cfg_http}
+    merged["timeouts"] = {**HTTP_DEFAULTS["timeouts"], **cfg_http.get("timeouts", {})}
+    with _lock:
+        if merged == _settings:
+            return
+        _settings = merged
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
+
+
+def _new_session() -> requests.Session:
+    """
+    Create a session with a pooled, retrying adapter.
+
+    Only connection errors are retried here. Every request runs inside a
+    `concurrency.upstream` slot, so 429/5xx responses (and their
+    Retry-After) are returned to the caller and handled by the rate
+    limiter and circuit breaker, not slept through inside the slot.
+    """
+    retry = Retry(
+        total=int(_settings["retries"]),
+        backoff_factor=float(_settings["backoff"]),
+        status_forcelist=(),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    pool = int(_settings["pool_maxsize"])
+    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retry)
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Return the shared session for the host of `url` (created on first use).
+
+    One session per host keeps connections (and TLS sessions) alive between
+    calls, so repeated requests to the same upstream skip the handshake.
+    """
+    host = urlparse(url).netloc.lower()
+    with _lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = _sessions[host] = _new_session()
+        return s
+
+
+def host_timeout(url: str) -> float:
+    """Configured timeout for the host of `url` (falls back to "default")."""
+    host = urlparse(url).netloc.lower()
+    timeouts = _settings["timeouts"]
+    return float(timeouts.get(host, timeouts["default"]))
+
+
+def request(method: str, url: str, *, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    """
+    Send a request through the shared session of the target host.
+
+    Args:
+        method: HTTP method ("GET", "HEAD", "POST", ...).
+        url: Target URL.
+        timeout: Seconds; defaults to the per-host timeout.
+        **kwargs: Passed to `requests.Session.request`.
+
+    Returns:
+        requests.Response
+
+    Raises:
+        requests.RequestException: On connection errors/timeouts (after retries).
+    """
+    return get_session(url).request(method, url, timeout=timeout or host_timeout(url), **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET via the shared session (see `request`)."""
+    return request("GET", url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    """HEAD via the shared session (see `request`)."""
+    return request("HEAD", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """POST via the shared session (see `request`). POSTs are never retried."""
+    return request("POST", url, **kwargs)
+
+
+def close_all() -> None:
+    """Close all pooled sessions (e.g. on daemon shutdown)."""
+    with _lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
@@ -1,6 +1,31 @@
 import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from logging.handlers import RotatingFileHandler
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional
+
+
+class _GroupingFilter(logging.Filter):
+    """
+    Logger filter that diverts records into a per-context buffer
+    while `grouped_logs()` is active (per thread, or per asyncio task).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records: ContextVar[Optional[List[logging.LogRecord]]] = ContextVar("log_group", default=None)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        buf = self.records.get()
+        if buf is None:
+            return True
+        buf.append(record)
+        return False
+
+
+_grouping = _GroupingFilter()
+_emit_lock = threading.Lock()
 
 
 def setup_logging(cfg_log: Dict[str, Any]) -> logging.Logger:
@@ -36,6 +61,8 @@ def setup_logging(cfg_log: Dict[str, Any]) -> logging.Logger:
 
     # Remove any previously attached handlers (avoid duplicates when re-importing)
     logger.handlers.clear()
+    if _grouping not in logger.filters:
+        logger.addFilter(_grouping)
 
     # Define simple log format: timestamp, level, message
     fmt = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
@@ -64,3 +91,27 @@ def setup_logging(cfg_log: Dict[str, Any]) -> logging.Logger:
         cfg_log.get("to_file", False),
     )
     return logger
+
+
+@contextmanager
+def grouped_logs() -> Iterator[None]:
+    """
+    Buffer all "stock-alerts" log records of the current thread (or asyncio
+    task) and emit them as one contiguous block when the context exits.
+
+    Used by workers so that the log lines of one ticker stay together
+    instead of interleaving with other tickers.
+    """
+    logger = logging.getLogger("stock-alerts")
+    if _grouping not in logger.filters:
+        logger.addFilter(_grouping)
+
+    records: List[logging.LogRecord] = []
+    token = _grouping.records.set(records)
+    try:
+        yield
+    finally:
+        _grouping.records.reset(token)
+        with _emit_lock:
+            for record in records:
+                logger.handle(record)
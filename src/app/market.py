@@ -1,12 +1,31 @@
 import time
 import yfinance as yf
+import pandas as pd
+from yfinance.exceptions import YFException
 import logging
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .availability import DataAvailability, INTRADAY_INTERVALS, DAILY_INTERVAL
+from .barstore import BarStore
+from .concurrency import upstream, limit
+from .breaker import CircuitOpen
+from .ratelimit import RateLimited, is_rate_limit
 
 logger = logging.getLogger("stock-alerts")
 
+# Maximum number of symbols per chunk of the batched price fetch.
+# Yahoo's chart API serves one symbol per request (`yf.download` also sends
+# one request per symbol), so chunking saves no requests: a chunk is the
+# unit of work on the Yahoo pool, and a rate limit stops the rest of it.
+BATCH_CHUNK_SIZE = 100
+
 
-def get_open_and_last(ticker: str) -> Tuple[float, float]:
+def get_open_and_last(
+    ticker: str,
+    availability: Optional[DataAvailability] = None,
+    bars: Optional[BarStore] = None,
+) -> Tuple[float, float]:
     """
     Retrieve today's opening price and the latest available price for a ticker.
 
@@ -18,33 +37,52 @@ def get_open_and_last(ticker: str) -> Tuple[float, float]:
       2. If no intraday data is available (e.g., market closed),
          fall back to daily interval ("1d").
 
+    With an `availability` model the interval that worked last time is
+    tried first, and tickers (or whole exchanges) known to have no intraday
+    bars today go straight to the daily fetch.
+
+    With a `bars` store, "1m" requests only ask for bars after the newest
+    stored bar, and the open is the pinned first bar of the day.
+
     Args:
         ticker (str): Stock symbol, e.g. "AAPL", "SAP.DE", "QQQ", "^GDAXI".
+        availability (DataAvailability, optional): Per-ticker interval memory.
+        bars (BarStore, optional): Local store of today's 1m bars.
 
     Returns:
         Tuple[float, float]: (open_today, last_price)
 
     Raises:
         RuntimeError: If no data is available at all for the ticker.
+        RateLimited: If Yahoo throttles a request; the remaining intervals
+            are not tried (the rate limiter backs off instead).
 
     Notes:
         - auto_adjust=False → we want raw OHLC values (not split/dividend adjusted).
         - A small sleep (0.4s) between retries reduces API stress
           and avoids "empty DataFrame" glitches from yfinance.
     """
+    plan = availability.plan(ticker) if availability else list(INTRADAY_INTERVALS) + [DAILY_INTERVAL]
+    intraday = [iv for iv in plan if iv != DAILY_INTERVAL]
+    requests = 0
+
     # --- Try intraday data first ---
-    for interval in ("1m", "5m", "15m"):
+    for interval in intraday:
         for attempt in range(2):  # up to 2 attempts per interval
-            df = yf.Ticker(ticker).history(
-                period="1d", interval=interval, auto_adjust=False
-            )
-            if not df.empty:
-                open_today = float(df.iloc[0]["Open"])
-                last_price = float(df.iloc[-1]["Close"])
+            incremental = bars is not None and interval == "1m"
+            start = bars.fetch_start(ticker) if incremental else None
+            window = {"start": start} if start is not None else {"period": "1d"}
+            df = _history(ticker, interval=interval, auto_adjust=False, **window)
+            requests += 1
+            res = bars.update(ticker, df) if incremental else _open_and_last_from_frame(df)
+            if res is not None:
+                open_today, last_price = res
                 logger.debug(
                     "Intraday %s: interval=%s open=%.4f last=%.4f",
                     ticker, interval, open_today, last_price,
                 )
+                if availability:
+                    availability.record(ticker, interval, requests)
                 return open_today, last_price
             logger.debug(
                 "Empty intraday data (%s, %s), retry %d",
@@ -53,7 +91,8 @@ def get_open_and_last(ticker: str) -> Tuple[float, float]:
             time.sleep(0.4)  # wait before retrying
 
     # --- Fallback: daily data ---
-    df = yf.Ticker(ticker).history(period="1d", interval="1d", auto_adjust=False)
+    df = _history(ticker, period="1d", interval="1d", auto_adjust=False)
+    requests += 1
     if df.empty:
         raise RuntimeError(f"No data available for {ticker}")
 
@@ -63,4 +102,298 @@ def get_open_and_last(ticker: str) -> Tuple[float, float]:
         "Fallback daily data %s: open=%.4f last=%.4f",
         ticker, open_today, last_price,
     )
+    if availability:
+        availability.record(ticker, DAILY_INTERVAL, requests)
     return open_today, last_price
+
+
+def _history(ticker: str, **kwargs) -> pd.DataFrame:
+    """
+    `yf.Ticker(ticker).history(**kwargs)` in a Yahoo request slot.
+
+    "No data" answers (no prices/timezone for the symbol) come back as an
+    empty frame; transport errors are raised, so they count towards the
+    Yahoo circuit breaker instead of looking like a quiet ticker.
+
+    Raises:
+        RateLimited: If Yahoo answered with "Too Many Requests".
+        Exception: Connection errors, timeouts, unparseable responses.
+    """
+    try:
+        with upstream("yahoo"):
+            try:
+                return yf.Ticker(ticker).history(raise_errors=True, **kwargs)
+            except YFException as e:
+                if is_rate_limit(e):
+                    raise
+                logger.debug("No data from Yahoo for %s: %s", ticker, e)
+                return pd.DataFrame()
+    except Exception as e:
+        if is_rate_limit(e):
+            raise RateLimited(f"Yahoo rate limit while fetching {ticker}") from e
+        raise
+
+
+def _open_and_last_from_frame(df: pd.DataFrame) -> Optional[Tuple[float, float]]:
+    """
+    Extract (open_today, last_price) from a single-symbol OHLC frame.
+
+    Rows without a "Close" are dropped first: in multi-ticker downloads the
+    index is the union of all timestamps, so a symbol has NaN rows wherever
+    another symbol traded and it did not.
+
+    Returns:
+        Tuple[float, float] | None: (open_today, last_price), or None if
+        the frame holds no usable bars.
+    """
+    if df is None or df.empty or "Open" not in df or "Close" not in df:
+        return None
+    df = df.dropna(subset=["Open", "Close"])
+    if df.empty:
+        return None
+    return float(df.iloc[0]["Open"]), float(df.iloc[-1]["Close"])
+
+
+def _download_frames(
+    chunk: List[str],
+    interval: str,
+    start: Optional[pd.Timestamp] = None,
+) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """
+    Download bars for several symbols, one chart request per symbol.
+
+    Yahoo's chart API has no multi-symbol form, so this costs one request
+    per symbol, like `yf.download`. Each request takes its own Yahoo slot
+    (`_history`), so the rate limiter and the circuit breaker see every
+    request, and each symbol's errors are its own.
+
+    Args:
+        chunk (List[str]): Ticker symbols to request.
+        interval (str): Bar interval, e.g. "1m".
+        start (Timestamp, optional): Only bars from this time on;
+            default is the whole current day (period="1d").
+
+    Returns:
+        Tuple[Dict[str, pd.DataFrame], List[str]]: {ticker: OHLCV frame}
+        for every symbol that came back with bars (other symbols are
+        absent), and the symbols left unrequested because Yahoo throttled
+        a request or its circuit opened (logged; the frames fetched before
+        are kept).
+    """
+    window = {"start": start} if start is not None else {"period": "1d"}
+    frames: Dict[str, pd.DataFrame] = {}
+    for i, tk in enumerate(chunk):
+        try:
+            df = _history(tk, interval=interval, auto_adjust=False, **window)
+        except (RateLimited, CircuitOpen) as e:
+            # More requests would only deepen the throttling (or fail fast); stop here
+            skipped = chunk[i:]
+            logger.warning("%s; %d symbol(s) not requested this cycle.", e, len(skipped))
+            return frames, skipped
+        except Exception as e:
+            # Counted by the breaker; the symbol goes to the per-ticker fallback
+            logger.debug("Download failed for %s: %s", tk, e)
+            continue
+        if not df.empty:
+            frames[tk] = df
+    return frames, []
+
+
+def _chunks(symbols: List[str], chunk_size: int) -> List[List[str]]:
+    """Split symbols into chunks of ≤ `chunk_size`, at least one per Yahoo slot (so they run in parallel)."""
+    size = max(1, min(chunk_size, -(-len(symbols) // limit("yahoo"))))
+    return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+
+def _download_chunk(
+    chunk: List[str],
+    interval: str,
+    bars: Optional[BarStore] = None,
+) -> Tuple[Dict[str, Tuple[float, float]], List[str]]:
+    """
+    Download today's bars for several symbols and extract open/last.
+
+    With a `bars` store, symbols that already have bars stored today are
+    requested incrementally (only bars after the oldest "newest stored bar"
+    of the group); their open comes from the store, where it is pinned.
+
+    Returns:
+        Tuple[Dict[str, Tuple[float, float]], List[str]]:
+        {ticker: (open_today, last_price)} for every symbol that came back
+        with data (symbols without data are simply absent), and the symbols
+        not requested because Yahoo throttled (see `_download_frames`).
+    """
+    out: Dict[str, Tuple[float, float]] = {}
+    if bars is None:
+        frames, skipped = _download_frames(chunk, interval)
+        for tk, frame in frames.items():
+            res = _open_and_last_from_frame(frame)
+            if res is not None:
+                out[tk] = res
+        return out, skipped
+
+    fresh = [tk for tk in chunk if bars.fetch_start(tk) is None]
+    incremental = [tk for tk in chunk if tk not in fresh]
+    frames: Dict[str, pd.DataFrame] = {}
+    skipped: List[str] = []
+    if fresh:
+        got, skipped = _download_frames(fresh, interval)
+        frames.update(got)
+    if incremental and skipped:
+        skipped = skipped + incremental
+    elif incremental:
+        start = min(bars.fetch_start(tk) for tk in incremental)
+        got, skipped = _download_frames(incremental, interval, start=start)
+        frames.update(got)
+
+    for tk in chunk:
+        if tk in skipped:
+            continue
+        res = bars.update(tk, frames.get(tk))
+        if res is not None:
+            out[tk] = res
+    return out, skipped
+
+
+def get_open_and_last_many(
+    tickers: List[str],
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    availability: Optional[DataAvailability] = None,
+    bars: Optional[BarStore] = None,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Retrieve today's opening and latest price for many tickers at once.
+
+    Strategy:
+      1. Split the watchlist into chunks (at most `chunk_size` symbols, at
+         least one chunk per Yahoo slot) and fetch "1m" bars for each.
+      2. Read open/last for every symbol from its frame.
+      3. Symbols missing from the batch (no intraday data, failed
+         request, ...) fall back to `get_open_and_last`.
+
+    Yahoo's chart API takes one symbol per request, so the batch saves no
+    requests (see `_download_frames`): it fetches every symbol with a
+    single "1m" request first and only retries the misses over the
+    interval cascade. Chunks and fallbacks run in parallel, bounded by the
+    "yahoo" concurrency limit and its adaptive rate limit. Once Yahoo
+    throttles a chunk, its remaining symbols are not requested and get no
+    per-ticker fallback in this cycle; prices already fetched are kept.
+
+    Tickers the `availability` model knows to have no intraday bars today
+    skip the batch and go straight to the per-ticker daily fetch.
+
+    With a `bars` store only bars newer than the last stored one are
+    downloaded and the day's open is taken from the store.
+
+    Args:
+        tickers (List[str]): Ticker symbols, e.g. ["AAPL", "SAP.DE"].
+        chunk_size (int): Maximum number of symbols per chunk.
+        availability (DataAvailability, optional): Per-ticker interval memory.
+        bars (BarStore, optional): Local store of today's 1m bars.
+
+    Returns:
+        Dict[str, Tuple[float, float]]: {ticker: (open_today, last_price)}.
+        Tickers without any data (even after the fallback) are omitted;
+        the reason is logged.
+    """
+    # Preserve order, drop duplicates (a symbol only needs to be fetched once)
+    symbols = list(dict.fromkeys(tickers))
+    prices: Dict[str, Tuple[float, float]] = {}
+    throttled: set = set()
+
+    batchable = [tk for tk in symbols if not (availability and availability.skip_intraday(tk))]
+    chunks = _chunks(batchable, chunk_size)
+
+    def _fetch_chunk(chunk: List[str]) -> Dict[str, Tuple[float, float]]:
+        try:
+            got, skipped = _download_chunk(chunk, interval="1m", bars=bars)
+            logger.debug("Batch download: %d/%d symbols with data", len(got), len(chunk))
+            # Per-ticker requests would only deepen the throttling (or fail fast); skip them this cycle
+            throttled.update(skipped)
+            return got
+        except Exception as e:
+            logger.warning("Batch download failed for %d symbols (%s); using per-ticker fallback.", len(chunk), e)
+            return {}
+
+    def _fetch_single(tk: str) -> Optional[Tuple[float, float]]:
+        try:
+            return get_open_and_last(tk, availability, bars)
+        except CircuitOpen as e:
+            logger.debug("Per-ticker fallback skipped for %s: %s", tk, e)
+            return None
+        except Exception as e:
+            logger.warning("Per-ticker fallback failed for %s: %s", tk, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=limit("yahoo")) as pool:
+        for got in pool.map(_fetch_chunk, chunks):
+            prices.update(got)
+            if availability:
+                for tk in got:
+                    availability.record(tk, "1m")
+
+        # --- Fallback: per-ticker path for everything the batch did not deliver ---
+        missing = [tk for tk in symbols if tk not in prices and tk not in throttled]
+        if missing:
+            logger.info("Batch response missing %d symbol(s), falling back: %s", len(missing), ",".join(missing))
+        for tk, res in zip(missing, pool.map(_fetch_single, missing)):
+            if res is not None:
+                prices[tk] = res
+
+    return prices
+
+
+def get_daily_closes(
+    tickers: List[str],
+    start: pd.Timestamp,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Download daily closes for many tickers (one request per ticker, chunks in parallel).
+
+    Args:
+        tickers (List[str]): Ticker symbols.
+        start (Timestamp): First day to request.
+        chunk_size (int): Maximum number of symbols per chunk.
+
+    Returns:
+        pd.DataFrame: Closes with one row per day (DatetimeIndex, naive
+        exchange-local dates) and one column per ticker that came back
+        with data. Tickers of different exchanges share rows by date.
+    """
+    symbols = list(dict.fromkeys(tickers))
+    chunks = _chunks(symbols, chunk_size)
+
+    def _fetch_chunk(chunk: List[str]) -> Dict[str, pd.Series]:
+        try:
+            frames, _ = _download_frames(chunk, interval="1d", start=start)
+        except Exception as e:
+            logger.warning("Daily history download failed for %d symbols: %s", len(chunk), e)
+            return {}
+        return {
+            tk: _local_dates(f["Close"].dropna())
+            for tk, f in frames.items() if "Close" in f and f["Close"].notna().any()
+        }
+
+    columns: Dict[str, pd.Series] = {}
+    with ThreadPoolExecutor(max_workers=limit("yahoo")) as pool:
+        for got in pool.map(_fetch_chunk, chunks):
+            columns.update(got)
+    if not columns:
+        return pd.DataFrame()
+    return pd.DataFrame(columns).sort_index()
+
+
+def _local_dates(series: pd.Series) -> pd.Series:
+    """
+    Re-index a daily series by its exchange-local dates (naive).
+
+    yfinance stamps daily bars at midnight in the exchange's timezone; in
+    UTC, European and US bars of the same date fall on different instants
+    (and dates), so series are aligned by local date instead.
+    """
+    index = pd.DatetimeIndex(series.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    out = series.set_axis(index.normalize())
+    return out[~out.index.duplicated(keep="last")]
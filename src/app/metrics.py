@@ -0,0 +1,65 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator
+
+import numpy as np
+
+# Samples kept per stage (oldest dropped first), so a daemon does not grow without bound
+MAX_SAMPLES = 50_000
+
+_samples: Dict[str, Deque[float]] = {}
+_lock = threading.Lock()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add one duration (seconds) to a stage."""
+    with _lock:
+        samples = _samples.get(stage)
+        if samples is None:
+            samples = _samples[stage] = deque(maxlen=MAX_SAMPLES)
+        samples.append(seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Measure the wall time of the block as one sample of `stage`.
+
+    Example:
+        >>> with timed("prices"):
+        ...     prices = get_open_and_last_many(tickers)
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+def summary(percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict[str, float]]:
+    """
+    Latency statistics per stage.
+
+    Returns:
+        {stage: {"count", "total_ms", "p50_ms", ..., "max_ms"}} for every stage with samples.
+    """
+    with _lock:
+        data = {stage: np.fromiter(samples, dtype=np.float64) for stage, samples in _samples.items() if samples}
+    out: Dict[str, Dict[str, float]] = {}
+    for stage, values in data.items():
+        ms = values * 1000.0
+        stats = {"count": float(len(ms)), "total_ms": float(ms.sum())}
+        for p in percentiles:
+            stats[f"p{p:g}_ms"] = float(np.percentile(ms, p))
+        stats["max_ms"] = float(ms.max())
+        out[stage] = stats
+    return out
+
+
+def reset() -> None:
+    """Drop all samples."""
+    with _lock:
+        _samples.clear()
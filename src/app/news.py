@@ -1,8 +1,54 @@
 from __future__ import annotations
+import base64
 import datetime as dt
-from typing import List, Dict, Iterable
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Dict, Iterable, Optional, Tuple
 from urllib.parse import quote_plus
+import logging
 import feedparser
+import numpy as np
+import requests
+
+from . import http_client
+from .breaker import CircuitOpen
+from .concurrency import upstream
+from .feed_cache import get_cache as get_feed_cache
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
+# Google News RSS search endpoint (overridable, e.g. for a local stand-in in benchmarks)
+GOOGLE_NEWS_RSS_BASE = "https://news.google.com/rss/search"
+
+# Default settings; overridable via the "headline_dedup" config section.
+HEADLINE_DEDUP_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "file": "seen_headlines.json",  # Headlines already sent, persisted between runs (empty/None = memory only)
+    "similarity": 0.6,              # Estimated Jaccard similarity from which two titles are the same story
+    "window_hours": 24,             # Suppress a story for the same ticker for this long
+    "max_entries": 2000,            # Bound of the seen-set (oldest go first)
+}
+
+# MinHash signature: NUM_PERM hash functions, split into LSH_BANDS bands.
+# Two titles become candidates if one band matches completely, with
+# probability 1 − (1 − s⁴)⁸ at Jaccard similarity s for 8 bands × 4 rows:
+# ~0.06 at 0.3, ~0.40 at 0.5, ~0.67 at 0.6, ~0.99 at 0.8 (the curve's
+# midpoint, (1/8)^(1/4) ≈ 0.59, sits at the default `similarity`).
+SHINGLE_CHARS = 5
+NUM_PERM = 32
+LSH_BANDS = 8
+_ROWS = NUM_PERM // LSH_BANDS
+# Fixed seed: signatures must stay comparable across runs (they are persisted)
+_rng = np.random.default_rng(20250830)
+_PERM_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
 
 
 def build_query(name: str, ticker: str) -> str:
@@ -67,7 +113,7 @@ def _google_news_rss_url(query: str, lang: str = "de", country: str = "DE") -> s
     """
     # "when:12h" restricts to articles published in the last 12 hours
     q = quote_plus(f"{query} when:12h")
-    return f"https://news.google.com/rss/search?q={q}&hl={lang}&gl={country}&ceid={country}:{lang}"
+    return f"{GOOGLE_NEWS_RSS_BASE}?q={q}&hl={lang}&gl={country}&ceid={country}:{lang}"
 
 
 def fetch_headlines(
@@ -97,21 +143,52 @@ def fetch_headlines(
             }
 
     Notes:
-        - Uses `feedparser` to parse Google News RSS feeds.
+        - Downloads via the pooled `http_client` session and uses
+          `feedparser` to parse the Google News RSS feed.
+        - Feeds are cached per URL (`feed_cache`): within the freshness
+          window no request is made, afterwards the feed is re-requested
+          with ETag / Last-Modified and a 304 reuses the parsed entries.
         - Adds some buffer (fetch up to 3x requested items)
           before filtering out old articles.
         - Published time is ISO-8601 with UTC timezone if available.
     """
     url = _google_news_rss_url(query, lang=lang, country=country)
-    feed = feedparser.parse(url)
+    cache = get_feed_cache()
+    entries = cache.fresh(url)
+    if entries is None:
+        try:
+            with upstream("google_news") as call:
+                r = http_client.get(url, headers=cache.conditional_headers(url))
+                call.report(r.status_code, r.headers)
+            if r.status_code == 304:
+                entries = cache.revalidated(url)
+            else:
+                r.raise_for_status()
+                entries = cache.store(url, r.headers, entries_from_feed(feedparser.parse(r.content)))
+        except (requests.RequestException, CircuitOpen) as e:
+            # Same outcome as feedparser's silent failure: no headlines
+            logger.debug("Google News fetch failed (%s): %s", query, e)
+            return []
 
-    out: List[Dict[str, str]] = []
-    cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=lookback_hours)
+    return headlines_from_entries(entries, limit=limit, lookback_hours=lookback_hours)
 
-    for e in feed.entries[: max(10, limit * 3)]:  # buffer, then filter
-        title = getattr(e, "title", "").strip()
-        link = getattr(e, "link", "").strip()
 
+def entries_from_feed(feed: Any) -> List[Dict[str, str]]:
+    """
+    Normalize a parsed feed (result of `feedparser.parse`) into plain dicts.
+
+    The result only contains strings, so it can be kept in the feed cache
+    (and written to JSON) instead of the feedparser objects.
+
+    Args:
+        feed: Parsed feedparser result.
+
+    Returns:
+        List[Dict[str, str]]: One dict per feed entry, in feed order, with
+        "title", "source", "link" and "published" (ISO-8601 UTC or "").
+    """
+    out: List[Dict[str, str]] = []
+    for e in feed.entries:
         # Extract publisher/source if available
         source = ""
         if hasattr(e, "source") and getattr(e.source, "title", ""):
@@ -119,24 +196,316 @@ def fetch_headlines(
         elif hasattr(e, "tags") and e.tags:
             source = e.tags[0].term
 
-        # Filter by publication date (if present)
         published = ""
         if hasattr(e, "published_parsed") and e.published_parsed:
-            pub_dt = dt.datetime(*e.published_parsed[:6], tzinfo=dt.timezone.utc)
-            if pub_dt < cutoff:
-                continue  # too old
-            published = pub_dt.isoformat()
-
-        if title and link:
-            out.append(
-                {
-                    "title": title,
-                    "source": source,
-                    "link": link,
-                    "published": published,
-                }
-            )
+            published = dt.datetime(*e.published_parsed[:6], tzinfo=dt.timezone.utc).isoformat()
+
+        out.append(
+            {
+                "title": getattr(e, "title", "").strip(),
+                "source": source,
+                "link": getattr(e, "link", "").strip(),
+                "published": published,
+            }
+        )
+    return out
+
+
+def headlines_from_feed(feed: Any, limit: int = 2, lookback_hours: int = 12) -> List[Dict[str, str]]:
+    """
+    Convert a parsed feed (result of `feedparser.parse`) into news items.
+
+    Args:
+        feed: Parsed feedparser result.
+        limit (int): Maximum number of news items to return.
+        lookback_hours (int): Only include news not older than this.
+
+    Returns:
+        List[Dict[str, str]]: News items, see `fetch_headlines`.
+    """
+    return headlines_from_entries(entries_from_feed(feed), limit=limit, lookback_hours=lookback_hours)
+
+
+def headlines_from_entries(
+    entries: List[Dict[str, str]],
+    limit: int = 2,
+    lookback_hours: int = 12,
+) -> List[Dict[str, str]]:
+    """
+    Select the news items to show from normalized feed entries.
+
+    Separated from the download so cached entries (feed cache) and callers
+    that download the RSS themselves (e.g. the async engine) share the
+    same filtering.
+
+    Args:
+        entries: Entries as returned by `entries_from_feed`.
+        limit (int): Maximum number of news items to return.
+        lookback_hours (int): Only include news not older than this.
+
+    Returns:
+        List[Dict[str, str]]: News items, see `fetch_headlines`.
+    """
+    out: List[Dict[str, str]] = []
+    cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=lookback_hours)
+
+    for e in entries[: max(10, limit * 3)]:  # buffer, then filter
+        # Filter by publication date (if present)
+        if e["published"] and dt.datetime.fromisoformat(e["published"]) < cutoff:
+            continue  # too old
+
+        if e["title"] and e["link"]:
+            out.append(dict(e))
         if len(out) >= limit:
             break
 
     return out
+
+
+def normalize_title(title: str, source: str = "") -> str:
+    """
+    Normalize a headline for near-duplicate detection.
+
+    Drops the " - Publisher" suffix Google News appends, accents, case and
+    punctuation, so the same story from two outlets compares equal.
+
+    Example:
+        normalize_title("Apple-Aktie: Rekordhoch! - finanzen.net", "finanzen.net")
+        -> "apple aktie rekordhoch"
+    """
+    title = title or ""
+    if source and title.endswith(f" - {source}"):
+        title = title[: -len(source) - 3]
+    elif " - " in title:
+        head, tail = title.rsplit(" - ", 1)
+        if len(tail.split()) <= 4:  # short tail: most likely the publisher
+            title = head
+    text = unicodedata.normalize("NFKD", title)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+def minhash(text: str) -> np.ndarray:
+    """
+    MinHash signature of a normalized title (character shingles).
+
+    Args:
+        text: Normalized title (see `normalize_title`).
+
+    Returns:
+        np.ndarray: NUM_PERM uint32 values; the share of equal positions of
+        two signatures estimates the Jaccard similarity of their shingle sets.
+    """
+    shingles = {text[i:i + SHINGLE_CHARS] for i in range(max(1, len(text) - SHINGLE_CHARS + 1))}
+    base = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "little") for sh in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # Multiply-shift hashing (wraps mod 2^64), high 32 bits per permutation
+    hashed = (_PERM_A[:, None] * base[None, :] + _PERM_B[:, None]) >> np.uint64(32)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def _similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(a == b))
+
+
+def _bands(sig: np.ndarray) -> List[bytes]:
+    """LSH band keys of a signature."""
+    return [sig[i * _ROWS:(i + 1) * _ROWS].tobytes() for i in range(LSH_BANDS)]
+
+
+class SeenHeadlines:
+    """
+    Headlines already sent, per ticker, as MinHash signatures with an LSH index.
+
+    - `seen` finds candidates through the band buckets (no scan over all
+      entries) and confirms them by the estimated similarity.
+    - Entries older than `window_hours` are ignored and dropped; at most
+      `max_entries` are kept (oldest go first), so memory and file size
+      stay bounded however long the notifier runs.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        similarity: float = 0.6,
+        window_s: float = 24 * 3600,
+        max_entries: int = 2000,
+    ):
+        self.path = Path(path) if path else None
+        self.similarity = float(similarity)
+        self.window_s = float(window_s)
+        self.max_entries = max(1, int(max_entries))
+        # id -> (ticker, signature, sent_at), oldest first
+        self._entries: "OrderedDict[int, Tuple[str, np.ndarray, float]]" = OrderedDict()
+        # (ticker, band, key) -> ids
+        self._buckets: Dict[Tuple[str, int, bytes], set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.suppressed = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Load entries within the window from disk."""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            cutoff = time.time() - self.window_s
+            for ticker, sig, sent_at in data:
+                if float(sent_at) > cutoff:
+                    self._insert(ticker, np.frombuffer(base64.b64decode(sig), dtype=np.uint32).copy(), float(sent_at))
+        except Exception as e:
+            logger.warning("Could not load seen headlines (%s). Starting empty.", e)
+            self._entries.clear()
+            self._buckets.clear()
+        self._evict(time.time())
+
+    def _insert(self, ticker: str, sig: np.ndarray, sent_at: float) -> None:
+        """Add an entry and index its bands (lock held)."""
+        eid = self._next_id
+        self._next_id += 1
+        self._entries[eid] = (ticker, sig, sent_at)
+        for band, key in enumerate(_bands(sig)):
+            self._buckets.setdefault((ticker, band, key), set()).add(eid)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries and enforce the size bound (lock held)."""
+        cutoff = now - self.window_s
+        while self._entries:
+            eid, (ticker, sig, sent_at) = next(iter(self._entries.items()))
+            if sent_at > cutoff and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[eid]
+            for band, key in enumerate(_bands(sig)):
+                ids = self._buckets.get((ticker, band, key))
+                if ids is not None:
+                    ids.discard(eid)
+                    if not ids:
+                        del self._buckets[(ticker, band, key)]
+            self._dirty = True
+
+    def seen(self, ticker: str, sig: np.ndarray) -> bool:
+        """True if a near-duplicate was sent for `ticker` within the window."""
+        cutoff = time.time() - self.window_s
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(_bands(sig)):
+                candidates |= self._buckets.get((ticker, band, key), set())
+            for eid in candidates:
+                _, other, sent_at = self._entries[eid]
+                if sent_at > cutoff and _similarity(sig, other) >= self.similarity:
+                    return True
+        return False
+
+    def add(self, ticker: str, sig: np.ndarray) -> None:
+        """Record a headline as sent for `ticker` (now)."""
+        now = time.time()
+        with self._lock:
+            self._insert(ticker, sig, now)
+            self._dirty = True
+            self._evict(now)
+
+    def count_suppressed(self, n: int) -> None:
+        """Add to the number of headlines dropped this run (logged by `save`)."""
+        with self._lock:
+            self.suppressed += n
+
+    def save(self) -> None:
+        """Write the seen-set to disk (atomic) if it changed."""
+        with self._lock:
+            if self.suppressed:
+                logger.info("Headline dedup: %d near-duplicate headline(s) suppressed.", self.suppressed)
+                self.suppressed = 0
+            if not self.path or not self._dirty:
+                return
+            data = [
+                [ticker, base64.b64encode(sig.tobytes()).decode("ascii"), round(sent_at, 1)]
+                for ticker, sig, sent_at in self._entries.values()
+            ]
+            self._dirty = False
+        atomic_write_text(self.path, json.dumps(data, separators=(",", ":")))
+
+
+_seen: Optional[SeenHeadlines] = SeenHeadlines()
+
+
+def configure_dedup(cfg: Optional[Dict[str, Any]] = None) -> Optional[SeenHeadlines]:
+    """
+    (Re)create the process-wide seen-set from the "headline_dedup" config section.
+
+    Returns:
+        The seen-set, or None if deduplication is disabled.
+    """
+    global _seen
+    cfg = {**HEADLINE_DEDUP_DEFAULTS, **(cfg or {})}
+    _seen = None
+    if cfg.get("enabled"):
+        _seen = SeenHeadlines(
+            path=cfg.get("file") or None,
+            similarity=float(cfg["similarity"]),
+            window_s=float(cfg["window_hours"]) * 3600,
+            max_entries=int(cfg["max_entries"]),
+        )
+    return _seen
+
+
+def get_seen_headlines() -> Optional[SeenHeadlines]:
+    """Return the process-wide seen-set (None if deduplication is disabled)."""
+    return _seen
+
+
+def _signature(item: Dict[str, str]) -> np.ndarray:
+    return minhash(normalize_title(item.get("title", ""), item.get("source", "")))
+
+
+def dedupe_headlines(items: List[Dict[str, str]], ticker: str, limit: int) -> List[Dict[str, str]]:
+    """
+    Drop near-duplicate headlines before they are shown in an alert.
+
+    A headline is dropped if it is a near-duplicate of an earlier one in
+    `items` (the same story from another outlet) or of a headline already
+    sent for `ticker` within the window (see `SeenHeadlines`). Order is kept.
+
+    Args:
+        items: News items (see `fetch_headlines`); fetch more than `limit`
+            so there is something left after dropping.
+        ticker: Ticker the alert is for.
+        limit: Maximum number of items to return.
+
+    Returns:
+        List[Dict[str, str]]: At most `limit` items.
+    """
+    seen = get_seen_headlines()
+    if seen is None:
+        return items[:limit]
+
+    out: List[Dict[str, str]] = []
+    kept: List[np.ndarray] = []
+    dropped = 0
+    for it in items:
+        sig = _signature(it)
+        if any(_similarity(sig, k) >= seen.similarity for k in kept) or seen.seen(ticker, sig):
+            logger.debug("%s | Near-duplicate headline dropped: %s", ticker, it.get("title"))
+            dropped += 1
+            continue
+        out.append(it)
+        kept.append(sig)
+        if len(out) >= limit:
+            break
+    if dropped:
+        seen.count_suppressed(dropped)
+    return out
+
+
+def remember_headlines(items: List[Dict[str, str]], ticker: str) -> None:
+    """Record the headlines shown in an alert for `ticker` (see `dedupe_headlines`)."""
+    seen = get_seen_headlines()
+    if seen is None:
+        return
+    for it in items:
+        seen.add(ticker, _signature(it))
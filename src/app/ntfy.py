@@ -1,9 +1,17 @@
 import requests
 import logging
+from typing import Dict, Optional, Tuple
 from src.app.utils import mask_secret
+from src.app.breaker import CircuitOpen
+from src.app.concurrency import upstream
+from src.app import http_client
 
 logger = logging.getLogger("stock-alerts")
 
+# 4xx statuses that may succeed on a later attempt; every other 4xx
+# (bad topic or token, oversized body, ...) is a permanent rejection
+RETRYABLE_CLIENT_STATUSES = frozenset({408, 425, 429})
+
 def notify_ntfy(
     server: str,
     topic: str,
@@ -13,7 +21,7 @@ def notify_ntfy(
     dry_run: bool = False,
     markdown: bool = False,
     click_url: str | None = None,
-) -> None:
+) -> bool:
     """
     Send a push notification via ntfy.sh.
 
@@ -31,10 +39,11 @@ def notify_ntfy(
                                           tapping the notification.
 
     Returns:
-        None
+        bool: True if ntfy accepted the message, False on failure or dry run.
 
     Side effects:
-        - Performs an HTTP POST request to the ntfy server.
+        - Performs an HTTP POST request to the ntfy server (pooled session,
+          per-host timeout from `http_client`).
         - On success, the subscribed app receives a push message.
 
     Example:
@@ -49,8 +58,66 @@ def notify_ntfy(
     """
     if dry_run:
         logger.info("[DRY-RUN] %s | %s", title, message.replace("\n", " | "))
-        return
+        return False
+
+    status = send_ntfy(server, topic, title, message, markdown=markdown, click_url=click_url)
+    return status is not None and status < 400
+
 
+def send_ntfy(
+    server: str,
+    topic: str,
+    title: str,
+    message: str,
+    *,
+    markdown: bool = False,
+    click_url: str | None = None,
+) -> Optional[int]:
+    """
+    POST one notification to ntfy and return the HTTP status (see `notify_ntfy`).
+
+    Returns:
+        Optional[int]: Status code of ntfy's answer (< 400: accepted), or
+        None if no answer was received (connection error, timeout, open circuit).
+    """
+    url, headers = build_ntfy_request(server, topic, title, markdown=markdown, click_url=click_url)
+
+    try:
+        logger.info("Sending ntfy: title='%s', topic(masked)='%s'", title, mask_secret(topic))
+        with upstream("ntfy") as call:
+            r = http_client.post(url, data=message.encode("utf-8"), headers=headers)
+            call.report(r.status_code, r.headers)
+        r.raise_for_status()
+        logger.debug("ntfy Response: %s", r.status_code)
+    except requests.HTTPError as e:
+        logger.warning("ntfy send failed: %s", e)
+    except (requests.RequestException, CircuitOpen) as e:
+        logger.warning("ntfy send failed: %s", e)
+        return None
+    return r.status_code
+
+
+def is_permanent_rejection(status: Optional[int]) -> bool:
+    """True if ntfy refused a message for good (4xx other than RETRYABLE_CLIENT_STATUSES)."""
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_CLIENT_STATUSES
+
+
+def build_ntfy_request(
+    server: str,
+    topic: str,
+    title: str,
+    *,
+    markdown: bool = False,
+    click_url: str | None = None,
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Build the target URL and headers for an ntfy POST.
+
+    Shared by `notify_ntfy` and the async engine so both send identical requests.
+
+    Returns:
+        Tuple[str, Dict[str, str]]: (url, headers)
+    """
     # ntfy expects messages via HTTP POST to the topic URL
     url = f"{server.rstrip('/')}/{topic}"
     headers = {
@@ -68,10 +135,4 @@ def notify_ntfy(
         # this URL will be opened.
         headers["Click"] = click_url
 
-    try:
-        logger.info("Sending ntfy: title='%s', topic(masked)='%s'", title, mask_secret(topic))
-        r = requests.post(url, data=message.encode("utf-8"), headers=headers, timeout=20)
-        r.raise_for_status()
-        logger.debug("ntfy Response: %s", r.status_code)
-    except requests.RequestException as e:
-        logger.warning("ntfy send failed: %s", e)
+    return url, headers
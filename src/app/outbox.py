@@ -0,0 +1,304 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .concurrency import limit
+from .metrics import timed
+from .ntfy import is_permanent_rejection, send_ntfy
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
+# Default settings; overridable via the "outbox" config section.
+OUTBOX_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,         # Queue alerts on disk and deliver them in the background
+    "dir": "outbox",         # One JSON file per pending notification
+    "base_delay_s": 2.0,     # First retry delay (doubles per attempt, with jitter)
+    "max_delay_s": 300.0,    # Upper bound of the retry delay
+    "drain_seconds": 30.0,   # Max wait for deliveries at the end of a run
+}
+
+PENDING_SUFFIX = ".json"  # queued, not yet accepted by ntfy (or rejected for good, see `rejected`)
+SENT_SUFFIX = ".sent"     # accepted by ntfy, state not yet committed
+
+# Keys of one alert carried by a message (new state + alert history fields)
+ALERT_FIELDS = ("ticker", "state", "direction", "pct", "open", "last")
+
+
+@dataclass
+class OutboxMessage:
+    """
+    One queued notification: a single alert or a digest of several.
+
+    Carries everything needed to send it (ntfy target, title, body) and to
+    apply its outcome afterwards (`alerts`: new alert state and alert
+    history fields per ticker, see ALERT_FIELDS). `rejected` is the HTTP
+    status of a permanent rejection by ntfy (dead letter, not retried).
+    """
+    id: str
+    server: str
+    topic: str
+    title: str
+    body: str
+    alerts: List[Dict[str, Any]]  # e.g. [{"ticker": "SAP.DE", "state": "down:2", "direction": "down", ...}]
+    click_url: Optional[str] = None
+    markdown: bool = True
+    created: float = field(default_factory=time.time)
+    attempts: int = 0
+    next_attempt: float = 0.0
+    rejected: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        """Ticker of a single alert, or "digest (N alerts)" for logs."""
+        if len(self.alerts) == 1:
+            return str(self.alerts[0]["ticker"])
+        return f"digest ({len(self.alerts)} alerts)"
+
+
+class Outbox:
+    """
+    Durable queue of alert notifications with a background deliverer.
+
+    - `enqueue` writes the message to its own file (fsync + rename) and
+      returns right away; the caller never waits for ntfy.
+    - A deliverer thread sends due messages (at most `concurrency.ntfy` at
+      a time). A failed send is retried with exponential backoff and jitter,
+      without a limit on attempts, so no alert is dropped. A message ntfy
+      rejects for good (4xx such as a bad topic, token or oversized body)
+      is not retried: it is marked `rejected` and handed back by `drain`
+      like a delivered one, so its state is recorded as not delivered.
+    - A sent message is renamed to `*.sent` until its new state has been
+      recorded (`ack`), so a crash between delivery and commit neither
+      re-sends the alert nor loses its state.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        base_delay_s: float = 2.0,
+        max_delay_s: float = 300.0,
+        drain_seconds: float = 30.0,
+    ):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.base_delay_s = max(0.0, float(base_delay_s))
+        self.max_delay_s = max(self.base_delay_s, float(max_delay_s))
+        self.drain_seconds = float(drain_seconds)
+        self._queued: Dict[str, OutboxMessage] = {}
+        self._inflight: set = set()
+        self._sent: List[OutboxMessage] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+        self._load()
+
+    def _load(self) -> None:
+        """Pick up messages left over from earlier runs (queued and sent-but-unacknowledged)."""
+        for path in sorted(self.dir.iterdir()):
+            if path.suffix not in (PENDING_SUFFIX, SENT_SUFFIX) or path.name.startswith("."):
+                continue
+            try:
+                msg = OutboxMessage(**json.loads(path.read_text(encoding="utf-8")))
+            except Exception as e:
+                logger.warning("Skipping unreadable outbox message %s: %s", path.name, e)
+                continue
+            if path.suffix == SENT_SUFFIX or msg.rejected is not None:
+                self._sent.append(msg)
+            else:
+                self._queued[msg.id] = msg
+        if self._queued or self._sent:
+            logger.info("Outbox: %d queued, %d delivered but not committed.", len(self._queued), len(self._sent))
+
+    def _path(self, msg: OutboxMessage, suffix: str = PENDING_SUFFIX) -> Path:
+        return self.dir / f"{msg.id}{suffix}"
+
+    def enqueue(self, **fields: Any) -> OutboxMessage:
+        """
+        Durably queue one notification and wake up the deliverer.
+
+        Args:
+            **fields: `OutboxMessage` fields except id/created/attempts/next_attempt.
+
+        Returns:
+            The queued message.
+        """
+        alerts = fields.get("alerts") or []
+        name = alerts[0]["ticker"] if len(alerts) == 1 else "digest"
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", name)[:32]
+        msg = OutboxMessage(id=f"{time.time_ns():020d}-{safe}", **fields)
+        atomic_write_text(self._path(msg), json.dumps(asdict(msg), ensure_ascii=False))
+        with self._cond:
+            self._queued[msg.id] = msg
+            self._cond.notify_all()
+        self.start()
+        return msg
+
+    def pending_states(self) -> Dict[str, str]:
+        """{ticker: state} of alerts queued or delivered but not acknowledged (newest per ticker)."""
+        with self._cond:
+            messages = sorted([*self._queued.values(), *self._sent], key=lambda m: m.id)
+        return {a["ticker"]: a["state"] for m in messages for a in m.alerts}
+
+    def start(self) -> None:
+        """Start the deliverer thread (idempotent)."""
+        with self._cond:
+            if self._thread is not None or self._closed:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=limit("ntfy"), thread_name_prefix="outbox")
+            self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._thread.start()
+
+    def _due(self, now: float) -> List[OutboxMessage]:
+        """Queued messages whose next attempt is due and that are not being sent (lock held)."""
+        return [m for m in self._queued.values() if m.id not in self._inflight and m.next_attempt <= now]
+
+    def _run(self) -> None:
+        """Deliverer loop: hand due messages to the pool, sleep until the next one is due."""
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                due = self._due(now)
+                free = limit("ntfy") - len(self._inflight)
+                for msg in sorted(due, key=lambda m: m.id)[:max(0, free)]:
+                    self._inflight.add(msg.id)
+                    self._pool.submit(self._deliver, msg)
+                # Due messages beyond the free slots are picked up when a delivery finishes (notify)
+                waiting = [m.next_attempt for m in self._queued.values() if m.next_attempt > now]
+                timeout = min(waiting) - now if waiting else None
+                self._cond.wait(timeout)
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter (half fixed, half random)."""
+        delay = min(self.max_delay_s, self.base_delay_s * 2 ** max(0, attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _deliver(self, msg: OutboxMessage) -> None:
+        """Send one message (pool thread) and record the outcome."""
+        try:
+            with timed("notify"):
+                status = send_ntfy(
+                    msg.server, msg.topic, msg.title, msg.body,
+                    markdown=msg.markdown, click_url=msg.click_url,
+                )
+        except Exception as e:
+            logger.warning("ntfy send failed: %s", e)
+            status = None
+        ok = status is not None and status < 400
+        try:
+            if ok:
+                os.replace(self._path(msg), self._path(msg, SENT_SUFFIX))
+            elif is_permanent_rejection(status):
+                # Retrying cannot help (bad topic/token, oversized body): dead letter
+                msg.attempts += 1
+                msg.rejected = status
+                atomic_write_text(self._path(msg), json.dumps(asdict(msg), ensure_ascii=False))
+                logger.error(
+                    "Alert for %s rejected by ntfy (HTTP %d); not retrying, recorded as not delivered.",
+                    msg.label, status,
+                )
+            else:
+                msg.attempts += 1
+                msg.next_attempt = time.time() + self._backoff(msg.attempts)
+                atomic_write_text(self._path(msg), json.dumps(asdict(msg), ensure_ascii=False))
+                logger.warning(
+                    "Alert for %s not delivered (attempt %d); retrying in %.1fs.",
+                    msg.label, msg.attempts, msg.next_attempt - time.time(),
+                )
+        except OSError as e:
+            logger.warning("Could not update outbox message %s: %s", msg.id, e)
+        with self._cond:
+            self._inflight.discard(msg.id)
+            if ok or msg.rejected is not None:
+                self._queued.pop(msg.id, None)
+                self._sent.append(msg)
+            self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> List[OutboxMessage]:
+        """
+        Wait (at most `timeout` seconds, default `drain_seconds`) for deliveries,
+        then return the delivered messages.
+
+        Waits while a message is being sent or will be due before the
+        deadline (retries included). Messages still queued afterwards stay
+        on disk and are delivered by the running deliverer or the next run.
+
+        Returns:
+            Delivered (or permanently rejected, see `OutboxMessage.rejected`)
+            messages not yet returned; pass each to `ack` once its state has
+            been recorded.
+        """
+        deadline = time.time() + max(0.0, self.drain_seconds if timeout is None else timeout)
+        with self._cond:
+            while True:
+                now = time.time()
+                busy = self._inflight or any(m.next_attempt <= deadline for m in self._queued.values())
+                if not busy or now >= deadline:
+                    break
+                self._cond.wait(min(deadline - now, 0.5))
+            sent, self._sent = self._sent, []
+            if self._queued:
+                logger.info("Outbox: %d alert(s) still queued for delivery.", len(self._queued))
+        return sent
+
+    def ack(self, msg: OutboxMessage) -> None:
+        """Forget a delivered (or rejected) message after its state was recorded."""
+        try:
+            self._path(msg, SENT_SUFFIX if msg.rejected is None else PENDING_SUFFIX).unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """
+        Stop the deliverer; queued messages stay on disk for the next run.
+
+        Sends already in flight are finished (and their outcome recorded),
+        so a message is never sent by two processes/instances at once.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+_outbox: Optional[Outbox] = None
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> Optional[Outbox]:
+    """
+    (Re)create the process-wide outbox from the "outbox" config section.
+
+    Returns:
+        The outbox, or None if disabled (alerts are then sent inline).
+    """
+    global _outbox
+    cfg = {**OUTBOX_DEFAULTS, **(cfg or {})}
+    if _outbox is not None:
+        _outbox.close()
+        _outbox = None
+    if cfg.get("enabled"):
+        _outbox = Outbox(
+            Path(cfg["dir"]),
+            base_delay_s=float(cfg["base_delay_s"]),
+            max_delay_s=float(cfg["max_delay_s"]),
+            drain_seconds=float(cfg["drain_seconds"]),
+        )
+    return _outbox
+
+
+def get_outbox() -> Optional[Outbox]:
+    """Return the process-wide outbox (None if not configured or disabled)."""
+    return _outbox
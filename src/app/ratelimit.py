@@ -0,0 +1,288 @@
+from __future__ import annotations
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Mapping, Optional
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:  # older yfinance: rate limits surface as empty data only
+    YFRateLimitError = None
+
+logger = logging.getLogger("stock-alerts")
+
+# Default settings; overridable via the "ratelimit" config section.
+# Rates are requests per second; "burst" is the token bucket size.
+RATELIMIT_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "increase": 0.5,           # Additive rate increase per successful request (req/s)
+    "decrease": 0.5,           # Multiplicative decrease on 429/5xx (rate and window)
+    "yahoo": {"rate": 10.0, "min_rate": 0.5, "max_rate": 50.0, "burst": 5},
+    "google_news": {"rate": 5.0, "min_rate": 0.2, "max_rate": 20.0, "burst": 5},
+    "ntfy": {"rate": 5.0, "min_rate": 0.2, "max_rate": 20.0, "burst": 5},
+}
+
+class RateLimited(RuntimeError):
+    """An upstream throttled the request and returned no usable data."""
+
+
+# Statuses that mean "slow down" (everything else counts as success)
+THROTTLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Longest pause a Retry-After header can impose (workers wait inside their slot)
+MAX_RETRY_AFTER_S = 60.0
+# A burst of throttled responses to requests already in flight halves the rate once, not per response
+DECREASE_COOLDOWN_S = 1.0
+# Poll interval of the async acquire while the concurrency window is full
+_ASYNC_POLL_S = 0.05
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket with AIMD control for one upstream.
+
+    - Each request takes a token; tokens refill at `rate` per second (at
+      most `burst` saved up).
+    - At most `window` requests are in flight (≤ the `concurrency` limit).
+    - Success: `rate` grows by `increase`, `window` by 1/window (additive).
+    - 429 / 5xx / `YFRateLimitError`: `rate` and `window` are multiplied
+      by `decrease` (multiplicative), and a Retry-After pauses the upstream.
+
+    Thread-safe; the async engine uses `acquire_async`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: float,
+        increase: float,
+        decrease: float,
+    ):
+        self.name = name
+        self.min_rate = max(0.01, float(min_rate))
+        self.max_rate = max(self.min_rate, float(max_rate))
+        self.rate = min(self.max_rate, max(self.min_rate, float(rate)))
+        self.burst = max(1.0, float(burst))
+        self.increase = max(0.0, float(increase))
+        self.decrease = min(1.0, max(0.01, float(decrease)))
+        self.window: Optional[float] = None  # set from the concurrency limit on first use
+        self.inflight = 0
+        self.tokens = self.burst
+        self.successes = 0
+        self.throttles = 0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def _reserve(self, cap: int) -> Optional[float]:
+        """
+        Take a slot and a token if possible (lock held).
+
+        Returns:
+            0.0 if taken, seconds until a token is due, or None if the
+            concurrency window is full (wait for a release).
+        """
+        now = time.monotonic()
+        if self.window is None:
+            self.window = float(cap)
+        self.window = min(self.window, float(cap))
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.inflight >= max(1, int(self.window)):
+            return None
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.inflight += 1
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def acquire(self, cap: int) -> None:
+        """Block until a request may start (`cap` = hard concurrency limit)."""
+        with self._cond:
+            while True:
+                wait = self._reserve(cap)
+                if wait == 0.0:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self, cap: int) -> None:
+        """`acquire` for the event loop (sleeps instead of blocking)."""
+        while True:
+            with self._cond:
+                wait = self._reserve(cap)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(_ASYNC_POLL_S if wait is None else wait)
+
+    def release(self, throttled: Optional[bool] = False, retry_after: Optional[float] = None) -> None:
+        """
+        Finish a request and adapt rate and window to its outcome
+        (`throttled` None: no signal either way, e.g. a timeout).
+        """
+        with self._cond:
+            self.inflight = max(0, self.inflight - 1)
+            now = time.monotonic()
+            if throttled is None:
+                pass
+            elif throttled:
+                self.throttles += 1
+                if now - self._last_decrease >= DECREASE_COOLDOWN_S:
+                    self._last_decrease = now
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+                    self.window = max(1.0, (self.window or 1.0) * self.decrease)
+                    logger.warning(
+                        "%s throttled: slowing down to %.2f req/s, %d parallel.",
+                        self.name, self.rate, int(self.window),
+                    )
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            else:
+                self.successes += 1
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                if self.window is not None:
+                    self.window += 1.0 / self.window
+            self._cond.notify_all()
+
+    def describe(self) -> str:
+        """One-line summary for the run log."""
+        with self._cond:
+            window = "-" if self.window is None else str(int(self.window))
+            return f"{self.name} {self.rate:.1f} req/s ×{window} ({self.successes} ok, {self.throttles} throttled)"
+
+
+class Call:
+    """
+    Handle of one rate-limited request; report its HTTP status with `report`.
+
+    Leaving the block normally counts as success, an exception as
+    throttled if it is a rate limit (`YFRateLimitError`, HTTP 429/5xx),
+    otherwise (timeouts, connection errors) as neither.
+    """
+
+    def __init__(self):
+        self.throttled: Optional[bool] = None
+        self.retry_after: Optional[float] = None
+
+    def report(self, status: int, headers: Optional[Mapping[str, str]] = None) -> None:
+        """Record the HTTP status (and Retry-After) of the response."""
+        self.throttled = status in THROTTLE_STATUSES
+        if self.throttled and headers is not None:
+            self.retry_after = _retry_after(headers.get("Retry-After"))
+
+    @property
+    def ok(self) -> bool:
+        """False if the request was throttled (see `breaker`)."""
+        return not self.throttled
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds of a Retry-After header, capped at MAX_RETRY_AFTER_S (HTTP dates are ignored)."""
+    try:
+        return min(MAX_RETRY_AFTER_S, max(0.0, float(value))) if value else None
+    except ValueError:
+        return None
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    """True if the exception means the upstream throttled us."""
+    if YFRateLimitError is not None and isinstance(exc, YFRateLimitError):
+        return True
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) in THROTTLE_STATUSES
+
+
+_settings: Dict[str, Any] = dict(RATELIMIT_DEFAULTS)
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_lock = threading.Lock()
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Apply the "ratelimit" config section. Limiters are (re)created lazily,
+    so learned rates are kept across cycles unless the settings change.
+    """
+    global _settings
+    cfg = cfg or {}
+    merged = {**RATELIMIT_DEFAULTS, **cfg}
+    for name, default in RATELIMIT_DEFAULTS.items():
+        if isinstance(default, dict):
+            merged[name] = {**default, **cfg.get(name, {})}
+    with _lock:
+        if merged != _settings:
+            _settings = merged
+            _limiters.clear()
+
+
+def get_limiter(name: str) -> Optional[AdaptiveLimiter]:
+    """Limiter of an upstream (None if rate limiting is disabled)."""
+    if not _settings.get("enabled", True):
+        return None
+    with _lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            up = _settings.get(name) or RATELIMIT_DEFAULTS["yahoo"]
+            limiter = _limiters[name] = AdaptiveLimiter(
+                name,
+                rate=up["rate"],
+                min_rate=up["min_rate"],
+                max_rate=up["max_rate"],
+                burst=up["burst"],
+                increase=_settings["increase"],
+                decrease=_settings["decrease"],
+            )
+        return limiter
+
+
+@contextmanager
+def limited(name: str, cap: int) -> Iterator[Call]:
+    """
+    Wait for the upstream's rate limit, run the block, adapt to its outcome.
+
+    Args:
+        name: Upstream ("yahoo", "google_news", "ntfy").
+        cap: Hard concurrency limit of the upstream (see `concurrency.limit`).
+    """
+    call = Call()
+    limiter = get_limiter(name)
+    if limiter is None:
+        yield call
+        return
+    limiter.acquire(cap)
+    try:
+        yield call
+    except BaseException as e:
+        limiter.release(throttled=True if call.throttled or is_rate_limit(e) else None, retry_after=call.retry_after)
+        raise
+    limiter.release(throttled=bool(call.throttled), retry_after=call.retry_after)
+
+
+@asynccontextmanager
+async def limited_async(name: str, cap: int) -> AsyncIterator[Call]:
+    """Async counterpart of `limited` (for the asyncio engine)."""
+    call = Call()
+    limiter = get_limiter(name)
+    if limiter is None:
+        yield call
+        return
+    await limiter.acquire_async(cap)
+    try:
+        yield call
+    except BaseException as e:
+        limiter.release(throttled=True if call.throttled or is_rate_limit(e) else None, retry_after=call.retry_after)
+        raise
+    limiter.release(throttled=bool(call.throttled), retry_after=call.retry_after)
+
+
+def describe() -> str:
+    """Current rates of all upstreams used so far (for the run log)."""
+    with _lock:
+        limiters = list(_limiters.values())
+    return " | ".join(l.describe() for l in limiters)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .utils import atomic_write_text
+
+logger = logging.getLogger("stock-alerts")
+
+# Default settings; overridable via the "redirect_cache" config section.
+REDIRECT_CACHE_DEFAULTS: Dict[str, Any] = {
+    "file": "redirect_cache.json",  # On-disk cache (empty/None = memory only)
+    "ttl_hours": 72,                # Lifetime of a resolved link
+    "negative_ttl_minutes": 30,     # Lifetime of a failed resolution
+    "max_entries": 5000,            # LRU bound
+}
+
+
+class RedirectCache:
+    """
+    TTL-bounded LRU cache from Google News redirect link to original URL.
+
+    - Positive entries map a link to its resolved URL (`ttl_hours`).
+    - Negative entries (value None) remember failed resolutions for a
+      shorter time (`negative_ttl_minutes`), so a broken link is not
+      retried on every alert.
+    - At most `max_entries` links are kept; the least recently used go first.
+    - Concurrent callers asking for the same link wait for one resolution
+      instead of each sending their own request.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl_s: float = 72 * 3600,
+        negative_ttl_s: float = 30 * 60,
+        max_entries: int = 5000,
+    ):
+        self.path = Path(path) if path else None
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_entries = max(1, int(max_entries))
+        # link -> (resolved_url | None, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Load unexpired entries from disk (oldest first, so LRU order is kept)."""
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Could not load redirect cache (%s). Starting empty.", e)
+            return
+        now = time.time()
+        for link, (url, expires) in data.items():
+            if expires > now:
+                self._entries[link] = (url, float(expires))
+        self._evict()
+
+    def save(self) -> None:
+        """Write the cache to disk (atomic) if it changed; log hit statistics."""
+        with self._lock:
+            if self.hits or self.misses:
+                logger.info("Redirect cache: %d hit(s), %d miss(es), %d entries.", self.hits, self.misses, len(self._entries))
+            self.hits = self.misses = 0
+            if not self.path or not self._dirty:
+                return
+            data = {link: [url, expires] for link, (url, expires) in self._entries.items()}
+            self._dirty = False
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
+
+    def _evict(self) -> None:
+        """Drop least recently used entries beyond `max_entries` (lock held)."""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, link: str) -> Tuple[bool, Optional[str]]:
+        """
+        Look up a link.
+
+        Returns:
+            (found, url): found=False on a miss or expired entry; url is None
+            for a cached failure.
+        """
+        with self._lock:
+            entry = self._entries.get(link)
+            if entry is None:
+                return False, None
+            url, expires = entry
+            if expires <= time.time():
+                del self._entries[link]
+                self._dirty = True
+                return False, None
+            self._entries.move_to_end(link)
+            return True, url
+
+    def put(self, link: str, url: Optional[str]) -> None:
+        """Store a resolution (url=None caches a failure)."""
+        ttl = self.ttl_s if url else self.negative_ttl_s
+        with self._lock:
+            self._entries[link] = (url, time.time() + ttl)
+            self._entries.move_to_end(link)
+            self._evict()
+            self._dirty = True
+
+    def count(self, hit: bool) -> None:
+        """Count a lookup answered outside `resolve` (e.g. by the async engine)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def resolve(self, link: str, fetch: Callable[[], Optional[str]]) -> str:
+        """
+        Return the cached resolution of `link`, or call `fetch` once to get it.
+
+        Args:
+            link: Google News redirect link.
+            fetch: Performs the network resolution; returns the final URL or
+                   None on failure.
+
+        Returns:
+            The resolved URL, or `link` itself if resolution failed.
+        """
+        while True:
+            found, url = self.get(link)
+            if found:
+                with self._lock:
+                    self.hits += 1
+                return url or link
+
+            with self._lock:
+                event = self._inflight.get(link)
+                if event is None:
+                    event = self._inflight[link] = threading.Event()
+                    owner = True
+                    self.misses += 1
+                else:
+                    owner = False
+
+            if not owner:
+                # Another thread is resolving the same link; use its result
+                event.wait()
+                continue
+
+            url = None
+            try:
+                url = fetch()
+            finally:
+                self.put(link, url)
+                with self._lock:
+                    self._inflight.pop(link, None)
+                event.set()
+            return url or link
+
+
+_cache = RedirectCache()
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> RedirectCache:
+    """
+    (Re)create the process-wide cache from the "redirect_cache" config section.
+
+    Kept as a module-level instance so every link is resolved at most once
+    per process (also across daemon cycles).
+    """
+    global _cache
+    cfg = {**REDIRECT_CACHE_DEFAULTS, **(cfg or {})}
+    _cache = RedirectCache(
+        path=cfg.get("file") or None,
+        ttl_s=float(cfg["ttl_hours"]) * 3600,
+        negative_ttl_s=float(cfg["negative_ttl_minutes"]) * 60,
+        max_entries=int(cfg["max_entries"]),
+    )
+    return _cache
+
+
+def get_cache() -> RedirectCache:
+    """Return the process-wide redirect cache."""
+    return _cache
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import logging
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+from .core import seconds_until_market_open
+
+logger = logging.getLogger("stock-alerts")
+
+# Upper bound for one sleep while the market is closed, so that clock
+# jumps (suspend, DST) and config mistakes are corrected within an hour.
+MAX_CLOSED_SLEEP_S = 3600.0
+
+
+def _fmt_duration(seconds: float) -> str:
+    """Format a duration as e.g. '2h05m' or '45s' for log output."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    h, m = divmod(seconds // 60, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m"
+
+
+def install_stop_handlers(stop: threading.Event) -> None:
+    """Set `stop` on SIGINT/SIGTERM so the daemon finishes the current cycle and exits."""
+    def _handler(signum, _frame):
+        logger.info("Received signal %s — stopping after the current cycle.", signum)
+        stop.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            signal.signal(sig, _handler)
+        except (ValueError, OSError):
+            # Not in the main thread / unsupported on this platform
+            pass
+
+
+def run_daemon(
+    run_cycle: Callable[[], None],
+    interval_s: float,
+    market_hours_cfg: dict,
+    *,
+    bypass_market_hours: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Run `run_cycle` every `interval_s` seconds until stopped.
+
+    Scheduling:
+      - Fixed rate: cycles start every `interval_s` seconds measured from
+        the previous start; if a cycle overruns, missed slots are skipped
+        instead of running back-to-back.
+      - Outside market hours the daemon sleeps until the next window
+        opens (capped at MAX_CLOSED_SLEEP_S per sleep) instead of polling.
+      - Exceptions of a cycle are logged; the daemon keeps running.
+
+    Args:
+        run_cycle: One monitoring cycle (e.g. a bound `run_once` call).
+        interval_s: Seconds between cycle starts.
+        market_hours_cfg: Market hours config (see `core.is_market_hours`).
+        bypass_market_hours: Ignore market hours (test mode).
+        stop: Event to end the loop; SIGINT/SIGTERM handlers are
+              installed if not given.
+    """
+    if stop is None:
+        stop = threading.Event()
+        install_stop_handlers(stop)
+
+    interval_s = max(1.0, float(interval_s))
+    logger.info("Daemon started: interval=%s", _fmt_duration(interval_s))
+    next_run = time.monotonic()
+
+    while not stop.is_set():
+        if not bypass_market_hours:
+            wait = seconds_until_market_open(market_hours_cfg)
+            if wait > 0:
+                logger.info("Market closed — sleeping %s until next open.", _fmt_duration(wait))
+                stop.wait(min(wait, MAX_CLOSED_SLEEP_S))
+                next_run = time.monotonic()
+                continue
+
+        now = time.monotonic()
+        if now < next_run:
+            stop.wait(next_run - now)
+            continue
+
+        try:
+            run_cycle()
+        except Exception:
+            logger.exception("Monitoring cycle failed")
+
+        # Fixed-rate schedule; skip slots we already missed
+        next_run += interval_s
+        now = time.monotonic()
+        if next_run < now:
+            skipped = int((now - next_run) // interval_s) + 1
+            logger.warning("Cycle overran the interval; skipping %d slot(s).", skipped)
+            next_run += skipped * interval_s
+
+    logger.info("Daemon stopped.")
@@ -0,0 +1,303 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .thresholds import ThresholdTable
+
+# Alert directions as small integers (same codes as the alert history)
+DIRECTION_CODES: Dict[str, int] = {"up": 1, "down": -1, "none": 0}
+DIRECTION_NAMES: Dict[int, str] = {v: k for k, v in DIRECTION_CODES.items()}
+
+ArrayLike = Union[float, np.ndarray, List[float]]
+
+
+def parse_state(state: Optional[str]) -> Tuple[int, int]:
+    """
+    Split a stored alert state into (direction code, ladder level).
+
+    "up" / "down" are level 1 (the plain threshold), "up:2" is the second
+    ladder level, "none" (or anything unknown) is (0, 0).
+    """
+    name, _, level = (state or "none").partition(":")
+    code = DIRECTION_CODES.get(name, 0)
+    if code == 0:
+        return 0, 0
+    return code, int(level) if level.isdigit() and int(level) > 0 else 1
+
+
+def format_state(direction: str, level: int = 1) -> str:
+    """Inverse of `parse_state`: "up" for level 1, "up:3" for higher levels, "none" for no alert."""
+    if direction == "none" or level <= 0:
+        return "none"
+    return direction if level == 1 else f"{direction}:{level}"
+
+
+class TickerSignal(NamedTuple):
+    """Evaluation result of one ticker (a row of `Signals`)."""
+    ticker: str
+    open: float
+    last: float
+    pct: float            # Δ% vs. open used for the decision
+    raw_pct: float        # Δ% from the prices (differs from pct only in test mode)
+    direction: str        # "up" | "down" | "none"
+    level: int            # Ladder levels crossed (0 = inside the corridor)
+    prev: str             # Previous alert state (e.g. "none", "up", "down:2")
+    up_pct: float         # Threshold for an "up" alert
+    down_pct: float       # Threshold for a "down" alert (positive number)
+    alert: bool           # New breakout → send alert
+    reset: bool           # Back inside the re-arm band → reset state
+    relevel: bool         # Fell back below a higher rung's re-arm band → lower the stored level
+    held_level: int       # Ladder levels still held after per-level re-arm
+    suppressed: bool      # Breakout, but same-direction alert within min_realert_minutes
+    error: Optional[str]  # Why no decision was possible (missing price, open 0)
+
+    @property
+    def state(self) -> str:
+        """Alert state after this evaluation's alert (e.g. "up:2")."""
+        return format_state(self.direction, self.level)
+
+
+@dataclass
+class Signals:
+    """
+    Vectorized evaluation of a whole watchlist (one entry per ticker).
+
+    Attributes are aligned arrays; `alert` and `reset` select the tickers
+    whose state changes. Use `row(i)` / iteration for per-ticker access.
+    """
+    tickers: List[str]
+    open: np.ndarray
+    last: np.ndarray
+    pct: np.ndarray
+    raw_pct: np.ndarray
+    direction: np.ndarray  # int8 codes, see DIRECTION_CODES
+    level: np.ndarray      # ladder levels crossed (int16)
+    prev: np.ndarray       # int8 codes
+    prev_level: np.ndarray # int16
+    up_pct: np.ndarray     # thresholds per ticker
+    down_pct: np.ndarray
+    valid: np.ndarray      # price available and open != 0
+    alert: np.ndarray
+    reset: np.ndarray
+    relevel: np.ndarray
+    held_level: np.ndarray # int16
+    suppressed: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def row(self, i: int) -> TickerSignal:
+        """Per-ticker view of entry `i`."""
+        error = None
+        if not self.valid[i]:
+            if np.isnan(self.open[i]) or np.isnan(self.last[i]):
+                error = f"No data available for {self.tickers[i]}"
+            else:
+                error = f"Open is 0 for {self.tickers[i]}; cannot compute Δ%."
+        return TickerSignal(
+            ticker=self.tickers[i],
+            open=float(self.open[i]),
+            last=float(self.last[i]),
+            pct=float(self.pct[i]),
+            raw_pct=float(self.raw_pct[i]),
+            direction=DIRECTION_NAMES[int(self.direction[i])],
+            level=int(self.level[i]),
+            prev=format_state(DIRECTION_NAMES[int(self.prev[i])], int(self.prev_level[i])),
+            up_pct=float(self.up_pct[i]),
+            down_pct=float(self.down_pct[i]),
+            alert=bool(self.alert[i]),
+            reset=bool(self.reset[i]),
+            relevel=bool(self.relevel[i]),
+            held_level=int(self.held_level[i]),
+            suppressed=bool(self.suppressed[i]),
+            error=error,
+        )
+
+    def __iter__(self):
+        return (self.row(i) for i in range(len(self)))
+
+
+def evaluate_signals(
+    opens: ArrayLike,
+    lasts: ArrayLike,
+    prev: ArrayLike,
+    threshold_pct: ArrayLike,
+    force_delta_pct: Optional[float] = None,
+    down_pct: Optional[ArrayLike] = None,
+    prev_level: Optional[ArrayLike] = None,
+    ladder: ArrayLike = (1.0,),
+    rearm_factor: float = 1.0,
+    recent: Optional[ArrayLike] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Classify Δ% vs. open against the threshold for many tickers at once.
+
+    Pure function (no I/O, no logging), so it can be benchmarked and reused.
+
+    Ladder: `ladder` holds sorted multiples of the threshold (first = 1.0);
+    the level of a ticker is the number of rungs |Δ%| / threshold has
+    reached (binary search via `np.searchsorted`). An alert is due for a
+    new direction or a higher level than the previous one, so each rung
+    alerts once until it is re-armed.
+
+    Hysteresis: an alerted ticker re-arms (reset) only once its move on the
+    alerted side falls below `rearm_factor` × that side's threshold; a move
+    to the opposite side always counts as re-armed. In between its state
+    is kept. Higher rungs re-arm the same way: once the move falls below
+    `rearm_factor` × a rung above the one it still holds, the stored level drops
+    to the held level ("relevel") and those rungs can alert again. A new
+    breakout in the direction given by `recent` (last alert within the
+    minimum re-alert interval) is suppressed instead of alerted.
+
+    Args:
+        opens: Opening prices (NaN = no data).
+        lasts: Last prices (NaN = no data).
+        prev: Previous directions as codes (see DIRECTION_CODES).
+        threshold_pct: Alert threshold in percent (scalar or per ticker);
+            for "up" moves, and for "down" moves unless `down_pct` is given.
+        force_delta_pct: Test mode: use this Δ% for every ticker with data.
+        down_pct: Optional separate threshold for "down" moves (positive).
+        prev_level: Previous ladder levels (default: 1 where `prev` != 0).
+        ladder: Sorted threshold multiples, e.g. [1, 2, 4] → 3%, 6%, 12%.
+        rearm_factor: Re-arm below this fraction of the threshold (0 < f ≤ 1).
+        recent: Direction codes of alerts sent within the minimum re-alert
+            interval (0 = none; default: no suppression).
+
+    Returns:
+        dict of aligned arrays: "last" (adjusted in test mode), "pct",
+        "raw_pct", "direction", "level", "valid", "alert", "reset",
+        "relevel", "held_level" (stored level after a relevel), "suppressed".
+    """
+    opens = np.asarray(opens, dtype=np.float64)
+    lasts = np.asarray(lasts, dtype=np.float64)
+    prev = np.asarray(prev, dtype=np.int8)
+    up_pct = np.asarray(threshold_pct, dtype=np.float64)
+    down_pct = up_pct if down_pct is None else np.asarray(down_pct, dtype=np.float64)
+
+    valid = np.isfinite(opens) & np.isfinite(lasts) & (opens != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw_pct = (lasts - opens) / opens * 100.0
+    raw_pct = np.where(valid, raw_pct, np.nan)
+
+    pct = raw_pct
+    if force_delta_pct is not None:
+        # Test override: force a specific delta to simulate alerts
+        pct = np.where(valid, float(force_delta_pct), np.nan)
+        lasts = np.where(valid, opens * (1.0 + pct / 100.0), lasts)
+
+    prev_level = (prev != 0).astype(np.int16) if prev_level is None else np.asarray(prev_level, dtype=np.int16)
+
+    # Move in units of the ticker's threshold (side-specific), then binary-search the rungs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(pct >= 0, pct / up_pct, -pct / down_pct)
+    ratio = np.where(valid, ratio, 0.0)
+    rungs = np.asarray(ladder, dtype=np.float64)
+    level = np.searchsorted(rungs, ratio, side="right").astype(np.int16)
+    direction = np.where(level > 0, np.sign(pct), 0).astype(np.int8)
+    # Move on the previously alerted side, in units of that side's threshold (negative: other side)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prev_ratio = np.where(prev > 0, pct / up_pct, np.where(prev < 0, -pct / down_pct, 0.0))
+    prev_ratio = np.where(valid, prev_ratio, 0.0)
+    # Rungs still held: those whose re-arm band (rung × factor) the move has not fallen below
+    held_level = np.searchsorted(rungs * rearm_factor, prev_ratio, side="right").astype(np.int16)
+
+    alert = valid & (direction != 0) & ((direction != prev) | (level > prev_level))
+    reset = valid & (direction == 0) & (prev != 0) & (prev_ratio < rearm_factor)
+    relevel = valid & ~alert & ~reset & (prev != 0) & (held_level > 0) & (held_level < prev_level)
+    suppressed = np.zeros(pct.shape, dtype=bool)
+    if recent is not None:
+        # Re-breakout after a reset, same direction as an alert sent moments ago → flapping
+        suppressed = alert & (prev == 0) & (direction == np.asarray(recent, dtype=np.int8))
+        alert &= ~suppressed
+    return {
+        "last": lasts,
+        "pct": pct,
+        "raw_pct": raw_pct,
+        "direction": direction,
+        "level": level,
+        "valid": valid,
+        "alert": alert,
+        "reset": reset,
+        "relevel": relevel,
+        "held_level": held_level,
+        "suppressed": suppressed,
+    }
+
+
+def evaluate_watchlist(
+    tickers: List[str],
+    prices: Mapping[str, Optional[Tuple[float, float]]],
+    state: Mapping[str, str],
+    threshold_pct: Union[float, "ThresholdTable"],
+    test_cfg: Optional[dict] = None,
+    rearm_factor: float = 1.0,
+    recent: Optional[Mapping[str, str]] = None,
+) -> Signals:
+    """
+    Build the input arrays for all tickers and evaluate them in one pass.
+
+    Args:
+        tickers: Watchlist (order is kept).
+        prices: {ticker: (open, last)} from the price fetch (missing = no data).
+        state: Previous alert states {ticker: "up" | "down" | "none" | "up:2" ...}
+            (see `parse_state`).
+        threshold_pct: Global alert threshold in percent, or a compiled
+            `ThresholdTable` (or `volatility.ZScoreThresholds`) with
+            per-ticker up/down thresholds.
+        test_cfg: Test mode config (`force_delta_pct` is applied if enabled).
+        rearm_factor: Hysteresis band (see `evaluate_signals`).
+        recent: {ticker: "up" | "down"} of alerts within the minimum
+            re-alert interval (see `state.AlertHistory.recent_alerts`).
+
+    Returns:
+        Signals
+    """
+    test_cfg = test_cfg or {}
+    n = len(tickers)
+    opens = np.full(n, np.nan)
+    lasts = np.full(n, np.nan)
+    for i, tk in enumerate(tickers):
+        price = prices.get(tk)
+        if price is not None:
+            opens[i], lasts[i] = price
+    parsed = np.array([parse_state(state.get(tk)) for tk in tickers], dtype=np.int16).reshape(-1, 2)
+    prev, prev_level = parsed[:, 0].astype(np.int8), parsed[:, 1]
+
+    if isinstance(threshold_pct, (int, float)):
+        up_pct = down_pct = np.full(n, float(threshold_pct))
+        ladder = (1.0,)
+    else:
+        up_pct, down_pct = threshold_pct.arrays(list(tickers))
+        ladder = threshold_pct.ladder
+
+    recent_codes = None
+    if recent:
+        recent_codes = np.array([DIRECTION_CODES.get(recent.get(tk, "none"), 0) for tk in tickers], dtype=np.int8)
+
+    force = test_cfg.get("force_delta_pct") if test_cfg.get("enabled") else None
+    out = evaluate_signals(
+        opens, lasts, prev, up_pct,
+        force_delta_pct=force, down_pct=down_pct, prev_level=prev_level, ladder=ladder,
+        rearm_factor=rearm_factor, recent=recent_codes,
+    )
+    return Signals(
+        tickers=list(tickers),
+        open=opens,
+        last=out["last"],
+        pct=out["pct"],
+        raw_pct=out["raw_pct"],
+        direction=out["direction"],
+        level=out["level"],
+        prev=prev,
+        prev_level=prev_level,
+        up_pct=up_pct,
+        down_pct=down_pct,
+        valid=out["valid"],
+        alert=out["alert"],
+        reset=out["reset"],
+        relevel=out["relevel"],
+        held_level=out["held_level"],
+        suppressed=out["suppressed"],
+    )
@@ -1,10 +1,62 @@
+import hashlib
 import json
 import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .utils import atomic_write_text
 
 logger = logging.getLogger("stock-alerts")
 
+# Crash-safety journal next to the state file/database, one per backend
+# (alert_state.json.journal / alert_state.db.journal)
+JOURNAL_SUFFIX = ".journal"
+
+# Append-only alert event log, kept next to the state file
+ALERT_HISTORY_FILE_NAME = "alert_history.bin"
+_HISTORY_MAGIC = b"SNAHIST1"  # file header: format/version marker
+# One fixed-size record per event (little-endian, 50 bytes)
+HISTORY_DTYPE = np.dtype([
+    ("ts", "<f8"),          # Unix time (UTC seconds)
+    ("ticker", "S16"),      # Ticker symbol (see `history_key`)
+    ("open", "<f8"),        # Open of the day
+    ("last", "<f8"),        # Last price
+    ("pct", "<f8"),         # Δ% vs. open
+    ("direction", "i1"),    # 1 = up alert, -1 = down alert, 0 = back in corridor
+    ("delivered", "?"),     # Notification accepted by ntfy
+])
+_DIRECTION_CODES = {"up": 1, "down": -1, "none": 0}
+
+
+def history_key(ticker: str) -> bytes:
+    """
+    Ticker as stored in an `AlertHistory` record (field "ticker", S16).
+
+    ASCII symbols of up to 16 bytes are stored as is. Longer or non-ASCII
+    symbols would be truncated or mangled by the fixed-size field (and could
+    collide), so they are stored as their first 7 characters, "~" and an
+    8-digit hash of the full symbol. Lookups must go through this function.
+
+    Args:
+        ticker (str): Ticker symbol.
+
+    Returns:
+        bytes: Key of at most 16 bytes.
+    """
+    raw = ticker.encode("utf-8")
+    if len(raw) <= 16 and raw.isascii():
+        return raw
+    digest = hashlib.blake2b(raw, digest_size=4).hexdigest()
+    return ticker.encode("ascii", "replace")[:7] + b"~" + digest.encode("ascii")
+
 
 def load_state(path: Path) -> Dict[str, str]:
     """
@@ -48,10 +100,385 @@ def save_state(path: Path, state: Dict[str, str]) -> None:
         None
 
     Side effects:
-        - Overwrites the JSON state file with updated ticker states.
+        - Atomically replaces the JSON state file with updated ticker states.
 
     Example:
         >>> save_state(Path("alert_state.json"), {'AAPL': 'up'})
     """
-    path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    atomic_write_text(path, json.dumps(state, ensure_ascii=False, indent=2))
     logger.debug("Saved state: %s", state)
+
+
+class StateJournal:
+    """
+    Append-only, fsync'ed log of state changes not yet committed to the store.
+
+    Every change is appended as soon as it is decided (i.e. right after an
+    alert went out). If the process dies before the end-of-run commit, the
+    next `StateStore.load` replays the journal, so sent alerts are not sent
+    again. The journal is emptied after each successful commit.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, ticker: str, direction: str) -> None:
+        """Durably record one state change."""
+        line = json.dumps({"ticker": ticker, "state": direction}, ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self) -> Dict[str, str]:
+        """Changes recorded since the last commit (later entries win; a torn last line is ignored)."""
+        changes: Dict[str, str] = {}
+        if not self.path.exists():
+            return changes
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+                changes[entry["ticker"]] = entry["state"]
+            except (ValueError, KeyError, TypeError):
+                continue
+        return changes
+
+    def clear(self) -> None:
+        """Drop all entries (after they were committed)."""
+        with self._lock:
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _journal_path(path: Path) -> Path:
+    """Journal of a backend's file: its full name plus JOURNAL_SUFFIX."""
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+class StateStore(ABC):
+    """
+    Persistence of the alert state {ticker: "up" | "down" | "none" | "up:2" ...}.
+
+    A run loads the state once (`load`), records each change in the
+    journal as it happens (`record`) and commits all changed tickers
+    together at the end (`commit`), so a run is one write.
+    Backends implement `_read` and `_write`.
+    """
+
+    journal: Optional[StateJournal] = None
+
+    @abstractmethod
+    def _read(self) -> Dict[str, str]:
+        """Committed state of all tickers."""
+
+    @abstractmethod
+    def _write(self, changes: Mapping[str, str]) -> None:
+        """Persist the given tickers' states in one write."""
+
+    def load(self) -> Dict[str, str]:
+        """Return the stored state (a new dict the caller may modify), after replaying the journal."""
+        state = self._read()
+        if self.journal is not None:
+            pending = self.journal.replay()
+            if pending:
+                logger.warning("Recovering %d uncommitted state change(s) from %s.", len(pending), self.journal.path)
+                self.commit(pending)
+                state.update(pending)
+        return state
+
+    def record(self, ticker: str, direction: str) -> None:
+        """Journal one change immediately (crash safety until the next `commit`)."""
+        if self.journal is not None:
+            self.journal.append(ticker, direction)
+
+    def commit(self, changes: Mapping[str, str]) -> None:
+        """Persist the changed tickers of one run in a single write, then clear the journal."""
+        if changes:
+            self._write(changes)
+        if self.journal is not None:
+            self.journal.clear()
+
+    def close(self) -> None:
+        """Release resources (file handles, connections)."""
+
+
+class JsonStateStore(StateStore):
+    """The original `alert_state.json` format (whole file rewritten atomically per commit)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.journal = StateJournal(_journal_path(self.path))
+        self._state: Optional[Dict[str, str]] = None
+
+    def _read(self) -> Dict[str, str]:
+        self._state = load_state(self.path)
+        return dict(self._state)
+
+    def _write(self, changes: Mapping[str, str]) -> None:
+        if self._state is None:
+            self._state = load_state(self.path)
+        self._state.update(changes)
+        save_state(self.path, self._state)
+
+
+class SqliteStateStore(StateStore):
+    """
+    Alert state in an embedded SQLite database (WAL mode).
+
+    - One row per ticker; a commit upserts only the changed rows in one
+      transaction, so a crash leaves either the old or the new state.
+    - If the database is new (no rows) and `migrate_from` points to an
+      existing JSON state file, that state is imported once.
+    """
+
+    def __init__(self, path: Path, migrate_from: Optional[Path] = None):
+        self.path = Path(path)
+        self.journal = StateJournal(_journal_path(self.path))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")  # journal is cleared right after a commit
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS alert_state ("
+                " ticker TEXT PRIMARY KEY,"
+                " direction TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+        if migrate_from is not None:
+            self._migrate(Path(migrate_from))
+
+    def _migrate(self, json_path: Path) -> None:
+        """Import a legacy JSON state file into an empty database."""
+        if not json_path.exists():
+            return
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM alert_state").fetchone()
+        if count:
+            return
+        state = load_state(json_path)
+        if state:
+            self._write(state)
+            logger.info("Migrated %d ticker state(s) from %s to %s.", len(state), json_path, self.path)
+
+    def _read(self) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT ticker, direction FROM alert_state").fetchall()
+        state = dict(rows)
+        logger.debug("Loaded state: %s", state)
+        return state
+
+    def _write(self, changes: Mapping[str, str]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO alert_state (ticker, direction, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(ticker) DO UPDATE SET direction = excluded.direction, updated_at = excluded.updated_at",
+                [(tk, direction, now) for tk, direction in changes.items()],
+            )
+        logger.debug("Saved state changes: %s", dict(changes))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AlertHistory:
+    """
+    Append-only binary log of alert events (see HISTORY_DTYPE).
+
+    Records have a fixed size, so appending is a single small write and a
+    whole file is read back with one memory map (see `query_alert_history`).
+    Events: every alert (up/down, with delivery result) and every return
+    into the corridor (direction "none").
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        ticker: str,
+        direction: str,
+        pct: float,
+        open_px: float,
+        last_px: float,
+        delivered: bool = False,
+        ts: Optional[float] = None,
+    ) -> None:
+        """Append one event (thread-safe)."""
+        rec = np.zeros(1, dtype=HISTORY_DTYPE)
+        rec["ts"] = time.time() if ts is None else ts
+        rec["ticker"] = history_key(ticker)
+        rec["open"] = open_px
+        rec["last"] = last_px
+        rec["pct"] = pct
+        rec["direction"] = _DIRECTION_CODES[direction]
+        rec["delivered"] = delivered
+        with self._lock, open(self.path, "ab") as f:
+            if f.tell() == 0:
+                f.write(_HISTORY_MAGIC)
+            f.write(rec.tobytes())
+
+    def recent_alerts(
+        self,
+        window_s: float,
+        now: Optional[float] = None,
+        tickers: Optional[Iterable[str]] = None,
+    ) -> Dict[str, str]:
+        """
+        Direction of the last alert per ticker within the past `window_s` seconds.
+
+        Records are appended in time order, so the window start is found by
+        a binary search over the memory-mapped timestamps; only the tail of
+        the file is read.
+
+        Args:
+            window_s (float): Window length in seconds.
+            now (Optional[float]): End of the window (default: current time).
+            tickers (Optional[Iterable[str]]): Symbols to report under their
+                full name; needed for symbols stored hashed (see `history_key`).
+
+        Returns:
+            {ticker: "up" | "down"} (tickers without an alert in the window are missing).
+        """
+        if window_s <= 0:
+            return {}
+        rec = _map_records(self.path)
+        if rec is None:
+            return {}
+        since = (time.time() if now is None else now) - window_s
+        tail = np.asarray(rec[np.searchsorted(rec["ts"], since, side="left"):])
+        codes = {v: k for k, v in _DIRECTION_CODES.items()}
+        names = {history_key(tk): tk for tk in tickers or ()}
+        last: Dict[str, str] = {}
+        for key, d in zip(tail["ticker"], tail["direction"]):
+            if d != 0:
+                last[names.get(key) or key.decode("ascii", "replace")] = codes[int(d)]
+        return last
+
+
+def _map_records(path: Path) -> Optional[np.ndarray]:
+    """
+    Memory-map the records of a history file (None if missing or empty).
+
+    A torn record at the end (crash during append) is ignored.
+
+    Raises:
+        ValueError: If the file is not an alert history file.
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size <= len(_HISTORY_MAGIC):
+        return None
+    with open(path, "rb") as f:
+        if f.read(len(_HISTORY_MAGIC)) != _HISTORY_MAGIC:
+            raise ValueError(f"{path} is not an alert history file")
+    count = (path.stat().st_size - len(_HISTORY_MAGIC)) // HISTORY_DTYPE.itemsize
+    if count == 0:
+        return None
+    return np.memmap(path, dtype=HISTORY_DTYPE, mode="r", offset=len(_HISTORY_MAGIC), shape=(count,))
+
+
+def query_alert_history(
+    path: Path,
+    ticker: Optional[str] = None,
+    since: Optional[Any] = None,
+    until: Optional[Any] = None,
+) -> pd.DataFrame:
+    """
+    Load alert events from an `AlertHistory` file.
+
+    Args:
+        path (Path): History file (default name: ALERT_HISTORY_FILE_NAME).
+        ticker (Optional[str]): Only events of this ticker.
+        since / until: Optional time bounds (anything `pd.Timestamp` accepts;
+            naive values are taken as UTC).
+
+    Returns:
+        pd.DataFrame: One row per event with columns
+            ts (UTC), ticker, open, last, pct, direction ("up" | "down" | "none"),
+            delivered, and outside_s: for alerts, seconds until the ticker
+            returned into the corridor (NaN while still outside).
+
+    Example:
+        >>> df = query_alert_history(Path("alert_history.bin"), since="2025-08-01")
+        >>> df[df.direction != "none"].groupby("ticker").pct.describe()
+    """
+    columns = ["ts", "ticker", "open", "last", "pct", "direction", "delivered", "outside_s"]
+    mapped = _map_records(path)
+    if mapped is None:
+        return pd.DataFrame(columns=columns)
+    rec = np.array(mapped)
+    del mapped
+
+    mask = np.ones(len(rec), dtype=bool)
+    if ticker is not None:
+        mask &= rec["ticker"] == history_key(ticker)
+    if since is not None:
+        mask &= rec["ts"] >= _to_unix(since)
+    if until is not None:
+        mask &= rec["ts"] < _to_unix(until)
+
+    # Time outside the corridor: next "none" event of the same ticker (full history).
+    # In (ticker, ts) order, each row's next reset is the first reset at or
+    # after it; it counts only if it belongs to the same ticker group.
+    order = np.lexsort((rec["ts"], rec["ticker"]))
+    tks, ts = rec["ticker"][order], rec["ts"][order]
+    is_reset = rec["direction"][order] == 0
+    n = len(order)
+    group = np.concatenate(([0], np.cumsum(tks[1:] != tks[:-1])))
+    reset_pos = np.where(is_reset, np.arange(n), n)
+    next_reset = np.minimum.accumulate(reset_pos[::-1])[::-1]
+    found = next_reset < n
+    found[found] &= group[next_reset[found]] == group[found]
+    found &= ~is_reset
+    outside = np.full(n, np.nan)
+    outside[order[found]] = ts[next_reset[found]] - ts[found]
+
+    rec, outside = rec[mask], outside[mask]
+    codes = {v: k for k, v in _DIRECTION_CODES.items()}
+    return pd.DataFrame({
+        "ts": pd.to_datetime(rec["ts"], unit="s", utc=True),
+        "ticker": np.char.decode(rec["ticker"], "ascii"),
+        "open": rec["open"],
+        "last": rec["last"],
+        "pct": rec["pct"],
+        "direction": [codes[int(d)] for d in rec["direction"]],
+        "delivered": rec["delivered"],
+        "outside_s": outside,
+    })
+
+
+def _to_unix(value: Any) -> float:
+    """Convert a timestamp-like value (naive = UTC) to Unix seconds."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.timestamp()
+
+
+def open_state_store(cfg_store: Optional[Dict[str, Any]], state_file: Path) -> StateStore:
+    """
+    Create the configured state store.
+
+    Args:
+        cfg_store: "state_store" config section:
+            - "backend": "sqlite" (default) or "json"
+            - "db_file": SQLite database path (sqlite backend)
+        state_file: JSON state file; used directly by the json backend and
+            imported once into a new SQLite database.
+
+    Returns:
+        StateStore
+    """
+    cfg_store = cfg_store or {}
+    backend = cfg_store.get("backend", "sqlite")
+    if backend == "json":
+        return JsonStateStore(state_file)
+    if backend == "sqlite":
+        return SqliteStateStore(Path(cfg_store.get("db_file", "alert_state.db")), migrate_from=state_file)
+    raise ValueError(f"Unknown state_store.backend: {backend!r} (expected 'sqlite' or 'json')")
@@ -0,0 +1,161 @@
+from __future__ import annotations
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Default rules; overridable via the "thresholds" config section.
+THRESHOLDS_DEFAULTS: Dict[str, Any] = {
+    "groups": {},   # {name: {"match": [patterns], "tickers": [...], "pct" | "up_pct"/"down_pct"}}
+    "tickers": {},  # {ticker: pct | {"pct" | "up_pct"/"down_pct"}}
+    "ladder": [1],  # Alert levels as multiples of the threshold, e.g. [1, 2, 4]
+}
+
+
+def _ladder(levels: Any) -> np.ndarray:
+    """
+    Validate the threshold ladder (multiples of a ticker's threshold).
+
+    The first rung is always the threshold itself (1.0 is prepended if
+    missing), so a ladder of [1] is the plain single-threshold behaviour.
+
+    Raises:
+        ValueError: If the levels are not numbers, are < 1 or not strictly ascending.
+    """
+    try:
+        rungs = [float(x) for x in (levels or [1])]
+    except (TypeError, ValueError):
+        raise ValueError(f"thresholds.ladder: levels must be numbers (got {levels!r})")
+    if rungs[0] != 1.0:
+        rungs.insert(0, 1.0)
+    if any(b <= a for a, b in zip(rungs, rungs[1:])) or rungs[0] < 1.0:
+        raise ValueError(f"thresholds.ladder: levels must be ≥ 1 and strictly ascending (got {levels!r})")
+    return np.asarray(rungs, dtype=np.float64)
+
+
+def _rule_pcts(name: str, rule: Any, default: Tuple[float, float]) -> Tuple[float, float]:
+    """
+    Read (up_pct, down_pct) from one rule.
+
+    A rule is a number (both directions) or a dict with "pct" and/or
+    "up_pct"/"down_pct"; missing directions keep `default`.
+
+    Raises:
+        ValueError: If a threshold is not a positive number.
+    """
+    if not isinstance(rule, dict):
+        rule = {"pct": rule}
+    up, down = default
+    if rule.get("pct") is not None:
+        up = down = rule["pct"]
+    if rule.get("up_pct") is not None:
+        up = rule["up_pct"]
+    if rule.get("down_pct") is not None:
+        down = rule["down_pct"]
+    try:
+        up, down = float(up), float(down)
+    except (TypeError, ValueError):
+        raise ValueError(f"thresholds.{name}: thresholds must be numbers (got {rule!r})")
+    if up <= 0 or down <= 0:
+        raise ValueError(f"thresholds.{name}: thresholds must be > 0 (got up={up}, down={down})")
+    return up, down
+
+
+class ThresholdTable:
+    """
+    Alert thresholds per ticker, compiled from the "thresholds" config.
+
+    Precedence: ticker override > first matching group (config order) >
+    global `threshold_pct`. Group membership is given by `fnmatch` patterns
+    ("match", e.g. "^*" for indices, "*-USD" for crypto) and/or an explicit
+    "tickers" list.
+
+    Rules are resolved once per ticker (at compile time for the watchlist,
+    memoized for others), so a lookup is a dict access.
+
+    `ladder` holds the alert levels as sorted multiples of each ticker's
+    threshold (see `signals.evaluate_signals`).
+    """
+
+    def __init__(self, default_pct: float, cfg: Optional[Dict[str, Any]] = None):
+        cfg = {**THRESHOLDS_DEFAULTS, **(cfg or {})}
+        self.default = _rule_pcts("threshold_pct", default_pct, (default_pct, default_pct))
+        self.ladder = _ladder(cfg.get("ladder"))
+        self._groups: List[Tuple[str, List[str], frozenset, Tuple[float, float]]] = []
+        for name, rule in (cfg.get("groups") or {}).items():
+            self._groups.append((
+                name,
+                list(rule.get("match") or []),
+                frozenset(rule.get("tickers") or []),
+                _rule_pcts(f"groups.{name}", rule, self.default),
+            ))
+        self._tickers: Dict[str, Any] = dict(cfg.get("tickers") or {})
+        self._table: Dict[str, Tuple[float, float]] = {}
+
+    def _resolve(self, ticker: str) -> Tuple[float, float]:
+        """Apply the rules to one ticker (uncached)."""
+        base = self.default
+        for name, patterns, members, pcts in self._groups:
+            if ticker in members or any(fnmatchcase(ticker, p) for p in patterns):
+                base = pcts
+                break
+        if ticker in self._tickers:
+            return _rule_pcts(f"tickers.{ticker}", self._tickers[ticker], base)
+        return base
+
+    def prepare(self, tickers: List[str], day: str) -> None:
+        """Hook called once per run before evaluation (nothing to do for fixed thresholds)."""
+
+    def compile(self, tickers: Iterable[str]) -> "ThresholdTable":
+        """Resolve the thresholds of all `tickers` up front (validates the config)."""
+        for tk in tickers:
+            self.lookup(tk)
+        return self
+
+    def lookup(self, ticker: str) -> Tuple[float, float]:
+        """(up_pct, down_pct) for a ticker."""
+        pcts = self._table.get(ticker)
+        if pcts is None:
+            pcts = self._table[ticker] = self._resolve(ticker)
+        return pcts
+
+    def arrays(self, tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Aligned (up_pct, down_pct) arrays for a watchlist (input of `signals.evaluate_signals`)."""
+        pcts = np.array([self.lookup(tk) for tk in tickers], dtype=np.float64).reshape(-1, 2)
+        return pcts[:, 0], pcts[:, 1]
+
+    @property
+    def overrides(self) -> int:
+        """Number of compiled tickers whose thresholds differ from the global default."""
+        return sum(1 for pcts in self._table.values() if pcts != self.default)
+
+
+def compile_thresholds(
+    cfg_thresholds: Optional[Dict[str, Any]],
+    default_pct: float,
+    tickers: Iterable[str] = (),
+) -> ThresholdTable:
+    """
+    Build the threshold table once at startup.
+
+    Args:
+        cfg_thresholds: "thresholds" config section, e.g.:
+            {
+              "groups": {
+                "indices": {"match": ["^*"], "pct": 1.5},
+                "crypto":  {"match": ["*-USD"], "up_pct": 8, "down_pct": 6}
+              },
+              "tickers": {"TSLA": {"up_pct": 6, "down_pct": 5}, "SAP.DE": 2.5},
+              "ladder": [1, 2, 4]
+            }
+        default_pct: Global `threshold_pct`.
+        tickers: Watchlist to resolve up front.
+
+    Returns:
+        ThresholdTable
+
+    Raises:
+        ValueError: If a rule has a missing, non-numeric or non-positive
+            threshold, or the ladder is invalid.
+    """
+    return ThresholdTable(default_pct, cfg_thresholds).compile(tickers)
@@ -1,5 +1,33 @@
+import os
+import tempfile
+from pathlib import Path
+
+
 def mask_secret(s: str, keep: int = 1) -> str:
     """Maskiert sensible Strings für Logging-Ausgaben."""
     if not s:
         return "(unset)"
-    return s[:keep] + "…" + s[-keep:] if len(s) > keep * 2 else s[0] + "…" + s[-1]
\ No newline at end of file
+    return s[:keep] + "…" + s[-keep:] if len(s) > keep * 2 else s[0] + "…" + s[-1]
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Write a text file atomically (temp file in the same directory + rename).
+
+    A crash mid-write leaves either the old or the new file on disk,
+    never a truncated one.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
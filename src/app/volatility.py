@@ -0,0 +1,174 @@
+from __future__ import annotations
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .market import get_daily_closes
+from .thresholds import ThresholdTable
+
+logger = logging.getLogger("stock-alerts")
+
+# Default settings; overridable via the "zscore" config section.
+ZSCORE_DEFAULTS: Dict[str, Any] = {
+    "k": 2.0,                        # Alert when |Δ%| ≥ k × daily volatility
+    "window_days": 20,               # Rolling window (trading days) of daily returns
+    "min_pct": 0.5,                  # Lower bound of the resulting threshold (%)
+    "file": "daily_history.arrow",   # Cached daily closes (refreshed once per day)
+}
+
+
+def daily_volatility_pct(closes: pd.DataFrame, window_days: int) -> pd.Series:
+    """
+    Standard deviation of daily returns (in %) over the last `window_days`, per column.
+
+    Vectorized over all tickers at once. Tickers with fewer than half a
+    window of returns get NaN (not enough history to judge).
+    """
+    if closes.empty:
+        return pd.Series(dtype=np.float64)
+    returns = closes.pct_change(fill_method=None).tail(window_days)
+    sigma = returns.std(ddof=1) * 100.0
+    return sigma.where(returns.count() >= max(2, window_days // 2))
+
+
+class VolatilityModel:
+    """
+    Daily closes of the watchlist, cached locally, and the volatility derived from them.
+
+    The history is downloaded once per trading day (today's still-forming
+    bar excluded) and stored as an Arrow IPC file; later runs of the same
+    day only read the file. Tickers added during the day are fetched on
+    their own and merged in.
+    """
+
+    def __init__(self, path: Path, window_days: int = 20):
+        self.path = Path(path)
+        self.window_days = max(2, int(window_days))
+        self.day: Optional[str] = None
+        self.closes = pd.DataFrame()
+        self.sigma = pd.Series(dtype=np.float64)
+
+    def _load(self) -> None:
+        """Read the cached history (and the day it was downloaded)."""
+        if not self.path.exists():
+            return
+        try:
+            with pa.OSFile(str(self.path), "rb") as source:
+                table = ipc.open_file(source).read_all()
+            meta = table.schema.metadata or {}
+            self.day = meta.get(b"day", b"").decode() or None
+            self.closes = table.to_pandas().set_index("date")
+        except Exception as e:
+            logger.warning("Could not load daily history (%s). Downloading again.", e)
+            self.day, self.closes = None, pd.DataFrame()
+
+    def _save(self) -> None:
+        """Write the history atomically (temp file + rename)."""
+        table = pa.Table.from_pandas(self.closes.rename_axis("date").reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({"day": self.day or ""})
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        os.close(fd)
+        try:
+            with ipc.new_file(tmp, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def refresh(self, tickers: List[str], day: str) -> None:
+        """
+        Make sure the history covers `tickers` for trading day `day` (ISO date).
+
+        Downloads at most once per day for the watchlist (plus tickers added
+        later); a failed download keeps the previous history.
+        """
+        if self.day is None and self.closes.empty:
+            self._load()
+
+        if self.day == day:
+            todo = [tk for tk in tickers if tk not in self.closes.columns]
+        else:
+            todo = list(tickers)
+        if not todo:
+            return
+
+        start = pd.Timestamp(day) - pd.Timedelta(days=self.window_days * 2 + 10)
+        fetched = get_daily_closes(todo, start=start)
+        if fetched.empty and self.day != day:
+            logger.warning("Daily history download returned no data; keeping previous volatility.")
+            return
+        if not fetched.empty:
+            fetched = fetched[fetched.index < pd.Timestamp(day)]  # only completed days
+        # Tickers without history get an empty column, so they are not requested again today
+        fetched = fetched.reindex(columns=list(dict.fromkeys([*fetched.columns, *todo])))
+        if self.day == day and not self.closes.empty:
+            self.closes = self.closes.join(fetched, how="outer")
+        else:
+            self.closes = fetched
+        self.day = day
+        logger.info("Daily history refreshed: %d ticker(s), %d day(s).", self.closes.shape[1], self.closes.shape[0])
+        try:
+            self._save()
+        except Exception as e:
+            logger.warning("Could not save daily history: %s", e)
+        self.sigma = daily_volatility_pct(self.closes, self.window_days)
+
+    def volatility_pct(self, tickers: List[str]) -> np.ndarray:
+        """Daily volatility (%) aligned to `tickers` (NaN if unknown)."""
+        if self.sigma.empty and not self.closes.empty:
+            self.sigma = daily_volatility_pct(self.closes, self.window_days)
+        return self.sigma.reindex(tickers).to_numpy(dtype=np.float64)
+
+
+class ZScoreThresholds:
+    """
+    Thresholds for `threshold_mode: "zscore"`: k × daily volatility per ticker.
+
+    Tickers without enough history fall back to the percent thresholds of
+    `base` (threshold_pct / thresholds config). Drop-in for `ThresholdTable`
+    in `signals.evaluate_watchlist`.
+    """
+
+    def __init__(self, base: ThresholdTable, model: VolatilityModel, k: float = 2.0, min_pct: float = 0.5):
+        self.base = base
+        self.model = model
+        self.k = float(k)
+        self.min_pct = float(min_pct)
+
+    @property
+    def ladder(self) -> np.ndarray:
+        """Threshold ladder of the percent table (multiples apply to k × σ as well)."""
+        return self.base.ladder
+
+    def prepare(self, tickers: List[str], day: str) -> None:
+        """Refresh the volatility once per trading day (errors keep the previous values)."""
+        try:
+            self.model.refresh(tickers, day)
+        except Exception as e:
+            logger.warning("Volatility refresh failed (%s); using previous/percent thresholds.", e)
+
+    def arrays(self, tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Aligned (up_pct, down_pct) arrays: k × σ, or the base thresholds where σ is unknown."""
+        up, down = self.base.arrays(tickers)
+        sigma = self.model.volatility_pct(tickers)
+        known = np.isfinite(sigma)
+        z = np.maximum(self.k * np.where(known, sigma, 0.0), self.min_pct)
+        return np.where(known, z, up), np.where(known, z, down)
+
+
+def zscore_thresholds(base: ThresholdTable, cfg_zscore: Optional[Dict[str, Any]] = None) -> ZScoreThresholds:
+    """Build z-score thresholds from the "zscore" config section on top of the percent table."""
+    cfg = {**ZSCORE_DEFAULTS, **(cfg_zscore or {})}
+    model = VolatilityModel(Path(cfg["file"]), window_days=int(cfg["window_days"]))
+    return ZScoreThresholds(base, model, k=float(cfg["k"]), min_pct=float(cfg["min_pct"]))
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from src.app.barstore import BarStore, maintain
+
+
+def _bars(day, closes, start="09:30", tz="America/New_York"):
+    """yfinance-like 1m frame (index in the exchange's timezone), open = close."""
+    index = pd.date_range(f"{day} {start}", periods=len(closes), freq="min", tz=tz)
+    return pd.DataFrame(
+        {"Open": closes, "High": closes, "Low": closes, "Close": closes, "Volume": 1.0},
+        index=index,
+    )
+
+
+def test_first_fetch_pins_the_open_and_skips_the_forming_bar(tmp_path):
+    store = BarStore(tmp_path, "2025-08-05")
+    assert store.update("AAPL", _bars("2025-08-05", [90.0, 91.0, 92.0])) == (90.0, 92.0)
+    # Newest bar is still forming: stored up to the second one
+    assert store.read_day("AAPL")["close"].tolist() == [90.0, 91.0]
+    assert store.fetch_start("AAPL") == pd.Timestamp("2025-08-05 13:32", tz="UTC")
+
+
+def test_incremental_fetch_keeps_the_pinned_open(tmp_path):
+    store = BarStore(tmp_path, "2025-08-05")
+    store.update("AAPL", _bars("2025-08-05", [90.0, 91.0, 92.0]))
+    later = _bars("2025-08-05", [92.0, 93.0, 94.0], start="09:32")
+    assert store.update("AAPL", later) == (90.0, 94.0)
+    # A new instance (next run) reads the pin back from disk
+    assert BarStore(tmp_path, "2025-08-05").update("AAPL", None) == (90.0, 93.0)
+
+
+def test_previous_session_is_neither_stored_nor_pinned(tmp_path):
+    store = BarStore(tmp_path, "2025-08-05")
+    # Before the open, period="1d" returns yesterday's session
+    assert store.update("AAPL", _bars("2025-08-04", [100.0, 101.0, 102.0])) is None
+    assert store.fetch_start("AAPL") is None
+    assert store.update("AAPL", _bars("2025-08-05", [90.0, 91.0, 92.0])) == (90.0, 92.0)
+
+
+def test_mixed_frame_keeps_only_the_stores_day(tmp_path):
+    store = BarStore(tmp_path, "2025-08-05")
+    frame = pd.concat([_bars("2025-08-04", [100.0], start="15:59"), _bars("2025-08-05", [90.0, 91.0])])
+    assert store.update("AAPL", frame) == (90.0, 91.0)
+    assert store.read_day("AAPL")["close"].tolist() == [90.0]
+
+
+def test_day_is_the_exchange_local_date(tmp_path):
+    # 20:30 New York on Aug 5 is already Aug 6 in UTC
+    store = BarStore(tmp_path, "2025-08-05")
+    assert store.update("AAPL", _bars("2025-08-05", [90.0, 91.0], start="19:58")) == (90.0, 91.0)
+
+
+def test_maintain_compacts_closed_days_and_drops_old_ones(tmp_path):
+    for day in ("2025-08-01", "2025-08-04", "2025-08-05"):
+        store = BarStore(tmp_path, day)
+        store.update("AAPL", _bars(day, [1.0, 2.0, 3.0]))
+        store.update("AAPL", _bars(day, [3.0, 4.0, 5.0], start="09:32"))
+    maintain(tmp_path, "2025-08-05", keep_days=2)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2025-08-04", "2025-08-05"]
+    assert (tmp_path / "2025-08-04" / "AAPL.arrow").is_file()
+    assert not (tmp_path / "2025-08-04" / "AAPL").exists()
+    assert BarStore(tmp_path, "2025-08-04").read_day("AAPL")["close"].tolist() == [1.0, 2.0, 3.0, 4.0]
+    # Today is left as segments
+    assert len(list((tmp_path / "2025-08-05" / "AAPL").glob("*.arrow"))) == 2
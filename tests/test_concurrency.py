@@ -0,0 +1,44 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.app import concurrency, ratelimit
+
+
+@pytest.fixture
+def limits():
+    """Small Yahoo limit without rate limiting; defaults restored afterwards."""
+    ratelimit.configure({"enabled": False})
+    concurrency.configure({"yahoo": 2})
+    yield
+    concurrency.configure({})
+    ratelimit.configure({})
+
+
+def test_upstream_caps_parallel_requests(limits):
+    active, peak, lock = 0, 0, threading.Lock()
+
+    def request(_):
+        nonlocal active, peak
+        with concurrency.upstream("yahoo"):
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(request, range(16)))
+    assert peak == concurrency.limit("yahoo") == 2
+
+
+def test_configure_falls_back_to_defaults():
+    concurrency.configure({"ntfy": 0})
+    try:
+        assert concurrency.limit("ntfy") == 1
+        assert concurrency.limit("yahoo") == concurrency.UPSTREAM_DEFAULTS["yahoo"]
+    finally:
+        concurrency.configure({})
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from src.app.core import _apply_deliveries
+from src.app.digest import build_digest
+from src.app.signals import evaluate_watchlist
+
+
+def _alerting(n):
+    """n alerting signals, TK000 at +3.5% and each next ticker 0.1 point higher."""
+    tickers = [f"TK{i:03d}" for i in range(n)]
+    prices = {tk: (100.0, 103.5 + i / 10) for i, tk in enumerate(tickers)}
+    return [sig for sig in evaluate_watchlist(tickers, prices, {}, 3.0) if sig.alert]
+
+
+def test_digest_orders_by_move_and_fits_one_message():
+    sigs = _alerting(5)
+    (msg,) = build_digest(sigs)
+    assert msg.title == "Stock Alert Digest: 5 alerts (5 up / 0 down)"
+    assert [s.ticker for s in msg.signals] == ["TK004", "TK003", "TK002", "TK001", "TK000"]
+    assert msg.body.splitlines()[0].startswith("📈 **TK004** +3.90%")
+
+
+def test_every_alert_lands_in_exactly_one_message_within_the_limits():
+    sigs = _alerting(200)
+    messages = build_digest(sigs, max_bytes=1000, max_messages=3)
+    assert len(messages) == 3
+    assert all(len(m.body.encode("utf-8")) <= 1000 for m in messages)
+    carried = [s.ticker for m in messages for s in m.signals]
+    assert sorted(carried) == sorted(s.ticker for s in sigs)
+    assert "more" in messages[-1].body.splitlines()[-1]
+
+
+def test_no_alerts_no_messages():
+    assert build_digest([]) == []
+
+
+class _Outbox:
+    def __init__(self, messages):
+        self.messages, self.acked = messages, []
+
+    def drain(self, timeout=None):
+        return self.messages
+
+    def ack(self, msg):
+        self.acked.append(msg.id)
+
+
+class _History:
+    def __init__(self):
+        self.events = []
+
+    def append(self, ticker, direction, pct, open_px, last_px, delivered=False, ts=None):
+        self.events.append((ticker, direction, delivered))
+
+
+def _message(id_, *states, rejected=None):
+    alerts = [
+        {"ticker": tk, "state": st, "direction": st.split(":")[0], "pct": 3.5, "open": 100.0, "last": 103.5}
+        for tk, st in states
+    ]
+    return SimpleNamespace(id=id_, alerts=alerts, rejected=rejected)
+
+
+def test_late_delivery_does_not_overwrite_this_runs_reset():
+    state = {"AAPL": "none", "MSFT": "none", "TSLA": "up:2"}
+    changes = {"AAPL": "none"}  # reset by this run's evaluation
+
+    def apply(tk, new_state):
+        state[tk] = changes[tk] = new_state
+
+    outbox, history = _Outbox([_message("2", ("MSFT", "up"), ("TSLA", "up")), _message("1", ("AAPL", "up"))]), _History()
+    _apply_deliveries(outbox, history, apply, state, evaluated=set(changes))
+    assert state == {"AAPL": "none", "MSFT": "up", "TSLA": "up:2"}
+    # Every delivery is in the history and acknowledged, in enqueue order
+    assert outbox.acked == ["1", "2"]
+    assert {tk for tk, _, delivered in history.events if delivered} == {"AAPL", "MSFT", "TSLA"}
+
+
+def test_rejected_message_is_recorded_as_not_delivered():
+    state = {}
+    outbox, history = _Outbox([_message("1", ("AAPL", "up"), rejected=403)]), _History()
+    _apply_deliveries(outbox, history, state.__setitem__, state)
+    assert state == {"AAPL": "up"}
+    assert history.events == [("AAPL", "up", False)]
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from src.app import market
+from src.app.volatility import daily_volatility_pct
+
+
+def _intraday(opens_closes, day="2025-08-05", tz="America/New_York"):
+    index = pd.date_range(f"{day} 09:30", periods=len(opens_closes), freq="min", tz=tz)
+    opens, closes = zip(*opens_closes)
+    return pd.DataFrame({"Open": opens, "Close": closes}, index=index)
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """Route `market._history` to a {ticker: frame or exception} table and record the calls."""
+    table, calls = {}, []
+
+    def fake(ticker, **kwargs):
+        calls.append((ticker, kwargs.get("interval")))
+        result = table.get(ticker, pd.DataFrame())
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(market, "_history", fake)
+    monkeypatch.setattr(market.time, "sleep", lambda s: None)
+    return table, calls
+
+
+def test_batch_reads_open_and_last_per_symbol(history):
+    table, calls = history
+    table["AAPL"] = _intraday([(100.0, 101.0), (101.0, 103.0)])
+    table["SAP.DE"] = _intraday([(200.0, 199.0)], tz="Europe/Berlin")
+    prices = market.get_open_and_last_many(["AAPL", "SAP.DE", "AAPL"])
+    assert prices == {"AAPL": (100.0, 103.0), "SAP.DE": (200.0, 199.0)}
+    # One "1m" request per symbol, duplicates dropped, no fallback
+    assert sorted(calls) == [("AAPL", "1m"), ("SAP.DE", "1m")]
+
+
+def test_missing_symbols_fall_back_to_the_interval_cascade(history):
+    table, calls = history
+    table["AAPL"] = _intraday([(100.0, 101.0)])
+    table["QUIET"] = pd.DataFrame()
+    prices = market.get_open_and_last_many(["AAPL", "QUIET"])
+    assert prices == {"AAPL": (100.0, 101.0)}
+    assert [iv for tk, iv in calls if tk == "QUIET"] == ["1m", "1m", "1m", "5m", "5m", "15m", "15m", "1d"]
+
+
+def _daily(closes, tz, first="2025-07-01"):
+    """yfinance-like daily frame: bars stamped at local midnight of each trading day."""
+    index = pd.date_range(first, periods=len(closes), freq="B", tz=tz)
+    return pd.DataFrame({"Close": closes}, index=index)
+
+
+def test_daily_closes_of_mixed_exchanges_share_rows(history):
+    table, _ = history
+    closes = [100.0 + (i % 5) for i in range(30)]
+    table["AAPL"] = _daily(closes, "America/New_York")
+    table["SAP.DE"] = _daily(closes, "Europe/Berlin")
+    table["7203.T"] = _daily(closes, "Asia/Tokyo")
+    out = market.get_daily_closes(["AAPL", "SAP.DE", "7203.T"], start=pd.Timestamp("2025-07-01"))
+    assert len(out) == 30
+    assert out.index[0] == pd.Timestamp("2025-07-01")
+    assert out.index.tz is None and out.index.is_unique
+    assert not out.isna().any().any()
+
+
+def test_mixed_watchlist_gets_a_volatility_for_every_ticker(history):
+    table, _ = history
+    table["AAPL"] = _daily([100.0 + (i % 5) for i in range(30)], "America/New_York")
+    table["SAP.DE"] = _daily([50.0 + (i % 3) for i in range(30)], "Europe/Berlin")
+    both = daily_volatility_pct(market.get_daily_closes(["AAPL", "SAP.DE"], start=pd.Timestamp("2025-07-01")), 20)
+    alone = daily_volatility_pct(market.get_daily_closes(["AAPL"], start=pd.Timestamp("2025-07-01")), 20)
+    assert both.notna().all()
+    assert both["AAPL"] == pytest.approx(alone["AAPL"])
+
+
+def test_throttle_keeps_fetched_prices_and_skips_only_the_rest(history, monkeypatch):
+    table, calls = history
+    monkeypatch.setattr(market, "limit", lambda name: 1)  # one chunk, fetched in order
+    for tk in ("A", "B", "D"):
+        table[tk] = _intraday([(10.0, 11.0)])
+    table["C"] = market.RateLimited("Yahoo rate limit while fetching C")
+    prices = market.get_open_and_last_many(["A", "B", "C", "D"])
+    assert prices == {"A": (10.0, 11.0), "B": (10.0, 11.0)}
+    # No request for D, and no per-ticker fallback for the throttled symbols
+    assert [tk for tk, _ in calls] == ["A", "B", "C"]
@@ -0,0 +1,96 @@
+import pytest
+
+from src.app import outbox as outbox_mod
+from src.app.outbox import PENDING_SUFFIX, SENT_SUFFIX, Outbox
+
+
+def _alert(ticker, state="up"):
+    return {"ticker": ticker, "state": state, "direction": state.split(":")[0], "pct": 3.5, "open": 100.0, "last": 103.5}
+
+
+@pytest.fixture
+def ntfy(monkeypatch):
+    """Replace ntfy with a list of HTTP statuses to answer with (None = no answer); records titles."""
+    answers, sent = [], []
+
+    def fake(server, topic, title, message, **kwargs):
+        sent.append(title)
+        return answers.pop(0) if answers else 200
+
+    monkeypatch.setattr(outbox_mod, "send_ntfy", fake)
+    return answers, sent
+
+
+@pytest.fixture
+def make_outbox(tmp_path):
+    boxes = []
+
+    def make(**kwargs):
+        box = Outbox(tmp_path / "outbox", base_delay_s=0.01, max_delay_s=0.02, **kwargs)
+        boxes.append(box)
+        return box
+
+    yield make
+    for box in boxes:
+        box.close()
+
+
+def _enqueue(box, ticker, state="up"):
+    return box.enqueue(server="https://ntfy.invalid", topic="t", title=ticker, body="b", alerts=[_alert(ticker, state)])
+
+
+def test_delivered_message_is_kept_until_acked(ntfy, make_outbox, tmp_path):
+    box = make_outbox()
+    msg = _enqueue(box, "AAPL")
+    assert box.pending_states() == {"AAPL": "up"}
+    delivered = box.drain(timeout=2)
+    assert [m.id for m in delivered] == [msg.id]
+    assert (tmp_path / "outbox" / f"{msg.id}{SENT_SUFFIX}").exists()
+    box.ack(msg)
+    assert list((tmp_path / "outbox").iterdir()) == []
+
+
+def test_failed_send_is_retried(ntfy, make_outbox):
+    answers, sent = ntfy
+    answers.extend([None, 503])
+    box = make_outbox()
+    _enqueue(box, "AAPL")
+    delivered = box.drain(timeout=2)
+    assert len(delivered) == 1 and delivered[0].attempts == 2
+    assert sent == ["AAPL"] * 3
+
+
+def test_permanent_rejection_is_not_retried(ntfy, make_outbox, tmp_path):
+    answers, sent = ntfy
+    answers.append(403)
+    box = make_outbox()
+    msg = _enqueue(box, "AAPL")
+    delivered = box.drain(timeout=2)
+    assert [m.rejected for m in delivered] == [403]
+    assert sent == ["AAPL"]
+    box.ack(delivered[0])
+    assert not (tmp_path / "outbox" / f"{msg.id}{PENDING_SUFFIX}").exists()
+
+
+def test_restart_replays_queued_and_unacked_messages(ntfy, make_outbox):
+    answers, sent = ntfy
+    first = make_outbox()
+    unacked = _enqueue(first, "AAPL")
+    first.drain(timeout=2)  # delivered, but the run stops before the ack
+    first.close()
+    queued = _enqueue(first, "MSFT")  # closed: stays queued on disk, not sent
+
+    second = make_outbox()
+    assert second.pending_states() == {"AAPL": "up", "MSFT": "up"}
+    second.start()
+    replayed = second.drain(timeout=2)
+    assert sorted(m.id for m in replayed) == sorted([unacked.id, queued.id])
+    assert sent == ["AAPL", "MSFT"]  # the delivered message is not sent again
+
+
+def test_pending_states_prefer_the_newest_message(ntfy, make_outbox):
+    box = make_outbox()
+    box._closed = True  # keep messages queued
+    _enqueue(box, "AAPL", "up")
+    _enqueue(box, "AAPL", "up:2")
+    assert box.pending_states() == {"AAPL": "up:2"}
@@ -0,0 +1,105 @@
+import numpy as np
+
+from src.app.signals import DIRECTION_NAMES, evaluate_signals, evaluate_watchlist, format_state, parse_state
+from src.app.thresholds import ThresholdTable
+
+UP, NONE, DOWN = 1, 0, -1
+LADDER = (1.0, 2.0, 4.0)
+
+
+def _one(last, prev=NONE, prev_level=None, **kwargs):
+    """Evaluate a single ticker with open 100 and return its row as plain values."""
+    out = evaluate_signals(
+        [100.0], [last], [prev], kwargs.pop("threshold_pct", 3.0),
+        prev_level=None if prev_level is None else [prev_level], **kwargs,
+    )
+    return {k: v[0].item() for k, v in out.items()}
+
+
+def test_parse_and_format_state_round_trip():
+    for state in ("none", "up", "down", "up:2", "down:3"):
+        code, level = parse_state(state)
+        assert format_state(DIRECTION_NAMES[code], level) == state
+    assert parse_state("garbage") == (0, 0)
+    assert parse_state("up:0") == (1, 1)
+
+
+def test_breakout_alerts_once_per_direction():
+    assert _one(103.5)["alert"]
+    assert not _one(103.5, prev=UP)["alert"]
+    assert _one(96.0, prev=UP)["alert"]  # new direction
+    assert not _one(102.0)["alert"]
+
+
+def test_invalid_prices_never_alert():
+    out = evaluate_signals([100.0, 0.0, np.nan], [np.nan, 105.0, 105.0], [0, 0, 0], 3.0)
+    assert not out["valid"].any()
+    assert not out["alert"].any()
+
+
+def test_ladder_alerts_each_rung_once():
+    row = _one(106.5, ladder=LADDER)
+    assert row["alert"] and row["level"] == 2
+    assert not _one(107.0, prev=UP, prev_level=2, ladder=LADDER)["alert"]
+    row = _one(112.5, prev=UP, prev_level=2, ladder=LADDER)
+    assert row["alert"] and row["level"] == 3
+
+
+def test_ladder_rung_rearms_below_its_band():
+    # up:2 at 6%; rung 2 re-arms below 0.7 × 6% = 4.2%
+    row = _one(105.0, prev=UP, prev_level=2, ladder=LADDER, rearm_factor=0.7)
+    assert not row["relevel"] and row["held_level"] == 2
+    row = _one(104.0, prev=UP, prev_level=2, ladder=LADDER, rearm_factor=0.7)
+    assert row["relevel"] and row["held_level"] == 1 and not row["reset"]
+    # After the relevel (state "up"), a second rise to 6% alerts again
+    row = _one(106.5, prev=UP, prev_level=1, ladder=LADDER, rearm_factor=0.7)
+    assert row["alert"] and row["level"] == 2
+
+
+def test_recent_alert_suppresses_rebreakout():
+    row = _one(103.5, recent=[UP])
+    assert row["suppressed"] and not row["alert"]
+    # Other direction, or no recent alert: not suppressed
+    assert _one(96.5, recent=[UP])["alert"]
+    assert _one(103.5, recent=[NONE])["alert"]
+
+
+def test_watchlist_uses_per_ticker_thresholds():
+    table = ThresholdTable(3.0, {"tickers": {"TSLA": {"up_pct": 6, "down_pct": 5}}, "ladder": [1, 2]})
+    signals = evaluate_watchlist(
+        ["AAPL", "TSLA", "MISSING"],
+        {"AAPL": (100.0, 104.0), "TSLA": (100.0, 104.0)},
+        {"TSLA": "up"},
+        table,
+        rearm_factor=0.5,
+    )
+    aapl, tsla, missing = list(signals)
+    assert aapl.alert and aapl.state == "up"
+    assert not tsla.alert and not tsla.reset  # 4% < 6%, but above the re-arm band
+    assert missing.error and not missing.alert
+
+
+def test_hysteresis_keeps_state_inside_the_band():
+    # Up alert at 3%, factor 0.7: re-arm only below +2.1%
+    row = _one(102.5, prev=UP, rearm_factor=0.7)
+    assert not row["reset"] and not row["alert"]
+    assert _one(102.0, prev=UP, rearm_factor=0.7)["reset"]
+
+
+def test_hysteresis_default_rearms_at_the_threshold():
+    assert _one(102.9, prev=UP)["reset"]
+
+
+def test_swing_to_the_other_side_rearms():
+    # "up" ticker at -2.5%: inside the down threshold, but off the alerted side → re-armed
+    assert _one(97.5, prev=UP, rearm_factor=0.7)["reset"]
+    assert _one(102.5, prev=DOWN, rearm_factor=0.7)["reset"]
+    # and the next up breakout alerts again
+    assert _one(103.1, prev=NONE, rearm_factor=0.7)["alert"]
+
+
+def test_rearm_uses_the_alerted_sides_threshold():
+    # Down alert with a 5% down threshold (up 3%): re-arm below 0.7 × 5% = 3.5% down
+    kwargs = dict(prev=DOWN, threshold_pct=3.0, down_pct=[5.0], rearm_factor=0.7)
+    assert not _one(96.0, **kwargs)["reset"]
+    assert _one(96.6, **kwargs)["reset"]
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from src.app.state import (
+    ALERT_HISTORY_FILE_NAME,
+    AlertHistory,
+    JsonStateStore,
+    SqliteStateStore,
+    StateStore,
+    history_key,
+    open_state_store,
+    query_alert_history,
+)
+
+BACKENDS = {
+    "json": lambda d: JsonStateStore(d / "alert_state.json"),
+    "sqlite": lambda d: SqliteStateStore(d / "alert_state.db"),
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def make_store(request, tmp_path):
+    stores = []
+
+    def make():
+        store = BACKENDS[request.param](tmp_path)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_commit_persists_only_the_changes(make_store):
+    store = make_store()
+    store.commit({"AAPL": "up", "MSFT": "down:2"})
+    store.commit({"AAPL": "none"})
+    assert make_store().load() == {"AAPL": "none", "MSFT": "down:2"}
+
+
+def test_uncommitted_changes_are_replayed_once(make_store):
+    store = make_store()
+    store.commit({"AAPL": "none"})
+    store.record("AAPL", "up")
+    store.record("TSLA", "down")
+    store.record("AAPL", "up:2")
+    # Crash before the end-of-run commit: the next run recovers the journal
+    recovered = make_store()
+    assert recovered.load() == {"AAPL": "up:2", "TSLA": "down"}
+    assert not recovered.journal.path.exists()
+    assert make_store().load() == {"AAPL": "up:2", "TSLA": "down"}
+
+
+def test_torn_journal_line_is_ignored(make_store):
+    store = make_store()
+    store.record("AAPL", "up")
+    with open(store.journal.path, "a", encoding="utf-8") as f:
+        f.write('{"ticker": "MSFT", "sta')
+    assert make_store().load() == {"AAPL": "up"}
+
+
+def test_backends_keep_separate_journals(tmp_path):
+    json_store = open_state_store({"backend": "json"}, tmp_path / "alert_state.json")
+    json_store.record("AAPL", "up")
+    sqlite_store = open_state_store({"backend": "sqlite", "db_file": str(tmp_path / "alert_state.db")}, tmp_path / "alert_state.json")
+    try:
+        assert json_store.journal.path != sqlite_store.journal.path
+        assert sqlite_store.load() == {}
+    finally:
+        sqlite_store.close()
+
+
+def test_state_store_is_abstract():
+    with pytest.raises(TypeError):
+        StateStore()
+
+
+def test_long_tickers_are_kept_apart_in_the_history(tmp_path):
+    history = AlertHistory(tmp_path / ALERT_HISTORY_FILE_NAME)
+    a, b = "VERYLONGTICKERNAME.XX", "VERYLONGTICKERNAME.YY"
+    assert len(history_key(a)) <= 16 and history_key(a) != history_key(b)
+    assert history_key("SAP.DE") == b"SAP.DE"
+    history.append(a, "up", 3.5, 100.0, 103.5, ts=1000.0)
+    history.append(b, "down", -3.5, 100.0, 96.5, ts=1001.0)
+    assert history.recent_alerts(60, now=1010.0, tickers=[a, b]) == {a: "up", b: "down"}
+    assert query_alert_history(history.path, ticker=a)["direction"].tolist() == ["up"]
+
+
+def test_outside_s_is_the_time_until_the_next_reset(tmp_path):
+    history = AlertHistory(tmp_path / ALERT_HISTORY_FILE_NAME)
+    for ts, tk, direction in [
+        (0.0, "AAPL", "up"), (5.0, "MSFT", "down"), (30.0, "AAPL", "none"),
+        (40.0, "AAPL", "down"), (50.0, "MSFT", "none"),
+    ]:
+        history.append(tk, direction, 0.0, 100.0, 100.0, ts=ts)
+    df = query_alert_history(history.path)
+    outside = dict(zip(zip(df.ticker, df.ts.map(lambda t: t.timestamp())), df.outside_s))
+    assert outside[("AAPL", 0.0)] == 30.0
+    assert outside[("MSFT", 5.0)] == 45.0
+    assert np.isnan(outside[("AAPL", 40.0)])  # still outside
+    assert df[df.direction == "none"].outside_s.isna().all()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.app.thresholds import ThresholdTable, compile_thresholds
+
+CFG = {
+    "groups": {
+        "indices": {"match": ["^*"], "pct": 1.5},
+        "crypto": {"match": ["*-USD"], "up_pct": 8, "down_pct": 6},
+        "dax": {"tickers": ["SAP.DE"], "pct": 2.0},
+    },
+    "tickers": {"TSLA": {"up_pct": 6, "down_pct": 5}, "BTC-USD": {"down_pct": 10}, "SAP.DE": 2.5},
+}
+
+
+def test_precedence_ticker_over_group_over_default():
+    table = compile_thresholds(CFG, 3.0, ["AAPL", "^GDAXI", "ETH-USD", "TSLA", "SAP.DE"])
+    assert table.lookup("AAPL") == (3.0, 3.0)
+    assert table.lookup("^GDAXI") == (1.5, 1.5)
+    assert table.lookup("ETH-USD") == (8.0, 6.0)
+    assert table.lookup("TSLA") == (6.0, 5.0)
+    assert table.lookup("SAP.DE") == (2.5, 2.5)
+    # A partial ticker rule keeps the group's other direction
+    assert table.lookup("BTC-USD") == (8.0, 10.0)
+
+
+def test_arrays_are_aligned_with_the_watchlist():
+    up, down = ThresholdTable(3.0, CFG).arrays(["TSLA", "AAPL", "ETH-USD"])
+    np.testing.assert_array_equal(up, [6.0, 3.0, 8.0])
+    np.testing.assert_array_equal(down, [5.0, 3.0, 6.0])
+
+
+def test_ladder_starts_at_the_threshold():
+    np.testing.assert_array_equal(ThresholdTable(3.0, {"ladder": [2, 4]}).ladder, [1.0, 2.0, 4.0])
+    np.testing.assert_array_equal(ThresholdTable(3.0).ladder, [1.0])
+
+
+@pytest.mark.parametrize("cfg", [
+    {"ladder": [1, 3, 2]},
+    {"ladder": ["x"]},
+    {"tickers": {"TSLA": 0}},
+    {"groups": {"g": {"match": ["*"], "pct": "high"}}},
+])
+def test_invalid_rules_are_rejected(cfg):
+    with pytest.raises(ValueError):
+        compile_thresholds(cfg, 3.0, ["TSLA", "AAPL"])